@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from utils.agent_registry import AgentRegistry
+
+
+# Typical questions of the business users
+QUESTIONS = [
+    "Who are the 5 sales agents with the highest total revenue?",
+    "Which product series brings the most revenue?",
+    "What is the RFM segment and the probability of being alive of the customer Kan-code?",
+    "How many customers are in each RFM segment and how much revenue do they bring?",
+    "Which regional office has the best sales performance?",
+    "What are the 3 most profitable customers of the Champions segment?",
+    "Which sector has the highest average deal value?",
+    "Which sales agents have the shortest average sales cycle?",
+]
+
+# Agent configurations: the SQL toolkit only (before), then with the typed tools, then
+# with the typed tools and the schemas pre-injected in the prompt
+CONFIGURATIONS = {
+    'sql_toolkit': {'schema_mode': 'discover', 'typed_tools': False},
+    'typed_tools': {'schema_mode': 'discover', 'typed_tools': True},
+    'preinjected': {'schema_mode': 'preinjected', 'typed_tools': True},
+}
+
+
+def answer(agent_executor, question: str) -> tuple[int, float]:
+    """
+    Answers a question with an agent.
+
+    Args:
+        agent_executor (CompiledGraph): The compiled agent.
+        question (str): The question to answer.
+
+    Returns:
+        tuple[int, float]: The number of tool calls and the latency in seconds.
+    """
+    started_at = time.perf_counter()
+    result = agent_executor.invoke({"messages": [("user", question)]})
+    seconds = time.perf_counter() - started_at
+
+    tool_calls = sum(len(getattr(msg, "tool_calls", None) or []) for msg in result["messages"])
+    return tool_calls, seconds
+
+
+def benchmark_agent_tools(questions: list[str] = QUESTIONS) -> dict[str, dict[str, float]]:
+    """
+    Compares the tool calls and latency per answer of the agent configurations.
+
+    Every question is answered once by each configuration; the LLM calls are real, so
+    OPENAI_API_KEY must be set.
+
+    Args:
+        questions (list[str]): The questions to answer. Default is `QUESTIONS`.
+
+    Returns:
+        dict[str, dict[str, float]]: The average tool calls and the average and median
+        latency per answer, by configuration.
+    """
+    results = {}
+    for name, configuration in CONFIGURATIONS.items():
+        agent_executor = AgentRegistry(**configuration).get_agent()
+        answers = [answer(agent_executor, question) for question in questions]
+
+        results[name] = {
+            'tool_calls': statistics.mean(tool_calls for tool_calls, _ in answers),
+            'mean_seconds': statistics.mean(seconds for _, seconds in answers),
+            'median_seconds': statistics.median(seconds for _, seconds in answers),
+        }
+
+    return results
+
+
+if __name__ == "__main__":
+    results = benchmark_agent_tools()
+
+    print(f"{'configuration':<15} {'tool calls':>11} {'mean (s)':>9} {'median (s)':>11}")
+    for name, result in results.items():
+        print(
+            f"{name:<15} {result['tool_calls']:>11.2f} "
+            f"{result['mean_seconds']:>9.2f} {result['median_seconds']:>11.2f}"
+        )
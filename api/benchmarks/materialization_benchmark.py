@@ -0,0 +1,101 @@
+import statistics
+import time
+
+from sqlalchemy import text
+
+from core.configs import settings
+from core.database import engine
+from utils.bulk_writer import quote_identifier
+from utils.dbt_runner import dbt_runner
+
+
+GOLD_MODELS = [
+    'customer_profitability_analysis',
+    'customer_retention_analysis',
+    'customer_segmentation_analysis',
+    'products_sales_analysis',
+    'regional_sales_performance',
+    'sales_agent_performance',
+    'sales_performance_analysis',
+    'sector_wise_revenue_analysis',
+]
+
+# Typical filtered queries of the agent on the silver layer
+SILVER_QUERIES = {
+    'silver_by_sales_agent': """SELECT SUM(business_close_value) FROM {silver} WHERE sales_agent = 'Darcel Schlecht'""",
+    'silver_by_customer': """SELECT COUNT(*) FROM {silver} WHERE customer = 'Kan-code'""",
+    'silver_alive_customers': """SELECT COUNT(DISTINCT customer) FROM {silver} WHERE prob_alive_customer > 0.9""",
+    'silver_closed_in_2017_q4': """SELECT COUNT(*) FROM {silver} WHERE business_close_date >= '2017-10-01'""",
+}
+
+MATERIALIZATIONS = {
+    'view': {'silver_materialized': 'view', 'gold_materialized': 'view'},
+    'table': {'silver_materialized': 'incremental', 'gold_materialized': 'table'},
+}
+
+
+def time_query(query: str, repeat: int) -> float:
+    """
+    Runs a query several times and returns its median latency in milliseconds.
+
+    Args:
+        query (str): The query to run.
+        repeat (int): How many times the query is run.
+
+    Returns:
+        float: The median latency in milliseconds.
+    """
+    latencies = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            conn.execute(text(query)).fetchall()
+            latencies.append((time.perf_counter() - started_at) * 1000)
+
+    return statistics.median(latencies)
+
+
+def benchmark_materializations(repeat: int = 20) -> dict[str, dict[str, float]]:
+    """
+    Compares the query latency of the silver and gold models as views and as tables.
+
+    The models are rebuilt with each materialization, then every gold model is read in
+    full and the silver model is queried with the filters the indexes target. The models
+    are left with the default (table) materialization.
+
+    Args:
+        repeat (int): How many times each query is run. Default is 20.
+
+    Returns:
+        dict[str, dict[str, float]]: The median latency in ms of each query, by materialization.
+    """
+    schema = settings.DB_SCHEMA
+    queries = {
+        model: f"SELECT * FROM {quote_identifier(schema, model)}"
+        for model in GOLD_MODELS
+    }
+    queries.update({
+        name: query.format(silver=quote_identifier(schema, 'stg-won_deal_stage'))
+        for name, query in SILVER_QUERIES.items()
+    })
+
+    latencies = {}
+    for materialization, dbt_vars in MATERIALIZATIONS.items():
+        dbt_runner.run(select=['stg-won_deal_stage+'], full_refresh=True, dbt_vars=dbt_vars)
+        latencies[materialization] = {
+            name: time_query(query, repeat) for name, query in queries.items()
+        }
+
+    # Back to the materialization of the project configuration
+    dbt_runner.run(select=['stg-won_deal_stage+'], full_refresh=True)
+
+    return latencies
+
+
+if __name__ == "__main__":
+    results = benchmark_materializations()
+
+    print(f"{'query':<35} {'view (ms)':>10} {'table (ms)':>11} {'speedup':>8}")
+    for name in results['view']:
+        view_ms, table_ms = results['view'][name], results['table'][name]
+        print(f"{name:<35} {view_ms:>10.2f} {table_ms:>11.2f} {view_ms / table_ms:>7.1f}x")
@@ -0,0 +1,163 @@
+from functools import lru_cache
+from typing import List
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+from sqlalchemy import inspect, select
+
+from .messages import MessageHistory, Role
+from core.configs import settings
+from core.metrics import metrics
+from models.historic_messages_model import MessageDB, MessageHistoryDB
+from utils.prompt_report import CHARS_PER_TOKEN, count_tokens
+
+
+SUMMARY_PROMPT = """
+    You maintain the memory of a conversation between a user and an agent answering
+    questions about a CRM database. Update the summary below with the new messages.
+    Keep the questions asked, the filters, periods, metrics and entities they refer to,
+    and the key figures of the answers, so that follow-up questions can be understood.
+    Answer with the updated summary only, in at most {max_words} words.
+
+    Current summary:
+    {summary}
+
+    New messages:
+    {messages}
+"""
+
+
+@lru_cache(maxsize=1)
+def build_summary_chain():
+    """
+    Builds the LLM chain folding messages into the summary of a conversation.
+
+    The chain is built once per process and reused by every request.
+
+    Returns:
+        RunnableSequence:
+            The prompt piped into the LLM and a string output parser.
+    """
+    prompt = ChatPromptTemplate.from_template(SUMMARY_PROMPT)
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+
+    return prompt | llm | StrOutputParser()
+
+
+def format_messages(messages: List[MessageDB]) -> str:
+    """
+    Renders messages as "role: content" lines.
+    """
+    return "\n".join(f"{message.role}: {message.content}" for message in messages)
+
+
+async def asummarize(summary: str | None, messages: List[MessageDB]) -> str:
+    """
+    Folds messages into the summary of a conversation.
+
+    If the LLM cannot be reached, the messages are appended to the summary as they are,
+    keeping its most recent part, so the memory stays bounded either way.
+
+    Args:
+        summary (str | None):
+            The current summary, if any.
+        messages (List[MessageDB]):
+            The messages to fold into it, oldest first.
+
+    Returns:
+        str:
+            The updated summary.
+    """
+    max_tokens = settings.AGENT_MEMORY_SUMMARY_MAX_TOKENS
+    try:
+        new_summary = await build_summary_chain().ainvoke({
+            "summary": summary or "(empty)",
+            "messages": format_messages(messages),
+            "max_words": max_tokens * 3 // 4,
+        })
+    except Exception as e:
+        print(f"Could not summarize the conversation, keeping its last messages instead: {e}")
+        new_summary = "\n".join(filter(None, [summary, format_messages(messages)]))
+
+    new_summary = new_summary.strip()
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(new_summary) > max_chars:
+        # Keeps the whole lines of the most recent part
+        tail = new_summary[-max_chars:]
+        new_summary = tail.partition("\n")[2] or tail
+
+    return new_summary
+
+
+async def aload_memory(chat: MessageHistoryDB, session) -> MessageHistory:
+    """
+    Loads the prior turns of a conversation that are fed to the agent.
+
+    The most recent messages are kept while they fit in `AGENT_MEMORY_MAX_TOKENS` and
+    `AGENT_MEMORY_MAX_MESSAGES`. When they exceed either, the older ones are folded into
+    the rolling summary stored with the chat history, until the kept messages fit in half
+    of both budgets, so the summary is only updated every few turns. The window always
+    starts with a question of the user. The changes to the summary are committed with
+    the rest of the request.
+
+    Args:
+        chat (MessageHistoryDB):
+            The chat history, before the new question is appended to it.
+        session (AsyncSession):
+            The async database session the chat history was loaded with.
+
+    Returns:
+        MessageHistory:
+            The summary and the window of the most recent messages.
+    """
+    if not inspect(chat).persistent:
+        return MessageHistory()
+
+    max_messages = settings.AGENT_MEMORY_MAX_MESSAGES
+    unsummarized = (
+        MessageDB.message_history_id == chat.id,
+        MessageDB.id > (chat.summarized_until_id or 0)
+    )
+    # One more message than the budget tells whether older ones were not fetched
+    stmt = (
+        select(MessageDB)
+        .where(*unsummarized)
+        .order_by(MessageDB.id.desc())
+        .limit(max_messages + 1)
+    )
+    recent_messages = (await session.scalars(stmt)).all()
+    capped = len(recent_messages) > max_messages
+    recent_messages = recent_messages[:max_messages]
+    token_counts = [count_tokens(message.content)[0] for message in recent_messages]
+
+    window_size = len(recent_messages)
+    if capped or sum(token_counts) > settings.AGENT_MEMORY_MAX_TOKENS:
+        window_size, tokens = 0, 0
+        for token_count in token_counts[:max_messages // 2]:
+            if tokens + token_count > settings.AGENT_MEMORY_MAX_TOKENS // 2:
+                break
+            window_size += 1
+            tokens += token_count
+        # The window starts with a question, not with the answer to a folded one
+        while window_size and recent_messages[window_size - 1].role != Role.human.name:
+            window_size -= 1
+
+        folded_messages = list(reversed(recent_messages[window_size:]))
+        if capped:
+            # The unsummarized messages older than the fetched ones are folded too
+            stmt = (
+                select(MessageDB)
+                .where(*unsummarized, MessageDB.id < recent_messages[-1].id)
+                .order_by(MessageDB.id)
+            )
+            folded_messages = list((await session.scalars(stmt)).all()) + folded_messages
+
+        chat.summary = await asummarize(chat.summary, folded_messages)
+        chat.summarized_until_id = folded_messages[-1].id
+        metrics.increment("agent.memory.summaries")
+
+    window = list(reversed(recent_messages[:window_size]))
+    metrics.observe("agent.memory.tokens", sum(token_counts[:window_size]))
+
+    return chat.to_message_history(window)
@@ -108,6 +108,8 @@ class MessageHistory:
     Attributes:
         message_history (list[Message]):
             A list storing all messages in the chat history.
+        summary (str | None):
+            A summary of the older messages that are not in `message_history`.
 
     Methods:
         add_message(message: Message) -> None:
@@ -118,12 +120,19 @@ class MessageHistory:
             Adds a system-generated message.
         add_assistant_message(content: str) -> None:
             Adds a message from the assistant.
+        to_agent_messages() -> list[tuple[str, str]]:
+            Converts the summary and the messages into the input messages of the agent.
     """
-    def __init__(self):
+    def __init__(self, summary: str | None = None):
         """
         Initializes an empty message history.
+
+        Args:
+            summary (str | None):
+                A summary of the older messages, if any.
         """
         self.message_history: list[Message] = []
+        self.summary = summary
 
     def add_message(self, message: Message) -> None:
         """
@@ -167,3 +176,23 @@ class MessageHistory:
         """
         message = Message(role=Role.assistant, content=content)
         self.message_history.append(message)
+
+    def to_agent_messages(self) -> list[tuple[str, str]]:
+        """
+        Converts the summary and the messages into the input messages of the agent.
+
+        The summary, if any, comes first as a system message.
+
+        Returns:
+            list[tuple[str, str]]:
+                (role, content) pairs, with the roles expected by LangChain.
+        """
+        agent_roles = {Role.human: "user", Role.assistant: "assistant", Role.system: "system"}
+
+        messages = []
+        if self.summary:
+            messages.append(("system", f"Summary of the earlier conversation:\n{self.summary}"))
+        for message in self.message_history:
+            messages.append((agent_roles[message.role], message.content))
+
+        return messages
@@ -1,8 +1,11 @@
-from sqlalchemy import select
+from typing import List
+
+from sqlalchemy import delete, select
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import noload, selectinload
 
 from .messages import Role
-from models.historic_messages_model import MessageDB, MessageHistoryDB
+from models.historic_messages_model import AgentQueryDB, MessageDB, MessageHistoryDB
 
 def chat_history_from_id(message_history_id: str, session) -> MessageHistoryDB:
     """
@@ -22,39 +25,208 @@ def chat_history_from_id(message_history_id: str, session) -> MessageHistoryDB:
         NoResultFound:
             If no chat history is found, a new one is instantiated instead.
     """
-    stmt = select(MessageHistoryDB).where(
-        MessageHistoryDB.id == message_history_id
+    stmt = (
+        select(MessageHistoryDB)
+        .where(MessageHistoryDB.id == message_history_id)
+        .options(selectinload(MessageHistoryDB.messages))
     )
 
     try:
         chat = session.scalars(stmt).one()
     except NoResultFound:
-        chat = MessageHistoryDB(id=message_history_id)
+        chat = MessageHistoryDB(id=message_history_id, messages=[])
+
+    return chat
+
+
+async def achat_history_from_id(
+    message_history_id: str,
+    session,
+    with_messages: bool = True
+) -> MessageHistoryDB:
+    """
+    Async variant of `chat_history_from_id`, for `AsyncSession`.
+
+    Lazy loading is not available with async sessions, so the messages of the chat
+    history are either loaded eagerly with it or not at all. In the latter case the
+    `messages` collection starts empty: messages appended to it are still saved, and
+    `to_list()` only returns them.
+
+    Args:
+        message_history_id (str):
+            The unique identifier of the chat history.
+        session (AsyncSession):
+            The async database session used to execute the query.
+        with_messages (bool):
+            Whether to load the stored messages. Default is True.
+
+    Returns:
+        MessageHistoryDB:
+            The retrieved chat history object. If not found, a new instance is created.
+    """
+    stmt = (
+        select(MessageHistoryDB)
+        .where(MessageHistoryDB.id == message_history_id)
+        .options(
+            selectinload(MessageHistoryDB.messages)
+            if with_messages else noload(MessageHistoryDB.messages)
+        )
+    )
+
+    try:
+        chat = (await session.scalars(stmt)).one()
+    except NoResultFound:
+        chat = MessageHistoryDB(id=message_history_id, messages=[])
 
     return chat
 
 
-def save_user_message_in_chat(content: str, chat: MessageHistoryDB) -> None:
+async def aget_messages_page(
+    message_history_id: int,
+    session,
+    before_id: int | None = None,
+    limit: int = 50
+) -> tuple[List[MessageDB], int | None]:
+    """
+    Retrieves a page of the messages of a chat history, with cursor pagination.
+
+    The page holds the `limit` most recent messages older than `before_id`, in
+    chronological order. The query is served by the (message_history_id, id) index,
+    so its cost does not depend on how deep the page is.
+
+    Args:
+        message_history_id (int):
+            The unique identifier of the chat history.
+        session (AsyncSession):
+            The async database session used to execute the query.
+        before_id (int | None):
+            The cursor: only messages with a lower ID are returned. Default is None,
+            for the most recent messages.
+        limit (int):
+            The maximum number of messages of the page. Default is 50.
+
+    Returns:
+        tuple[List[MessageDB], int | None]:
+            - The messages of the page, oldest first.
+            - The cursor of the previous page, or None if there are no older messages.
+    """
+    stmt = select(MessageDB).where(MessageDB.message_history_id == message_history_id)
+    if before_id is not None:
+        stmt = stmt.where(MessageDB.id < before_id)
+    stmt = stmt.order_by(MessageDB.id.desc()).limit(limit + 1)
+
+    messages = (await session.scalars(stmt)).all()
+    has_more = len(messages) > limit
+    messages = list(reversed(messages[:limit]))
+
+    return messages, (messages[0].id if has_more else None)
+
+
+def build_user_message(content: str) -> MessageDB:
     """
-    Saves a user message in the chat history.
+    Builds a user message, to be persisted with `chat.writer.chat_writer`.
 
     Args:
         content (str):
             The message content from the user.
-        chat (MessageHistoryDB):
-            The chat history object where the message should be stored.
+
+    Returns:
+        MessageDB:
+            The new message.
     """
-    chat.messages.append(MessageDB(role=Role.human.name, content=content))
+    return MessageDB(role=Role.human.name, content=content)
 
 
-def save_assistant_message_in_chat(content: str, chat: MessageHistoryDB) -> None:
+def build_assistant_message(
+    content: str,
+    tool_calls: list[dict] | None = None,
+    queries: list[dict] | None = None
+) -> MessageDB:
     """
-    Saves an assistant message in the chat history.
+    Builds an assistant message, to be persisted with `chat.writer.chat_writer`.
 
     Args:
         content (str):
             The message content from the assistant.
-        chat (MessageHistoryDB):
-            The chat history object where the message should be stored.
+        tool_calls (list[dict] | None):
+            The tools the agent called to write the message ({"name", "args"}), if any.
+        queries (list[dict] | None):
+            The database queries the agent ran, as recorded by `utils.agent_query_log`.
+
+    Returns:
+        MessageDB:
+            The new message, with its queries.
+    """
+    return MessageDB(
+        role=Role.assistant.name,
+        content=content,
+        tool_calls=tool_calls,
+        queries=[AgentQueryDB(position=position, **query) for position, query in enumerate(queries or [])]
+    )
+
+
+async def aget_agent_queries(message_id: int, session) -> List[AgentQueryDB]:
+    """
+    Retrieves the database queries the agent ran to write an assistant message.
+
+    Args:
+        message_id (int):
+            The ID of the assistant message.
+        session (AsyncSession):
+            The async database session used to execute the query.
+
+    Returns:
+        List[AgentQueryDB]:
+            The queries, in execution order.
+
+    Raises:
+        NoResultFound:
+            If there is no assistant message with this ID.
     """
-    chat.messages.append(MessageDB(role=Role.assistant.name, content=content))
\ No newline at end of file
+    stmt = (
+        select(MessageDB)
+        .where(MessageDB.id == message_id, MessageDB.role == Role.assistant.name)
+        .options(selectinload(MessageDB.queries))
+    )
+
+    return (await session.scalars(stmt)).one().queries
+
+
+async def aprune_chat_histories(before_id: int, session) -> dict:
+    """
+    Deletes the chat histories with an ID lower than a bound, with their messages and
+    agent queries.
+
+    Conversation IDs are time-ordered, so the histories created before a moment are an
+    ID range, deleted through the primary key and the (message_history_id, id) index.
+
+    Args:
+        before_id (int):
+            The ID bound, see `utils.conversation_ids.conversation_id_lower_bound`.
+        session (AsyncSession):
+            The async database session used to execute the queries; it is not committed.
+
+    Returns:
+        dict:
+            The number of deleted chat histories, messages and agent queries.
+    """
+    old_messages = select(MessageDB.id).where(MessageDB.message_history_id < before_id)
+
+    agent_queries = await session.execute(
+        delete(AgentQueryDB).where(AgentQueryDB.message_id.in_(old_messages))
+        .execution_options(synchronize_session=False)
+    )
+    messages = await session.execute(
+        delete(MessageDB).where(MessageDB.message_history_id < before_id)
+        .execution_options(synchronize_session=False)
+    )
+    message_histories = await session.execute(
+        delete(MessageHistoryDB).where(MessageHistoryDB.id < before_id)
+        .execution_options(synchronize_session=False)
+    )
+
+    return {
+        "message_histories": message_histories.rowcount,
+        "messages": messages.rowcount,
+        "agent_queries": agent_queries.rowcount,
+    }
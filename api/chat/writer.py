@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.configs import settings
+from core.database import async_engine
+from core.metrics import metrics
+from models.historic_messages_model import AgentQueryDB, MessageDB, MessageHistoryDB
+
+
+class ChatWriter:
+    """
+    Write-behind persistence of chat messages, batched across concurrent requests.
+
+    `write` queues the messages of a request and waits until they are committed, so a
+    request never answers before its messages are durable. The messages queued within
+    `flush_interval_seconds` (or up to `max_batch_size` requests) are written together:
+    one transaction with a multi-row INSERT per table, instead of one transaction per
+    request. `close` flushes what is still queued, and is awaited in the lifespan of
+    the app before the engines are disposed.
+
+    Args:
+        flush_interval_seconds (float):
+            How long the first queued request waits for others to join its batch.
+        max_batch_size (int):
+            The maximum number of requests written in one transaction.
+
+    Methods:
+        write(message_history_id: int, messages: list[MessageDB]) -> None:
+            Persists messages and sets their IDs, batched with concurrent requests.
+        close() -> None:
+            Flushes the queued messages and stops the background task.
+    """
+    def __init__(self, flush_interval_seconds: float, max_batch_size: int):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_batch_size = max_batch_size
+        self._queue = None
+        self._task = None
+        self._loop = None
+
+    def _ensure_started(self) -> None:
+        """
+        Starts the background task in the running event loop, if not started yet.
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+
+    async def write(self, message_history_id: int, messages: list[MessageDB]) -> None:
+        """
+        Persists messages of a chat history, creating it if needed, and sets their IDs.
+
+        The messages are written in the given order, with their `queries`.
+
+        Args:
+            message_history_id (int):
+                The ID of the chat history.
+            messages (list[MessageDB]):
+                New messages, not added to any session.
+
+        Raises:
+            Exception:
+                Whatever error made the transaction of the batch fail.
+        """
+        self._ensure_started()
+
+        done = self._loop.create_future()
+        await self._queue.put((message_history_id, messages, done))
+        await done
+
+    async def close(self) -> None:
+        """
+        Flushes the queued messages and stops the background task.
+        """
+        if self._task is None or self._task.done():
+            return
+
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        """
+        Collects the queued requests into batches and writes them, until `close`.
+        """
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval_seconds
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple]) -> None:
+        """
+        Writes a batch in a single transaction and resolves the futures of its requests.
+        """
+        messages = [message for _, request_messages, _ in batch for message in request_messages]
+        started_at = time.perf_counter()
+
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(
+                    pg_insert(MessageHistoryDB)
+                    .values([{"id": message_history_id} for message_history_id in dict.fromkeys(
+                        message_history_id for message_history_id, _, _ in batch
+                    )])
+                    .on_conflict_do_nothing()
+                )
+
+                message_ids = (await conn.execute(
+                    insert(MessageDB).returning(MessageDB.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "message_history_id": message_history_id,
+                            "role": message.role,
+                            "content": message.content,
+                            "tool_calls": message.tool_calls,
+                        }
+                        for message_history_id, request_messages, _ in batch
+                        for message in request_messages
+                    ]
+                )).scalars().all()
+
+                queries = []
+                for message, message_id in zip(messages, message_ids):
+                    message.id = message_id
+                    for query in message.queries:
+                        query.message_id = message_id
+                        queries.append({
+                            column.key: getattr(query, column.key)
+                            for column in AgentQueryDB.__table__.columns
+                            if column.key not in ("id", "created_at")
+                        })
+                if queries:
+                    await conn.execute(insert(AgentQueryDB), queries)
+        except Exception as e:
+            print(f"Could not write {len(messages)} chat message(s): {e}")
+            for _, _, done in batch:
+                if not done.done():
+                    done.set_exception(e)
+            return
+
+        metrics.increment("chat.write.flushes")
+        metrics.observe("chat.write.batch_requests", len(batch))
+        metrics.observe("chat.write.flush_seconds", time.perf_counter() - started_at)
+        for _, _, done in batch:
+            if not done.done():
+                done.set_result(None)
+
+
+chat_writer = ChatWriter(
+    flush_interval_seconds=settings.CHAT_WRITE_FLUSH_INTERVAL_MS / 1000,
+    max_batch_size=settings.CHAT_WRITE_MAX_BATCH_SIZE,
+)
@@ -15,9 +15,65 @@ class Settings(BaseSettings):
 
     load_dotenv()
     DB_URL: ClassVar = os.getenv("DB_URL")
+    # Defaults to DB_URL with the async psycopg (3) driver
+    ASYNC_DB_URL: ClassVar = os.getenv("ASYNC_DB_URL")
+    # Pool of the API engines (sync and async, each gets its own)
+    DB_POOL_SIZE: ClassVar = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: ClassVar = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT_SECONDS: ClassVar = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+    DB_POOL_RECYCLE_SECONDS: ClassVar = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+    DB_POOL_PRE_PING: ClassVar = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # 0 disables the timeout (Postgres default)
+    DB_STATEMENT_TIMEOUT_MS: ClassVar = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+    # Read-only pool running the SQL generated by the agent, defaults to DB_URL
+    AGENT_DB_URL: ClassVar = os.getenv("AGENT_DB_URL")
+    AGENT_DB_POOL_SIZE: ClassVar = int(os.getenv("AGENT_DB_POOL_SIZE", 3))
+    AGENT_DB_MAX_OVERFLOW: ClassVar = int(os.getenv("AGENT_DB_MAX_OVERFLOW", 2))
+    AGENT_DB_POOL_TIMEOUT_SECONDS: ClassVar = float(os.getenv("AGENT_DB_POOL_TIMEOUT_SECONDS", 10))
+    AGENT_DB_STATEMENT_TIMEOUT_MS: ClassVar = int(os.getenv("AGENT_DB_STATEMENT_TIMEOUT_MS", 15000))
+    # Execution sandbox of the SQL written by the agent
+    AGENT_SQL_MAX_COST: ClassVar = float(os.getenv("AGENT_SQL_MAX_COST", 100000))
+    AGENT_SQL_MAX_ROWS: ClassVar = int(os.getenv("AGENT_SQL_MAX_ROWS", 200))
+    AGENT_SQL_MAX_RESULT_TOKENS: ClassVar = int(os.getenv("AGENT_SQL_MAX_RESULT_TOKENS", 2000))
     PROJECT_PATH: ClassVar = os.getenv("PROJECT_PATH")
     DB_SCHEMA: ClassVar = os.getenv("DB_SCHEMA")
     DBT_PATH: ClassVar = os.getenv("DBT_PATH")
+    DBT_PROFILES_DIR: ClassVar = os.getenv("DBT_PROFILES_DIR")
+
+    ANSWER_CACHE_MAX_ENTRIES: ClassVar = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 512))
+    ANSWER_CACHE_TTL_SECONDS: ClassVar = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 3600))
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: ClassVar = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", 0.92))
+
+    SQL_INJECTION_VERDICT_CACHE_MAX_ENTRIES: ClassVar = int(os.getenv("SQL_INJECTION_VERDICT_CACHE_MAX_ENTRIES", 4096))
+    SQL_INJECTION_VERDICT_CACHE_TTL_SECONDS: ClassVar = float(os.getenv("SQL_INJECTION_VERDICT_CACHE_TTL_SECONDS", 86400))
+    SQL_INJECTION_BATCH_MAX_CONCURRENCY: ClassVar = int(os.getenv("SQL_INJECTION_BATCH_MAX_CONCURRENCY", 8))
+    SQL_INJECTION_VERDICT_PERSISTENT: ClassVar = os.getenv("SQL_INJECTION_VERDICT_PERSISTENT", "false").lower() == "true"
+
+    REBUILD_WORKER_IN_PROCESS: ClassVar = os.getenv("REBUILD_WORKER_IN_PROCESS", "true").lower() == "true"
+    REBUILD_WORKER_POLL_SECONDS: ClassVar = float(os.getenv("REBUILD_WORKER_POLL_SECONDS", 2))
+    REBUILD_WATCH_INTERVAL_SECONDS: ClassVar = float(os.getenv("REBUILD_WATCH_INTERVAL_SECONDS", 5))
+
+    BULK_WRITE_SWAP_LOCK_TIMEOUT_MS: ClassVar = int(os.getenv("BULK_WRITE_SWAP_LOCK_TIMEOUT_MS", 500))
+    BULK_WRITE_SWAP_MAX_ATTEMPTS: ClassVar = int(os.getenv("BULK_WRITE_SWAP_MAX_ATTEMPTS", 20))
+
+    INIT_DATA_CHUNK_ROWS: ClassVar = int(os.getenv("INIT_DATA_CHUNK_ROWS", 50000))
+
+    ANALYTICS_CACHE_MAX_ENTRIES: ClassVar = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", 1024))
+    ANALYTICS_CACHE_TTL_SECONDS: ClassVar = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", 3600))
+
+    AGENT_TYPED_TOOLS: ClassVar = os.getenv("AGENT_TYPED_TOOLS", "true").lower() == "true"
+    AGENT_SCHEMA_MODE: ClassVar = os.getenv("AGENT_SCHEMA_MODE", "discover")
+    TABLES_METADATA_CACHE_PATH: ClassVar = os.getenv("TABLES_METADATA_CACHE_PATH")
+    # Prior turns fed to the agent, older ones are folded into a rolling summary
+    AGENT_MEMORY_MAX_TOKENS: ClassVar = int(os.getenv("AGENT_MEMORY_MAX_TOKENS", 1500))
+    AGENT_MEMORY_MAX_MESSAGES: ClassVar = int(os.getenv("AGENT_MEMORY_MAX_MESSAGES", 20))
+    AGENT_MEMORY_SUMMARY_MAX_TOKENS: ClassVar = int(os.getenv("AGENT_MEMORY_SUMMARY_MAX_TOKENS", 300))
+
+    # Write-behind batching of the chat messages
+    CHAT_WRITE_FLUSH_INTERVAL_MS: ClassVar = float(os.getenv("CHAT_WRITE_FLUSH_INTERVAL_MS", 10))
+    CHAT_WRITE_MAX_BATCH_SIZE: ClassVar = int(os.getenv("CHAT_WRITE_MAX_BATCH_SIZE", 100))
+
+    PROCESS_POOL_MAX_WORKERS: ClassVar = int(os.getenv("PROCESS_POOL_MAX_WORKERS", 2))
 
     class Config:
         case_sensitive = True
@@ -1,10 +1,33 @@
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from core.configs import settings
+from core.pool_metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, apply_session_settings
 from models.historic_messages_model import Base
+from models.sql_injection_verdict_model import SQLInjectionVerdictDB
+from models.rebuild_job_model import RebuildJobDB
+from models.ingest_progress_model import IngestProgressDB
 
-engine = create_engine(settings.DB_URL, echo=False, future=True)
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+SESSION_SETTINGS = {'statement_timeout': str(settings.DB_STATEMENT_TIMEOUT_MS)}
+
+engine = create_engine(
+    settings.DB_URL,
+    echo=False,
+    future=True,
+    poolclass=InstrumentedQueuePool,
+    pool_logging_name="api",
+    **POOL_OPTIONS
+)
+apply_session_settings(engine, SESSION_SETTINGS)
 
 Session = sessionmaker(
     autocommit=False,
@@ -13,4 +36,157 @@ Session = sessionmaker(
     bind=engine
 )
 
+# Async variant for the `async def` routes, so database I/O does not block the event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DB_URL or make_url(settings.DB_URL).set(drivername="postgresql+psycopg"),
+    echo=False,
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
+    pool_logging_name="api_async",
+    **POOL_OPTIONS
+)
+apply_session_settings(async_engine.sync_engine, SESSION_SETTINGS)
+
+AsyncSession = async_sessionmaker(
+    autoflush=False,
+    expire_on_commit=False,
+    bind=async_engine
+)
+
+# Separate read-only pool for the SQL generated by the agent, so slow or runaway queries
+# cannot starve the API of connections nor write to the warehouse
+agent_engine = create_engine(
+    settings.AGENT_DB_URL or settings.DB_URL,
+    echo=False,
+    future=True,
+    poolclass=InstrumentedQueuePool,
+    pool_logging_name="agent",
+    pool_size=settings.AGENT_DB_POOL_SIZE,
+    max_overflow=settings.AGENT_DB_MAX_OVERFLOW,
+    pool_timeout=settings.AGENT_DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+apply_session_settings(agent_engine, {
+    'statement_timeout': str(settings.AGENT_DB_STATEMENT_TIMEOUT_MS),
+    'default_transaction_read_only': 'on',
+})
+
+AgentSession = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=agent_engine
+)
+
+def column_missing(table: str, column: str) -> str:
+    """
+    Returns a query with a row if a column of a public table does not exist.
+    """
+    return f"""
+        SELECT 1 WHERE NOT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = '{table}' AND column_name = '{column}'
+        )
+    """
+
+
+def column_type_differs(table: str, column: str, data_type: str) -> str:
+    """
+    Returns a query with a row if a column of a public table is not of a data type.
+    """
+    return f"""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = '{table}' AND column_name = '{column}'
+            AND data_type <> '{data_type}'
+    """
+
+
+def column_has_default(table: str, column: str) -> str:
+    """
+    Returns a query with a row if a column of a public table has a default.
+    """
+    return f"""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = '{table}' AND column_name = '{column}'
+            AND column_default IS NOT NULL
+    """
+
+
+def index_missing(index: str) -> str:
+    """
+    Returns a query with a row if an index of the public schema does not exist.
+    """
+    return f"""
+        SELECT 1 WHERE NOT EXISTS (
+            SELECT 1 FROM pg_indexes WHERE schemaname = 'public' AND indexname = '{index}'
+        )
+    """
+
+
+# `create_all` only creates missing tables: changes to existing tables are applied here.
+# Each statement comes with a query returning a row while it still has to be applied, as
+# ALTER TABLE locks the table even when it has nothing to change, and every API process,
+# pool worker and job worker runs these updates when it starts.
+SCHEMA_UPDATES = [
+    (
+        "ALTER TABLE public.rebuild_job ADD COLUMN accounts VARCHAR[] DEFAULT '{}'",
+        column_missing("rebuild_job", "accounts"),
+    ),
+    (
+        "ALTER TABLE public.rebuild_job ADD COLUMN sales_agents VARCHAR[] DEFAULT '{}'",
+        column_missing("rebuild_job", "sales_agents"),
+    ),
+    (
+        "CREATE INDEX ix_message_message_history_id_id ON public.message (message_history_id, id)",
+        index_missing("ix_message_message_history_id_id"),
+    ),
+    (
+        "ALTER TABLE public.message_history ADD COLUMN summary TEXT",
+        column_missing("message_history", "summary"),
+    ),
+    (
+        "ALTER TABLE public.message_history ADD COLUMN summarized_until_id INTEGER",
+        column_missing("message_history", "summarized_until_id"),
+    ),
+    (
+        "ALTER TABLE public.message ALTER COLUMN content TYPE TEXT",
+        column_type_differs("message", "content", "text"),
+    ),
+    (
+        "ALTER TABLE public.message ADD COLUMN tool_calls JSONB",
+        column_missing("message", "tool_calls"),
+    ),
+    (
+        "ALTER TABLE public.message_history ALTER COLUMN id TYPE BIGINT",
+        column_type_differs("message_history", "id", "bigint"),
+    ),
+    (
+        "ALTER TABLE public.message_history ALTER COLUMN id DROP DEFAULT",
+        column_has_default("message_history", "id"),
+    ),
+    (
+        "ALTER TABLE public.message ALTER COLUMN message_history_id TYPE BIGINT",
+        column_type_differs("message", "message_history_id", "bigint"),
+    ),
+    (
+        "CREATE SEQUENCE IF NOT EXISTS public.conversation_id_seq",
+        None,
+    ),
+]
+
+
+def apply_schema_updates() -> None:
+    """
+    Applies the statements in `SCHEMA_UPDATES` that the database still needs.
+    """
+    with engine.begin() as conn:
+        for statement, pending_query in SCHEMA_UPDATES:
+            if pending_query is None:
+                conn.execute(text(statement))
+            elif conn.execute(text(pending_query)).first() is not None:
+                print(f"Applying schema update: {statement}")
+                conn.execute(text(statement))
+
+
 Base.metadata.create_all(engine)
+apply_schema_updates()
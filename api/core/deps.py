@@ -1,5 +1,5 @@
-from core.database import Session
-from typing import Generator
+from core.database import AsyncSession, Session
+from typing import AsyncGenerator, Generator
 
 def get_session() -> Generator[Session, None, None]:
     """
@@ -13,4 +13,15 @@ def get_session() -> Generator[Session, None, None]:
     try:
         yield session
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Provides an async database session, ensuring proper resource management.
+
+    Yields:
+        AsyncSession:
+            A SQLAlchemy async session for executing database queries from `async def` routes.
+    """
+    async with AsyncSession() as session:
+        yield session
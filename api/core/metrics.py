@@ -0,0 +1,105 @@
+from collections import defaultdict
+import threading
+
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process registry of counters, gauges and timings.
+
+    Methods:
+        increment(name: str, value: float = 1) -> None:
+            Increments a counter.
+        set_gauge(name: str, value: float) -> None:
+            Sets the current value of a gauge.
+        observe(name: str, value: float) -> None:
+            Records an observation (e.g. a latency) of a timing.
+        snapshot() -> dict:
+            Returns a copy of every metric.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._timings: dict[str, dict[str, float]] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """
+        Increments a counter.
+
+        Args:
+            name (str):
+                The counter name.
+            value (float):
+                The amount to add.
+        """
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """
+        Sets the current value of a gauge.
+
+        Args:
+            name (str):
+                The gauge name.
+            value (float):
+                The current value.
+        """
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Records an observation of a timing, keeping its count, sum and max.
+
+        Args:
+            name (str):
+                The timing name.
+            value (float):
+                The observed value.
+        """
+        with self._lock:
+            timing = self._timings.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["sum"] += value
+            timing["max"] = max(timing["max"], value)
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        """
+        Returns the ratio between two counters.
+
+        Args:
+            numerator (str):
+                The counter on the numerator.
+            denominator (str):
+                The counter on the denominator.
+
+        Returns:
+            float:
+                The ratio, or 0 if the denominator is 0.
+        """
+        with self._lock:
+            total = self._counters.get(denominator, 0)
+            return self._counters.get(numerator, 0) / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        """
+        Returns a copy of every metric.
+
+        Returns:
+            dict:
+                The counters, gauges and timings (with their averages).
+        """
+        with self._lock:
+            timings = {
+                name: {**timing, "avg": timing["sum"] / timing["count"]}
+                for name, timing in self._timings.items()
+            }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": timings,
+            }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,86 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from core.metrics import metrics
+
+
+class PoolMetricsMixin:
+    """
+    Records how long each checkout waited for a connection of the pool, and updates the
+    usage gauges of the pool on every checkout and checkin.
+
+    The name of the pool in the metrics is its `pool_logging_name`, which SQLAlchemy keeps
+    when the pool is recreated (e.g. by `engine.dispose()`).
+    """
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            connection_record = super()._do_get()
+        except PoolTimeoutError:
+            metrics.increment(f"db.pool.{self._orig_logging_name}.timeouts")
+            raise
+        finally:
+            metrics.observe(
+                f"db.pool.{self._orig_logging_name}.checkout_seconds",
+                time.perf_counter() - started_at
+            )
+
+        record_pool_usage(self)
+        return connection_record
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        record_pool_usage(self)
+
+
+class InstrumentedQueuePool(PoolMetricsMixin, QueuePool):
+    """
+    `QueuePool` recording its checkout latency.
+    """
+
+
+class InstrumentedAsyncAdaptedQueuePool(PoolMetricsMixin, AsyncAdaptedQueuePool):
+    """
+    `AsyncAdaptedQueuePool` recording its checkout latency.
+    """
+
+
+def record_pool_usage(pool: QueuePool) -> None:
+    """
+    Updates the gauges of the connections in use of a pool.
+
+    Args:
+        pool (QueuePool): The pool to measure.
+    """
+    name = pool._orig_logging_name
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+
+    metrics.set_gauge(f"db.pool.{name}.size", pool.size())
+    metrics.set_gauge(f"db.pool.{name}.checked_out", checked_out)
+    metrics.set_gauge(f"db.pool.{name}.overflow", max(pool.overflow(), 0))
+    metrics.set_gauge(f"db.pool.{name}.saturation", checked_out / capacity if capacity else 0)
+
+
+def apply_session_settings(engine: Engine, session_settings: dict[str, str]) -> None:
+    """
+    Applies Postgres settings with SET to every new connection of an engine.
+
+    Args:
+        engine (Engine): The engine (the `sync_engine` of an async engine).
+        session_settings (dict[str, str]): The settings, e.g. {'statement_timeout': '15000'}.
+    """
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in session_settings.items():
+                cursor.execute(f"SET {name} = '{value}'")
+        finally:
+            cursor.close()
+        # Session-level settings outlive the transaction they were set in
+        dbapi_connection.commit()
@@ -0,0 +1,243 @@
+from datetime import datetime, timezone
+import threading
+import time
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core.configs import settings
+from core.database import Session as SessionFactory
+from models.rebuild_job_model import RebuildJobDB
+
+
+def enqueue_rebuild(
+    session: Session,
+    kind: str = "full",
+    accounts: list[str] | None = None,
+    sales_agents: list[str] | None = None
+) -> int:
+    """
+    Requests a rebuild of the derived tables, coalescing with an already queued one.
+
+    If a job of the same kind is still queued its `requested_count` is incremented, the
+    accounts and agents to refresh are merged into it and its id is returned, so N
+    requests arriving before a worker picks the job up result in a single rebuild.
+
+    Args:
+        session (Session):
+            The database session used to enqueue the job.
+        kind (str):
+            The kind of rebuild, "full" or "incremental". Default is "full".
+        accounts (list[str] | None):
+            The accounts to refresh, for incremental jobs.
+        sales_agents (list[str] | None):
+            The sales agents to refresh, for incremental jobs.
+
+    Returns:
+        int:
+            The id of the queued job.
+    """
+    stmt = insert(RebuildJobDB).values(
+        kind=kind,
+        status="queued",
+        requested_count=1,
+        accounts=accounts or [],
+        sales_agents=sales_agents or []
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RebuildJobDB.kind],
+        index_where=text("status = 'queued'"),
+        set_={
+            "requested_count": RebuildJobDB.requested_count + 1,
+            "accounts": RebuildJobDB.accounts.concat(stmt.excluded.accounts),
+            "sales_agents": RebuildJobDB.sales_agents.concat(stmt.excluded.sales_agents),
+        }
+    ).returning(RebuildJobDB.id)
+
+    job_id = session.execute(stmt).scalar_one()
+    session.commit()
+
+    return job_id
+
+
+def get_job(session: Session, job_id: int) -> RebuildJobDB | None:
+    """
+    Retrieves a rebuild job.
+
+    Args:
+        session (Session):
+            The database session.
+        job_id (int):
+            The job identifier.
+
+    Returns:
+        RebuildJobDB | None:
+            The job, or None if it does not exist.
+    """
+    return session.get(RebuildJobDB, job_id)
+
+
+def claim_next_job(session: Session) -> RebuildJobDB | None:
+    """
+    Marks the oldest queued job as running and returns it.
+
+    Rows locked by another worker are skipped, so several workers can poll the queue.
+
+    Args:
+        session (Session):
+            The database session.
+
+    Returns:
+        RebuildJobDB | None:
+            The claimed job, or None if the queue is empty.
+    """
+    stmt = (
+        select(RebuildJobDB)
+        .where(RebuildJobDB.status == "queued")
+        .order_by(RebuildJobDB.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+
+    job = session.scalars(stmt).first()
+    if job is None:
+        session.rollback()
+        return None
+
+    job.status = "running"
+    job.started_at = datetime.now(timezone.utc)
+    session.commit()
+
+    return job
+
+
+def finish_job(session: Session, job: RebuildJobDB, error: str | None = None) -> None:
+    """
+    Marks a running job as done, or as failed if an error is given.
+
+    Args:
+        session (Session):
+            The database session.
+        job (RebuildJobDB):
+            The running job.
+        error (str | None):
+            The error message if the job failed.
+    """
+    job.status = "failed" if error else "done"
+    job.error = error
+    job.finished_at = datetime.now(timezone.utc)
+    session.commit()
+
+
+def fail_orphaned_jobs(session: Session) -> None:
+    """
+    Marks as failed the jobs left running by a worker that died.
+
+    Must only be called while holding the rebuild lock, when no job can legitimately be
+    running.
+
+    Args:
+        session (Session):
+            The database session.
+    """
+    stmt = (
+        update(RebuildJobDB)
+        .where(RebuildJobDB.status == "running")
+        .values(
+            status="failed",
+            error="Interrupted: the worker stopped before finishing the job.",
+            finished_at=datetime.now(timezone.utc)
+        )
+    )
+    session.execute(stmt)
+    session.commit()
+
+
+def latest_finished_job_id(session: Session) -> int | None:
+    """
+    Returns the id of the most recent successful rebuild.
+
+    Args:
+        session (Session):
+            The database session.
+
+    Returns:
+        int | None:
+            The id of the last job marked as done, or None if there is none.
+    """
+    stmt = select(func.max(RebuildJobDB.id)).where(RebuildJobDB.status == "done")
+    return session.scalar(stmt)
+
+
+class RebuildWatcher:
+    """
+    Detects rebuilds finished by workers running in other processes.
+
+    The in-memory caches of an API process (agent registry, answer cache) are invalidated
+    directly when the rebuild runs in that process. When it runs elsewhere, this watcher
+    polls the job table (at most once per `interval_seconds`) and calls the registered
+    listeners when a new rebuild finished.
+
+    Args:
+        session_factory (sessionmaker):
+            Factory of database sessions.
+        interval_seconds (float):
+            Minimum time between two polls of the job table.
+
+    Methods:
+        add_listener(listener: Callable[[], None]) -> None:
+            Registers a function called when a new rebuild is detected.
+        check() -> None:
+            Polls the job table if the interval elapsed.
+    """
+    def __init__(self, session_factory, interval_seconds: float):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self._listeners = []
+        # Whether `_last_job_id` was polled yet: it is None too when no rebuild finished
+        self._initialized = False
+        self._last_job_id = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener) -> None:
+        """
+        Registers a function called when a new rebuild is detected.
+
+        Args:
+            listener (Callable[[], None]):
+                The function to call.
+        """
+        self._listeners.append(listener)
+
+    def check(self) -> None:
+        """
+        Polls the job table and notifies the listeners if a new rebuild finished.
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.interval_seconds:
+            return
+
+        with self._lock:
+            if now - self._last_check < self.interval_seconds:
+                return
+            self._last_check = now
+
+            with self.session_factory() as session:
+                job_id = latest_finished_job_id(session)
+
+            changed = self._initialized and job_id != self._last_job_id
+            self._initialized = True
+            self._last_job_id = job_id
+
+        if changed:
+            print(f"Rebuild job {job_id} finished, invalidating in-memory caches.")
+            for listener in self._listeners:
+                listener()
+
+
+rebuild_watcher = RebuildWatcher(
+    session_factory=SessionFactory,
+    interval_seconds=settings.REBUILD_WATCH_INTERVAL_SECONDS,
+)
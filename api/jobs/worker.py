@@ -0,0 +1,150 @@
+import threading
+import time
+
+from sqlalchemy import text
+
+from core.configs import settings
+from core.database import engine, Session
+from jobs.queue import claim_next_job, fail_orphaned_jobs, finish_job
+from src.database_operations import create_run_won_stage_data, refresh_won_stage_data_incrementally
+
+
+# Postgres advisory lock key held while a rebuild runs, so only one runs at a time
+REBUILD_LOCK_KEY = 7_310_021
+
+
+class RebuildWorker:
+    """
+    Worker that takes rebuild jobs from the queue and runs them.
+
+    It can run in a background thread of the API process (`start`/`stop`) or as a
+    separate process with `python -m jobs.worker`. A Postgres advisory lock guarantees
+    that a single rebuild runs at a time across every worker.
+
+    Args:
+        poll_interval_seconds (float):
+            Time to wait before polling again when the queue is empty.
+
+    Methods:
+        start() -> None:
+            Runs the worker in a background daemon thread.
+        stop() -> None:
+            Asks the worker to stop and waits for the current job.
+        run_forever() -> None:
+            Polls the queue until stopped.
+        run_once() -> bool:
+            Runs the next queued job, if any.
+    """
+    def __init__(self, poll_interval_seconds: float):
+        self.poll_interval_seconds = poll_interval_seconds
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Runs the worker in a background daemon thread.
+        """
+        self._thread = threading.Thread(
+            target=self.run_forever, name="rebuild-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Asks the worker to stop and waits for the current job to finish.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_forever(self) -> None:
+        """
+        Polls the queue and runs jobs until the worker is stopped.
+        """
+        while not self._stop_event.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                print(f"Rebuild worker error: {e}")
+                processed = False
+
+            if not processed:
+                self._stop_event.wait(self.poll_interval_seconds)
+
+    def run_once(self) -> bool:
+        """
+        Runs the next queued job while holding the rebuild lock.
+
+        Returns:
+            bool:
+                True if a job was run, False if the queue was empty or another worker
+                holds the lock.
+        """
+        with engine.connect() as lock_conn:
+            acquired = lock_conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": REBUILD_LOCK_KEY}
+            ).scalar()
+            if not acquired:
+                return False
+
+            try:
+                with Session() as session:
+                    fail_orphaned_jobs(session)
+
+                    job = claim_next_job(session)
+                    if job is None:
+                        return False
+
+                    print(f"Rebuild job {job.id} started ({job.requested_count} request(s)).")
+                    start = time.perf_counter()
+
+                    try:
+                        self.run_job(session, job)
+                    except Exception as e:
+                        session.rollback()
+                        finish_job(session, job, error=str(e))
+                        print(f"Rebuild job {job.id} failed: {e}")
+                    else:
+                        finish_job(session, job)
+                        print(f"Rebuild job {job.id} done in {time.perf_counter() - start:.1f}s.")
+
+                    return True
+
+            finally:
+                lock_conn.execute(
+                    text("SELECT pg_advisory_unlock(:key)"), {"key": REBUILD_LOCK_KEY}
+                )
+
+    def run_job(self, session, job) -> None:
+        """
+        Runs a rebuild job.
+
+        Incremental jobs fall back to a full rebuild when the incremental refresh is not
+        possible (e.g. the RFM bin edges changed).
+
+        Args:
+            session (Session):
+                The database session.
+            job (RebuildJobDB):
+                The claimed job.
+        """
+        if job.kind == "incremental":
+            refreshed = refresh_won_stage_data_incrementally(
+                schema=settings.DB_SCHEMA,
+                session=session,
+                accounts=sorted(set(job.accounts)),
+                sales_agents=sorted(set(job.sales_agents))
+            )
+            if refreshed:
+                return
+
+        create_run_won_stage_data(
+            schema=settings.DB_SCHEMA,
+            session=session
+        )
+
+
+if __name__ == "__main__":
+    print("Starting rebuild worker...")
+    RebuildWorker(
+        poll_interval_seconds=settings.REBUILD_WORKER_POLL_SECONDS
+    ).run_forever()
@@ -4,6 +4,17 @@ from fastapi import FastAPI
 from src.database_operations import router as database_router
 from src.rag_operations import router as rag_router
 from src.historic_messages import router as historic_router
+from src.metrics_operations import router as metrics_router
+from src.analytics_operations import router as analytics_router
+from core.configs import settings
+from chat.writer import chat_writer
+from jobs.queue import rebuild_watcher
+from jobs.worker import RebuildWorker
+from utils.agent_registry import agent_registry
+from utils.answer_cache import answer_cache
+from utils.gold_analytics import clear_analytics_cache
+from utils.process_pool import shutdown_process_pool
+from core.database import agent_engine, async_engine
 from contextlib import asynccontextmanager
 
 
@@ -17,11 +28,40 @@ async def lifespan(app: FastAPI):
      Returns:
         None
     """
-    pass
+    # Reflecting the schema and compiling the agent once here keeps it off the request path
+    try:
+        agent_registry.warm_up()
+        print("Text-to-SQL agent warmed up.")
+    except Exception as e:
+        print(f"Could not warm up the text-to-SQL agent, it will be built on first use: {e}")
+
+    # Rebuilds finished by workers in other processes must also invalidate this process
+    rebuild_watcher.add_listener(agent_registry.invalidate)
+    rebuild_watcher.add_listener(answer_cache.clear)
+    rebuild_watcher.add_listener(clear_analytics_cache)
+
+    rebuild_worker = None
+    if settings.REBUILD_WORKER_IN_PROCESS:
+        rebuild_worker = RebuildWorker(
+            poll_interval_seconds=settings.REBUILD_WORKER_POLL_SECONDS
+        )
+        rebuild_worker.start()
+
+    yield
+
+    if rebuild_worker is not None:
+        rebuild_worker.stop()
+
+    # The chat messages still queued are written before the engines are disposed
+    await chat_writer.close()
+    shutdown_process_pool()
+    await async_engine.dispose()
+    agent_engine.dispose()
 
 
 app = FastAPI(
     title='CRM Analysis API',
+    lifespan=lifespan,
     docs_url="/docs",
     redoc_url=None,  
     openapi_url="/docs/openapi.json"
@@ -31,6 +71,8 @@ prefix = '/api'
 app.include_router(database_router, prefix=prefix)
 app.include_router(rag_router, prefix=prefix)
 app.include_router(historic_router, prefix=prefix)
+app.include_router(metrics_router, prefix=prefix)
+app.include_router(analytics_router, prefix=prefix)
 
 
 if __name__ == "__main__":
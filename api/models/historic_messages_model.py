@@ -1,6 +1,8 @@
+from datetime import datetime
 from typing import List
 
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Index, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 from chat.messages import Message, MessageHistory, Role
@@ -26,12 +28,19 @@ class MessageHistoryDB(Base):
         __tablename__ (str): 
             The name of the database table ("message_history").
         id (int): 
-            The primary key identifier for the chat history.
+            The primary key identifier for the chat history, a time-ordered 64-bit ID
+            allocated by `utils.conversation_ids`.
         messages (List[MessageDB]): 
-            A list of messages related to this chat history.
+            A list of messages related to this chat history, ordered by ID. It is never
+            lazy loaded: queries must load it explicitly (e.g. with `selectinload`), so long
+            histories are not loaded by accident.
+        summary (str | None): 
+            A rolling summary of the messages that no longer fit in the memory of the agent.
+        summarized_until_id (int | None): 
+            The ID of the last message folded into `summary`.
 
     Methods:
-        to_message_history() -> MessageHistory:
+        to_message_history(messages: List[MessageDB] | None = None) -> MessageHistory:
             Converts the database object into a `MessageHistory` instance.
         to_list() -> list:
             Converts the stored messages into a list of dictionaries.
@@ -39,22 +48,31 @@ class MessageHistoryDB(Base):
 
     __tablename__ = "message_history"
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
     messages: Mapped[List["MessageDB"]] = relationship(
         back_populates="message_history",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="MessageDB.id",
+        lazy="raise"
     )
+    summary: Mapped[str | None] = mapped_column(Text)
+    summarized_until_id: Mapped[int | None]
 
-    def to_message_history(self) -> MessageHistory:
+    def to_message_history(self, messages: List["MessageDB"] | None = None) -> MessageHistory:
         """
         Converts the stored messages into a `MessageHistory` object.
 
+        Args:
+            messages (List[MessageDB] | None):
+                The messages to convert, e.g. a window of the most recent ones. Default
+                is None, for all the messages of the chat history.
+
         Returns:
             MessageHistory:
-                A `MessageHistory` instance containing all messages.
+                A `MessageHistory` instance containing the messages and the summary.
         """
-        message_history = MessageHistory()
-        for msg in self.messages:
+        message_history = MessageHistory(summary=self.summary)
+        for msg in (self.messages if messages is None else messages):
             message_history.add_message(
                 Message(
                     role=Role.get(msg.role),
@@ -69,7 +87,7 @@ class MessageHistoryDB(Base):
 
         Returns:
             list:
-                A list containing message dictionaries with `role` and `content`.
+                A list containing message dictionaries with `id`, `role` and `content`.
         """
         msg_list = []
         for msg in self.messages:
@@ -91,10 +109,14 @@ class MessageDB(Base):
             The role of the sender (e.g., "human", "assistant", "system").
         content (str): 
             The actual message content.
+        tool_calls (list[dict] | None): 
+            The tools the agent called to write an assistant message, with their arguments.
         message_history_id (int): 
             The foreign key linking this message to a chat history.
         message_history (MessageHistoryDB): 
             The associated chat history.
+        queries (List[AgentQueryDB]): 
+            The database queries the agent ran to write an assistant message.
 
     Methods:
         to_dict() -> dict:
@@ -102,14 +124,26 @@ class MessageDB(Base):
     """
 
     __tablename__ = "message"
+    # Backs the cursor pagination of the messages of a chat history
+    __table_args__ = (
+        Index("ix_message_message_history_id_id", "message_history_id", "id"),
+        {'schema': 'public'}
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     role: Mapped[str] = mapped_column(String(20))
-    content: Mapped[str] = mapped_column(String(2000))
+    content: Mapped[str] = mapped_column(Text)
+    tool_calls: Mapped[list | None] = mapped_column(JSONB(none_as_null=True))
     message_history_id: Mapped[int] = mapped_column(
-        ForeignKey("public.message_history.id"))
+        BigInteger, ForeignKey("public.message_history.id"))
     message_history: Mapped["MessageHistoryDB"] = relationship(
-        back_populates="messages")
+        back_populates="messages", lazy="raise")
+    queries: Mapped[List["AgentQueryDB"]] = relationship(
+        back_populates="message",
+        cascade="all, delete-orphan",
+        order_by="AgentQueryDB.position",
+        lazy="raise"
+    )
 
     def to_dict(self) -> dict:
         """
@@ -117,6 +151,55 @@ class MessageDB(Base):
 
         Returns:
             dict:
-                A dictionary containing the `role` and `content` of the message.
+                A dictionary containing the `id`, `role` and `content` of the message.
         """
-        return {'role': self.role, 'content': self.content}
+        return {'id': self.id, 'role': self.role, 'content': self.content}
+
+
+class AgentQueryDB(Base):
+    """
+    Represents a database query the agent ran to write an assistant message.
+
+    The queries can be replayed against fresh data without the LLM: the SQL queries as
+    they are, and the typed tools with the same arguments.
+
+    Attributes:
+        __tablename__ (str): 
+            The name of the database table ("agent_query").
+        id (int): 
+            The primary key identifier for the query.
+        message_id (int): 
+            The foreign key linking this query to its assistant message.
+        position (int): 
+            The order of the query among the queries of the message.
+        tool (str): 
+            The tool that ran the query ("sql_db_query" or a typed tool).
+        arguments (dict): 
+            The arguments the tool was called with.
+        sql (str | None): 
+            The SQL of the query, for "sql_db_query".
+        row_count (int | None): 
+            The number of rows returned, None if the query failed.
+        seconds (float): 
+            How long the query took.
+        error (str | None): 
+            The error raised by the query, if any.
+        created_at (datetime): 
+            When the query was stored.
+        message (MessageDB): 
+            The associated assistant message.
+    """
+
+    __tablename__ = "agent_query"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    message_id: Mapped[int] = mapped_column(ForeignKey("public.message.id"), index=True)
+    position: Mapped[int]
+    tool: Mapped[str] = mapped_column(String(64))
+    arguments: Mapped[dict] = mapped_column(JSONB)
+    sql: Mapped[str | None] = mapped_column(Text)
+    row_count: Mapped[int | None]
+    seconds: Mapped[float] = mapped_column(Float)
+    error: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    message: Mapped["MessageDB"] = relationship(back_populates="queries", lazy="raise")
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from models.historic_messages_model import Base
+
+
+class IngestProgressDB(Base):
+    """
+    Represents the progress of the initial load of a source table from a CSV file.
+
+    The rows are loaded in chunks and this row is updated in the same transaction as
+    each chunk, so an interrupted load resumes right after the last committed chunk.
+
+    Attributes:
+        __tablename__ (str): 
+            The name of the database table ("ingest_progress").
+        table_schema (str): 
+            The schema of the loaded table.
+        table_name (str): 
+            The name of the loaded table.
+        source (str): 
+            The CSV file (or archive member) the rows are read from.
+        rows_loaded (int): 
+            How many data rows of the source are committed.
+        status (str): 
+            The load status ("running" or "done").
+        updated_at (datetime): 
+            When the last chunk was committed.
+    """
+
+    __tablename__ = "ingest_progress"
+    __table_args__ = {'schema': 'public'}
+
+    table_schema: Mapped[str] = mapped_column(String(63), primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    source: Mapped[str] = mapped_column(String)
+    rows_loaded: Mapped[int] = mapped_column(BigInteger, default=0)
+    status: Mapped[str] = mapped_column(String(20), default="running")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, String, Text, func, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from models.historic_messages_model import Base
+
+
+class RebuildJobDB(Base):
+    """
+    Represents a queued, running or finished rebuild of the derived `_source` tables.
+
+    At most one job per kind can be queued at a time (partial unique index), so bursts
+    of requests coalesce into a single rebuild.
+
+    Attributes:
+        __tablename__ (str): 
+            The name of the database table ("rebuild_job").
+        id (int): 
+            The primary key identifier for the job.
+        kind (str): 
+            The kind of rebuild ("full" or "incremental").
+        status (str): 
+            The job status ("queued", "running", "done" or "failed").
+        requested_count (int): 
+            How many requests were coalesced into this job.
+        accounts (list[str]): 
+            The accounts to refresh, for incremental jobs.
+        sales_agents (list[str]): 
+            The sales agents to refresh, for incremental jobs.
+        error (str, optional): 
+            The error message if the job failed.
+        created_at (datetime): 
+            When the job was first requested.
+        started_at (datetime, optional): 
+            When a worker started the job.
+        finished_at (datetime, optional): 
+            When the job finished.
+    """
+
+    __tablename__ = "rebuild_job"
+    __table_args__ = (
+        Index(
+            "uq_rebuild_job_queued_kind", "kind",
+            unique=True,
+            postgresql_where=text("status = 'queued'")
+        ),
+        {'schema': 'public'},
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(20), default="full")
+    status: Mapped[str] = mapped_column(String(20), default="queued")
+    requested_count: Mapped[int] = mapped_column(default=1)
+    accounts: Mapped[list[str]] = mapped_column(ARRAY(String), default=list)
+    sales_agents: Mapped[list[str]] = mapped_column(ARRAY(String), default=list)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now())
+    started_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True)
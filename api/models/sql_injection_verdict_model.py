@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from models.historic_messages_model import Base
+
+
+class SQLInjectionVerdictDB(Base):
+    """
+    Represents a persisted SQL injection verdict for a normalized user input.
+
+    Attributes:
+        __tablename__ (str): 
+            The name of the database table ("sql_injection_verdict").
+        input_hash (str): 
+            The SHA-256 hash of the normalized user input.
+        status (str): 
+            The verdict ("Secure" or "Insecure").
+        created_at (datetime): 
+            When the verdict was stored.
+    """
+
+    __tablename__ = "sql_injection_verdict"
+
+    input_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    status: Mapped[str] = mapped_column(String(10))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now())
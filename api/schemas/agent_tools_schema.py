@@ -0,0 +1,113 @@
+from typing import Dict, List, Literal
+
+from pydantic import BaseModel, Field
+
+
+TopNMetric = Literal[
+    "total_revenue",
+    "won_deals",
+    "average_deal_value",
+    "average_sales_cycle_duration",
+    "customers",
+]
+
+TopNDimension = Literal[
+    "customer",
+    "sales_agent",
+    "sales_agent_manager",
+    "sales_agent_regional_office",
+    "product",
+    "product_series",
+    "customer_sector",
+    "customer_office_location",
+]
+
+SegmentKind = Literal["rfm", "cltv"]
+
+GoldView = Literal[
+    "customer-profitability-analysis",
+    "customer-retention-analysis",
+    "customer-segmentation-analysis",
+    "products-sales-analysis",
+    "regional-sales-performance",
+    "sales-agent-performance",
+    "sales-performance-analysis",
+    "sector-wise-revenue-analysis",
+]
+
+
+class TopNByMetricArgs(BaseModel):
+    """
+    Represents the arguments of the `top_n_by_metric` agent tool.
+
+    Attributes:
+        metric (TopNMetric):
+            The metric computed over the won deals of each group.
+        group_by (TopNDimension):
+            The dimension the deals are grouped by.
+        n (int):
+            The number of groups to return.
+        ascending (bool):
+            Whether the lowest values come first instead of the highest ones.
+    """
+    metric: TopNMetric = Field(..., description="The metric computed over the won deals of each group.")
+    group_by: TopNDimension = Field(..., description="The dimension the won deals are grouped by.")
+    n: int = Field(10, ge=1, le=100, description="The number of groups to return.")
+    ascending: bool = Field(False, description="Return the lowest values first instead of the highest.")
+
+class CustomerLookupArgs(BaseModel):
+    """
+    Represents the arguments of the `customer_lookup` agent tool.
+
+    Attributes:
+        customer (str):
+            The name of the customer account.
+    """
+    customer: str = Field(..., description="The name of the customer account, e.g. 'Kan-code'.")
+
+class SegmentSummaryArgs(BaseModel):
+    """
+    Represents the arguments of the `segment_summary` agent tool.
+
+    Attributes:
+        segment_by (SegmentKind):
+            The segmentation to summarize: "rfm" (recency, frequency, monetary) or "cltv"
+            (predicted customer lifetime value).
+    """
+    segment_by: SegmentKind = Field(
+        "rfm",
+        description="'rfm' for the RFM segments or 'cltv' for the predicted lifetime value segments."
+    )
+
+class GoldViewQueryArgs(BaseModel):
+    """
+    Represents the arguments of the `query_gold_view` agent tool.
+
+    Attributes:
+        view (GoldView):
+            The gold view to read.
+        filters (Dict[str, str | float] | None):
+            The filter values by filter name; the accepted filters depend on the view.
+        limit (int):
+            The maximum number of rows to return.
+    """
+    view: GoldView = Field(..., description="The gold view to read.")
+    filters: Dict[str, str | float] | None = Field(
+        None,
+        description="Filter values by filter name; the accepted filters of each view are listed in the tool description."
+    )
+    limit: int = Field(10, ge=1, le=100, description="The maximum number of rows to return.")
+
+class DescribeTablesArgs(BaseModel):
+    """
+    Represents the arguments of the `describe_tables` agent tool.
+
+    Attributes:
+        tables (List[str]):
+            The names of the tables to describe.
+    """
+    tables: List[str] = Field(
+        ...,
+        min_length=1,
+        description="The names of the tables to describe, e.g. ['stg-won_deal_stage']."
+    )
@@ -0,0 +1,119 @@
+from typing import Generic, List, TypeVar
+
+from pydantic import BaseModel
+
+
+RowT = TypeVar("RowT", bound=BaseModel)
+
+
+class AnalyticsPage(BaseModel, Generic[RowT]):
+    """
+    Represents a page of rows of a gold model.
+
+    Attributes:
+        items (List[RowT]): 
+            The rows of the page.
+        total (int): 
+            The number of rows matching the filters, across every page.
+        limit (int): 
+            The maximum number of rows of the page.
+        offset (int): 
+            The number of matching rows skipped before the page.
+    """
+    items: List[RowT]
+    total: int
+    limit: int
+    offset: int
+
+
+class CustomerProfitabilityRow(BaseModel):
+    """
+    Represents a customer ranked by expected profit within its RFM segment.
+    """
+    customer: str
+    customer_revenue: float | None
+    customer_recency_frequency_monetary_segment: str | None
+    customer_average_transaction_value: float | None
+    actual_customer_lifetime_value: float | None
+    customer_expected_average_profit: float | None
+    profitability_rank: int
+
+
+class CustomerRetentionRow(BaseModel):
+    """
+    Represents a won deal of a customer likely to be alive (probability above 0.7).
+    """
+    customer: str
+    customer_recency_frequency_monetary_segment: str | None
+    prob_alive_customer: float | None
+    customer_engagement_score: float | None
+
+
+class CustomerSegmentationRow(BaseModel):
+    """
+    Represents the RFM and CLTV segmentation of a customer.
+    """
+    customer: str
+    customer_revenue: float | None
+    customer_office_location: str | None
+    customer_recency_frequency_monetary_segment: str | None
+    customer_average_transaction_value: float | None
+    customer_engagement_score: float | None
+    actual_customer_lifetime_value: float | None
+    customer_expected_purchases_week: float | None
+    customer_expected_purchases_half_year: float | None
+    customer_expected_purchases_year: float | None
+    customer_expected_average_profit: float | None
+    prob_alive_customer: float | None
+    predicted_year_customer_lifetime_value: float | None
+    predicted_customer_lifetime_value_segment: str | None
+
+
+class ProductSalesRow(BaseModel):
+    """
+    Represents the won sales of a product, ranked by sales value.
+    """
+    product: str
+    product_series: str | None
+    total_sales_value: float | None
+    total_opportunities: int
+    sales_rank: int
+
+
+class RegionalSalesRow(BaseModel):
+    """
+    Represents the won sales of a regional office.
+    """
+    sales_agent_regional_office: str
+    total_sales_value: float | None
+    average_won_deal_effectiveness: float | None
+
+
+class SalesAgentPerformanceRow(BaseModel):
+    """
+    Represents the won sales and close rate of a sales agent.
+    """
+    sales_agent: str
+    total_sales_value: float | None
+    average_sales_cycle_duration: float | None
+    average_won_deal_effectiveness: float | None
+
+
+class SalesPerformanceRow(BaseModel):
+    """
+    Represents the won opportunities, revenue and sales cycle of a sales agent.
+    """
+    sales_agent: str
+    total_opportunities: int
+    total_revenue: float | None
+    avg_close_rate: float | None
+    avg_sales_cycle_duration: float | None
+
+
+class SectorRevenueRow(BaseModel):
+    """
+    Represents the won revenue and sales cycle of a customer sector.
+    """
+    customer_sector: str
+    total_revenue: float | None
+    average_sales_cycle_duration: float | None
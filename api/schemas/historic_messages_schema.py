@@ -1,4 +1,19 @@
-from pydantic import BaseModel, NonNegativeInt
+from datetime import datetime
+from typing import Annotated, List, Literal
+
+from pydantic import BaseModel, Field, NonNegativeInt, PlainSerializer, PositiveInt, WithJsonSchema
+
+from schemas.sql_agentic_rag_schema import SerializableChatSchema
+
+
+# Conversation IDs exceed the 2^53 safe integers of JavaScript, so the API exchanges them
+# as strings of digits (integers are still accepted as input)
+ConversationId = Annotated[
+    NonNegativeInt,
+    PlainSerializer(str, return_type=str, when_used="json"),
+    WithJsonSchema({"type": "string", "pattern": "^[0-9]+$", "examples": ["370192741713313793"]}),
+]
+
 
 class ExampleSchema(BaseModel):
     """
@@ -21,10 +36,83 @@ class Message(BaseModel):
     Represents a user message containing a query and a reference to message history.
 
     Attributes:
-        message_history_id (NonNegativeInt): 
-            A non-negative integer representing the message history ID.
+        message_history_id (ConversationId): 
+            The message history ID, as a string of digits.
         query (str): 
             The content of the query sent by the user.
+        response_mode (Literal["full", "turn"]): 
+            Whether the answer returns the whole chat history ("full") or only the new
+            question and answer ("turn").
     """
-    message_history_id: NonNegativeInt
+    message_history_id: ConversationId
     query: str
+    response_mode: Literal["full", "turn"] = "full"
+
+class HistoricMessagesRequest(BaseModel):
+    """
+    Represents a request for a page of the messages of a chat history.
+
+    Attributes:
+        message_history_id (ConversationId): 
+            The message history ID, as a string of digits.
+        before_id (PositiveInt | None): 
+            The cursor returned with the previous page, or None for the most recent messages.
+        limit (int): 
+            The maximum number of messages of the page, between 1 and 500.
+    """
+    message_history_id: ConversationId
+    before_id: PositiveInt | None = None
+    limit: int = Field(50, ge=1, le=500)
+
+class HistoricMessagesPage(BaseModel):
+    """
+    Represents a page of the messages of a chat history.
+
+    Attributes:
+        messages (List[SerializableChatSchema]): 
+            The messages of the page, oldest first.
+        next_before_id (int | None): 
+            The cursor of the page of older messages, or None if there are none.
+    """
+    messages: List[SerializableChatSchema]
+    next_before_id: int | None
+
+class ChatSession(BaseModel):
+    """
+    Represents a newly allocated chat session.
+
+    Attributes:
+        message_history_id (ConversationId): 
+            The time-ordered 64-bit ID of the chat history, as a string of digits.
+        created_at (datetime): 
+            When the ID was allocated.
+    """
+    message_history_id: ConversationId
+    created_at: datetime
+
+class PruneChatSessionsRequest(BaseModel):
+    """
+    Represents a request to delete the chat sessions created before a moment.
+
+    Attributes:
+        before (datetime): 
+            The sessions allocated before this moment (UTC if naive) are deleted, with
+            their messages and agent queries. Sessions with legacy IDs are always older.
+    """
+    before: datetime
+
+class PruneChatSessionsResult(BaseModel):
+    """
+    Represents the number of rows deleted by a prune of the chat sessions.
+
+    Attributes:
+        message_histories (int): 
+            The number of deleted chat histories.
+        messages (int): 
+            The number of deleted messages.
+        agent_queries (int): 
+            The number of deleted agent queries.
+    """
+    message_histories: int
+    messages: int
+    agent_queries: int
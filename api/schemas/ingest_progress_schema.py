@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class IngestProgressSchema(BaseModel):
+    """
+    Represents the progress of the initial load of a source table.
+
+    Attributes:
+        table_schema (str): 
+            The schema of the loaded table.
+        table_name (str): 
+            The name of the loaded table.
+        source (str): 
+            The CSV file (or archive member) the rows are read from.
+        rows_loaded (int): 
+            How many data rows of the source are committed.
+        status (Literal["running", "done"]): 
+            The load status.
+        updated_at (datetime): 
+            When the last chunk was committed.
+    """
+    table_schema: str
+    table_name: str
+    source: str
+    rows_loaded: int
+    status: Literal["running", "done"]
+    updated_at: datetime
@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class RebuildJobSchema(BaseModel):
+    """
+    Represents the status of a rebuild job.
+
+    Attributes:
+        id (int): 
+            The job identifier.
+        kind (str): 
+            The kind of rebuild ("full" or "incremental").
+        status (Literal["queued", "running", "done", "failed"]): 
+            The current status of the job.
+        requested_count (int): 
+            How many requests were coalesced into this job.
+        accounts (list[str]): 
+            The accounts to refresh, for incremental jobs.
+        sales_agents (list[str]): 
+            The sales agents to refresh, for incremental jobs.
+        error (str | None): 
+            The error message if the job failed.
+        created_at (datetime): 
+            When the job was first requested.
+        started_at (datetime | None): 
+            When a worker started the job.
+        finished_at (datetime | None): 
+            When the job finished.
+    """
+    id: int
+    kind: str
+    status: Literal["queued", "running", "done", "failed"]
+    requested_count: int
+    accounts: list[str]
+    sales_agents: list[str]
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Literal
+from pydantic import BaseModel, Field
+from typing import Any, List, Literal
 
 class SQLInjectionStatus(BaseModel):
     """
@@ -8,18 +8,99 @@ class SQLInjectionStatus(BaseModel):
     Attributes:
         status (Literal["Insecure", "Secure"]): 
             A status indicating whether the SQL query is "Secure" or "Insecure".
+        decided_by (Literal["rules", "cache", "llm"]): 
+            The path that made the decision: the local rule-based detector, the verdict
+            cache or the LLM.
+        rule (str | None): 
+            The local rule that decided the status, if any.
     """
     status: Literal["Insecure", "Secure"]
+    decided_by: Literal["rules", "cache", "llm"] = "llm"
+    rule: str | None = None
+
+class SQLInjectionBatchStatus(SQLInjectionStatus):
+    """
+    Represents the security status of one input of a batch, which may have failed.
+
+    Attributes:
+        status (Literal["Insecure", "Secure"] | None): 
+            A status indicating whether the input is "Secure" or "Insecure", or None if
+            its classification failed.
+        error (str | None): 
+            Why the classification of the input failed, if it did.
+    """
+    status: Literal["Insecure", "Secure"] | None
+    error: str | None = None
+
+class SQLInjectionBatchRequest(BaseModel):
+    """
+    Represents a batch of user inputs to be screened for SQL injection.
+
+    Attributes:
+        queries (List[str]): 
+            The user inputs, at most 1000 per request.
+    """
+    queries: List[str] = Field(..., min_length=1, max_length=1000)
 
 class SerializableChatSchema(BaseModel):
     """
     Represents a serializable chat message.
 
     Attributes:
+        id (int | None): 
+            The ID of the stored message, used to replay the queries of an answer.
         role (Literal["human", "assistant"]): 
             The role of the sender, either "human" or "assistant".
         content (str): 
             The content of the message.
     """
+    id: int | None = None
     role: Literal["human", "assistant"]
     content: str
+
+class ReplayedQuery(BaseModel):
+    """
+    Represents a stored query of the agent run again against the current data.
+
+    Attributes:
+        position (int): 
+            The order of the query among the queries of the answer.
+        tool (str): 
+            The tool that ran the query ("sql_db_query" or a typed tool).
+        arguments (dict): 
+            The arguments the tool was called with.
+        sql (str | None): 
+            The SQL of the query, for "sql_db_query".
+        result (Any): 
+            The rows of the SQL query, or the JSON result of the typed tool.
+        row_count (int | None): 
+            The number of rows returned, None if the query failed.
+        truncated (bool): 
+            Whether the SQL query returned more rows than the sandbox fetches.
+        seconds (float): 
+            How long the query took.
+        error (str | None): 
+            The error raised by the query, if any.
+    """
+    position: int
+    tool: str
+    arguments: dict
+    sql: str | None = None
+    result: Any = None
+    row_count: int | None = None
+    truncated: bool = False
+    seconds: float
+    error: str | None = None
+
+class AgentReplay(BaseModel):
+    """
+    Represents the replay of the queries of an answer of the agent.
+
+    Attributes:
+        message_id (int): 
+            The ID of the assistant message.
+        queries (List[ReplayedQuery]): 
+            The queries that succeeded when the answer was written, run again.
+    """
+    message_id: int
+    queries: List[ReplayedQuery]
@@ -0,0 +1,379 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+
+from core.deps import get_session
+from core.metrics import metrics
+from schemas.analytics_schema import (
+    AnalyticsPage,
+    CustomerProfitabilityRow,
+    CustomerRetentionRow,
+    CustomerSegmentationRow,
+    ProductSalesRow,
+    RegionalSalesRow,
+    SalesAgentPerformanceRow,
+    SalesPerformanceRow,
+    SectorRevenueRow,
+)
+from utils.gold_analytics import get_gold_model_page
+
+
+router = APIRouter(prefix='/analytics', tags=['Analytics'])
+
+LIMIT = Query(100, ge=1, le=1000, description='Maximum number of rows of the page')
+OFFSET = Query(0, ge=0, description='Number of matching rows to skip')
+
+
+def serve_gold_model_page(
+    request: Request, session, key: str, filters: dict, limit: int, offset: int
+) -> Response:
+    """
+    Serves a page of a gold model with an ETag, answering 304 when the client has it already.
+
+    Args:
+        request (Request):
+            The request, whose If-None-Match header is checked.
+        session (Session):
+            The database session.
+        key (str):
+            The key of the gold model (e.g. 'sales-agent-performance').
+        filters (dict):
+            The filter values by parameter name; None values are ignored.
+        limit (int):
+            The maximum number of rows of the page.
+        offset (int):
+            The number of matching rows to skip.
+
+    Returns:
+        Response:
+            The JSON page, or an empty 304 response if it did not change.
+    """
+    page = get_gold_model_page(session, key, filters, limit, offset)
+    headers = {"ETag": page.etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+        if "*" in etags or page.etag in etags:
+            metrics.increment("analytics.not_modified")
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=page.body, media_type="application/json", headers=headers)
+
+
+@router.get(
+    '/customer-profitability-analysis/',
+    status_code=200,
+    description='Customers ranked by expected average profit within their RFM segment',
+    response_model=AnalyticsPage[CustomerProfitabilityRow]
+)
+def get_customer_profitability(
+    request: Request,
+    customer: str | None = None,
+    segment: str | None = None,
+    max_rank: int | None = Query(None, ge=1),
+    limit: int = LIMIT,
+    offset: int = OFFSET,
+    session = Depends(get_session)
+) -> Response:
+    """
+    Serves the `customer_profitability_analysis` gold model.
+
+    Args:
+        request (Request):
+            The request, for conditional GET.
+        customer (str | None):
+            Only the rows of this customer.
+        segment (str | None):
+            Only the customers of this RFM segment.
+        max_rank (int | None):
+            Only the customers ranked at most this (1 is the most profitable).
+        limit (int):
+            The maximum number of rows of the page.
+        offset (int):
+            The number of matching rows to skip.
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        Response:
+            An `AnalyticsPage` of `CustomerProfitabilityRow`, or 304 if unchanged.
+    """
+    return serve_gold_model_page(
+        request, session, 'customer-profitability-analysis', {'customer': customer, 'segment': segment, 'max_rank': max_rank}, limit, offset
+    )
+
+
+@router.get(
+    '/customer-retention-analysis/',
+    status_code=200,
+    description='Won deals of the customers likely to be alive, by engagement score',
+    response_model=AnalyticsPage[CustomerRetentionRow]
+)
+def get_customer_retention(
+    request: Request,
+    customer: str | None = None,
+    segment: str | None = None,
+    min_prob_alive: float | None = Query(None, ge=0, le=1),
+    limit: int = LIMIT,
+    offset: int = OFFSET,
+    session = Depends(get_session)
+) -> Response:
+    """
+    Serves the `customer_retention_analysis` gold model.
+
+    Args:
+        request (Request):
+            The request, for conditional GET.
+        customer (str | None):
+            Only the rows of this customer.
+        segment (str | None):
+            Only the customers of this RFM segment.
+        min_prob_alive (float | None):
+            Only the customers alive with at least this probability.
+        limit (int):
+            The maximum number of rows of the page.
+        offset (int):
+            The number of matching rows to skip.
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        Response:
+            An `AnalyticsPage` of `CustomerRetentionRow`, or 304 if unchanged.
+    """
+    return serve_gold_model_page(
+        request, session, 'customer-retention-analysis', {'customer': customer, 'segment': segment, 'min_prob_alive': min_prob_alive}, limit, offset
+    )
+
+
+@router.get(
+    '/customer-segmentation-analysis/',
+    status_code=200,
+    description='RFM and CLTV segmentation of the customers, by predicted yearly CLTV',
+    response_model=AnalyticsPage[CustomerSegmentationRow]
+)
+def get_customer_segmentation(
+    request: Request,
+    customer: str | None = None,
+    segment: str | None = None,
+    cltv_segment: str | None = None,
+    min_prob_alive: float | None = Query(None, ge=0, le=1),
+    limit: int = LIMIT,
+    offset: int = OFFSET,
+    session = Depends(get_session)
+) -> Response:
+    """
+    Serves the `customer_segmentation_analysis` gold model.
+
+    Args:
+        request (Request):
+            The request, for conditional GET.
+        customer (str | None):
+            Only the rows of this customer.
+        segment (str | None):
+            Only the customers of this RFM segment.
+        cltv_segment (str | None):
+            Only the customers of this predicted CLTV segment ('Low', 'Medium' or 'High').
+        min_prob_alive (float | None):
+            Only the customers alive with at least this probability.
+        limit (int):
+            The maximum number of rows of the page.
+        offset (int):
+            The number of matching rows to skip.
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        Response:
+            An `AnalyticsPage` of `CustomerSegmentationRow`, or 304 if unchanged.
+    """
+    return serve_gold_model_page(
+        request, session, 'customer-segmentation-analysis', {'customer': customer, 'segment': segment, 'cltv_segment': cltv_segment, 'min_prob_alive': min_prob_alive}, limit, offset
+    )
+
+
+@router.get(
+    '/products-sales-analysis/',
+    status_code=200,
+    description='Won sales of each product, by sales rank',
+    response_model=AnalyticsPage[ProductSalesRow]
+)
+def get_products_sales(
+    request: Request,
+    product: str | None = None,
+    product_series: str | None = None,
+    limit: int = LIMIT,
+    offset: int = OFFSET,
+    session = Depends(get_session)
+) -> Response:
+    """
+    Serves the `products_sales_analysis` gold model.
+
+    Args:
+        request (Request):
+            The request, for conditional GET.
+        product (str | None):
+            Only the rows of this product.
+        product_series (str | None):
+            Only the products of this series.
+        limit (int):
+            The maximum number of rows of the page.
+        offset (int):
+            The number of matching rows to skip.
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        Response:
+            An `AnalyticsPage` of `ProductSalesRow`, or 304 if unchanged.
+    """
+    return serve_gold_model_page(
+        request, session, 'products-sales-analysis', {'product': product, 'product_series': product_series}, limit, offset
+    )
+
+
+@router.get(
+    '/regional-sales-performance/',
+    status_code=200,
+    description='Won sales of each regional office',
+    response_model=AnalyticsPage[RegionalSalesRow]
+)
+def get_regional_sales(
+    request: Request,
+    regional_office: str | None = None,
+    limit: int = LIMIT,
+    offset: int = OFFSET,
+    session = Depends(get_session)
+) -> Response:
+    """
+    Serves the `regional_sales_performance` gold model.
+
+    Args:
+        request (Request):
+            The request, for conditional GET.
+        regional_office (str | None):
+            Only the row of this regional office.
+        limit (int):
+            The maximum number of rows of the page.
+        offset (int):
+            The number of matching rows to skip.
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        Response:
+            An `AnalyticsPage` of `RegionalSalesRow`, or 304 if unchanged.
+    """
+    return serve_gold_model_page(
+        request, session, 'regional-sales-performance', {'regional_office': regional_office}, limit, offset
+    )
+
+
+@router.get(
+    '/sales-agent-performance/',
+    status_code=200,
+    description='Won sales, sales cycle and close rate of each sales agent',
+    response_model=AnalyticsPage[SalesAgentPerformanceRow]
+)
+def get_sales_agent_performance(
+    request: Request,
+    sales_agent: str | None = None,
+    limit: int = LIMIT,
+    offset: int = OFFSET,
+    session = Depends(get_session)
+) -> Response:
+    """
+    Serves the `sales_agent_performance` gold model.
+
+    Args:
+        request (Request):
+            The request, for conditional GET.
+        sales_agent (str | None):
+            Only the row of this sales agent.
+        limit (int):
+            The maximum number of rows of the page.
+        offset (int):
+            The number of matching rows to skip.
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        Response:
+            An `AnalyticsPage` of `SalesAgentPerformanceRow`, or 304 if unchanged.
+    """
+    return serve_gold_model_page(
+        request, session, 'sales-agent-performance', {'sales_agent': sales_agent}, limit, offset
+    )
+
+
+@router.get(
+    '/sales-performance-analysis/',
+    status_code=200,
+    description='Won opportunities, revenue and sales cycle of each sales agent',
+    response_model=AnalyticsPage[SalesPerformanceRow]
+)
+def get_sales_performance(
+    request: Request,
+    sales_agent: str | None = None,
+    limit: int = LIMIT,
+    offset: int = OFFSET,
+    session = Depends(get_session)
+) -> Response:
+    """
+    Serves the `sales_performance_analysis` gold model.
+
+    Args:
+        request (Request):
+            The request, for conditional GET.
+        sales_agent (str | None):
+            Only the row of this sales agent.
+        limit (int):
+            The maximum number of rows of the page.
+        offset (int):
+            The number of matching rows to skip.
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        Response:
+            An `AnalyticsPage` of `SalesPerformanceRow`, or 304 if unchanged.
+    """
+    return serve_gold_model_page(
+        request, session, 'sales-performance-analysis', {'sales_agent': sales_agent}, limit, offset
+    )
+
+
+@router.get(
+    '/sector-wise-revenue-analysis/',
+    status_code=200,
+    description='Won revenue and sales cycle of each customer sector',
+    response_model=AnalyticsPage[SectorRevenueRow]
+)
+def get_sector_wise_revenue(
+    request: Request,
+    customer_sector: str | None = None,
+    limit: int = LIMIT,
+    offset: int = OFFSET,
+    session = Depends(get_session)
+) -> Response:
+    """
+    Serves the `sector_wise_revenue_analysis` gold model.
+
+    Args:
+        request (Request):
+            The request, for conditional GET.
+        customer_sector (str | None):
+            Only the row of this sector.
+        limit (int):
+            The maximum number of rows of the page.
+        offset (int):
+            The number of matching rows to skip.
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        Response:
+            An `AnalyticsPage` of `SectorRevenueRow`, or 304 if unchanged.
+    """
+    return serve_gold_model_page(
+        request, session, 'sector-wise-revenue-analysis', {'customer_sector': customer_sector}, limit, offset
+    )
@@ -1,22 +1,31 @@
-from typing import List, ClassVar
+from typing import Annotated, List, ClassVar
 import subprocess
 import os
 import uuid
 
 import fireducks.pandas as pd
-from fastapi import APIRouter, Depends, Response
-from sqlalchemy import MetaData, Table, Column, String, inspect, text
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.exc import ProgrammingError
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import inspect, select, text
 from dotenv import load_dotenv
 
 from core.database import engine
 from core.deps import get_session
 from core.configs import settings
 from shared.contracts.user_input_contract import UserInput
-from utils.full_dataset_preparation import full_dataset_preparation
+from utils.full_dataset_preparation import full_dataset_preparation_in_worker, incremental_dataset_preparation
+from utils.agent_registry import agent_registry
+from utils.bulk_writer import copy_dataframe, replace_tables
+from utils.dbt_runner import dbt_runner, source_selector
+from utils.answer_cache import answer_cache
+from utils.gold_analytics import clear_analytics_cache
+from utils.init_data_ingest import ingest_csv_source, iter_csv_sources
+from utils.process_pool import run_in_process
 from schemas.sales_pipeline_schema import SalesPipelineSourceSchema
+from schemas.rebuild_job_schema import RebuildJobSchema
+from schemas.ingest_progress_schema import IngestProgressSchema
+from jobs.queue import enqueue_rebuild, get_job
 from models.sales_pipeline_model import SalesPipelineSourceModel
+from models.ingest_progress_model import IngestProgressDB
 
 
 load_dotenv()
@@ -37,40 +46,26 @@ def docs_dbt() -> Response:
         Response:
             A FastAPI response indicating the success or failure of the operation.
     """
-    original_dir = os.getcwd()
     try:
-        dbt_path = settings.DBT_PATH
-        if not dbt_path:
-            raise ValueError("DBT_PATH environment variable is not set.")
+        result = dbt_runner.invoke(['docs', 'generate'])
+        if not result.success:
+            raise RuntimeError(f"dbt docs generate failed: {result.exception}")
+
+        # Serving blocks, so it runs in its own process, without changing this one's directory
+        subprocess.Popen(
+            ["dbt", "docs", "serve", "--host", "0.0.0.0", "--port", "8080",
+             "--project-dir", dbt_runner.project_dir, "--profiles-dir", dbt_runner.profiles_dir],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
 
     except ValueError as e:
         print(f"Configuration Error: {e}")
-
-    os.chdir(dbt_path)
-
-    try:
-        _ = subprocess.run(
-            ["dbt", "docs", "generate"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True
-        )
-
-        _ = subprocess.run(
-            "dbt docs serve --host 0.0.0.0 --port 8080 > /dev/null 2>&1 &",
-            shell=True,
-            check=True
-        )
-
-    except subprocess.CalledProcessError as e:
-        print("Error occurred while running dbt:")
-        print(e.stderr)
     except Exception as e:
         print(f"Unexpected error occured generating or serving docs: {e}")
-    finally:
-        os.chdir(original_dir)
-        return Response(status_code=200)
+
+    return Response(status_code=200)
 
 
 @router.post(
@@ -78,43 +73,38 @@ def docs_dbt() -> Response:
     status_code=200,
     description='Run DBT models for data transformation and agregation'
 )
-def run_dbt() -> Response:
+def run_dbt(
+    select: Annotated[List[str] | None, Query()] = None,
+    full_refresh: bool = False
+) -> Response:
     """
     Executes DBT models to transform and aggregate data.
 
+    Args:
+        select (List[str] | None):
+            dbt selectors of the models to build (e.g. 'source:CRM.customers_rfm_features_source+'
+            for the models downstream of a source table). Every model is built if empty.
+        full_refresh (bool):
+            Whether incremental models are rebuilt from scratch.
+
     Returns:
         Response:
             A FastAPI response indicating the success or failure of the operation.
     """
-    original_dir = os.getcwd()
     try:
-        dbt_path = settings.DBT_PATH
-        if not dbt_path:
-            raise ValueError("DBT_PATH environment variable is not set.")
-
-        os.chdir(dbt_path)
-
-        result = subprocess.run(
-            ["dbt", "run"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True
-        )
+        dbt_runner.run(select, full_refresh=full_refresh)
 
-        print("DBT Run Output:")
-        print(result.stdout)
+        # The views were recreated, so the reflected schema held by the agent is stale
+        agent_registry.invalidate()
+        # The gold models were rebuilt
+        clear_analytics_cache()
 
     except ValueError as e:
         print(f"Configuration Error: {e}")
-    except subprocess.CalledProcessError as e:
-        print("Error occurred while running dbt:")
-        print(e.stderr)
     except Exception as e:
-        print(f"Unexpected error: {e}")
-    finally:
-        os.chdir(original_dir)
-        return Response(status_code=200)
+        print(f"Error occurred while running dbt: {e}")
+
+    return Response(status_code=200)
 
 
 @router.post(
@@ -140,38 +130,35 @@ def create_run_won_stage_data(
             A FastAPI response indicating the success or failure of the operation.
     """
     try:
-        model_predictions_summary, customers_rfm_features, general_enriched_dataset = full_dataset_preparation(session)
-        all_dataframes = [model_predictions_summary, customers_rfm_features, general_enriched_dataset]
-        dataframe_names = ['model_predictions_summary', 'customers_rfm_features', 'general_enriched_dataset'] 
-
-        for df, name in zip(all_dataframes, dataframe_names):
-            table_name = f"{name}_source"
-
-            with engine.connect() as conn:
-                try:
-                    conn.execution_options(isolation_level="AUTOCOMMIT").execute(
-                        text(f"DROP TABLE IF EXISTS {table_name} CASCADE;")
-                    )
-                    print(f"Table {table_name} successfully removed.")
-                except ProgrammingError as e:
-                    print(f"Error trying to remove the table {table_name}: {e}")
-
-            result = df.to_sql(
-                table_name,
-                con=engine,
-                schema=schema,
-                index=False,
-                if_exists="replace"
-            )
-            
-            if result:
-                print(result)
-                print('Tables added successfully')
-            else:
-                print("Didn't add tables")
-
-        # Creating or updating the database views of medallion architecture
-        run_dbt()
+        # CPU-bound (feature engineering and model fitting): run in a worker process so it
+        # does not hold the GIL of the API process
+        model_predictions_summary, customers_rfm_features, general_enriched_dataset = run_in_process(
+            full_dataset_preparation_in_worker
+        )
+        # Lets the incremental silver model pick up the rewritten deals
+        general_enriched_dataset['refreshed_at'] = pd.Timestamp.now(tz='UTC')
+
+        dataframes = {
+            'model_predictions_summary_source': model_predictions_summary,
+            'customers_rfm_features_source': customers_rfm_features,
+            'general_enriched_dataset_source': general_enriched_dataset,
+        }
+
+        # Loaded through staging tables and swapped in a single transaction, so readers
+        # (dbt views, the agent) never see a missing or partially written table
+        replace_tables(engine, schema, dataframes)
+        print('Tables added successfully')
+
+        # Rebuilding the models downstream of the replaced tables from scratch; a failure
+        # propagates, so the caller does not report stale models as rebuilt
+        dbt_runner.run([source_selector(table_name) for table_name in dataframes], full_refresh=True)
+
+        # The views were recreated, so the reflected schema held by the agent is stale
+        agent_registry.invalidate()
+        # Cached answers and gold pages describe the data before this rebuild; cleared once
+        # the models hold the new data, so nothing computed in between is kept
+        answer_cache.clear()
+        clear_analytics_cache()
 
     except Exception as e:
         session.rollback()
@@ -180,6 +167,90 @@ def create_run_won_stage_data(
     return Response(status_code=200)
 
 
+def refresh_won_stage_data_incrementally(
+    schema: str,
+    session,
+    accounts: list[str],
+    sales_agents: list[str]
+) -> bool:
+    """
+    Upserts the RFM and enriched rows affected by new deals of some accounts and agents.
+
+    Only the rows of the given accounts and agents are recomputed and replaced, in a
+    single transaction. The model predictions are kept until the next full rebuild.
+
+    Args:
+        schema (str):
+            The database schema where the data is stored.
+        session (Session):
+            The database session.
+        accounts (list[str]):
+            The accounts that received new deals.
+        sales_agents (list[str]):
+            The sales agents that received new deals.
+
+    Returns:
+        bool:
+            True if the tables were refreshed, False if a global quantity changed (or
+            the tables do not exist yet) and a full rebuild is needed.
+
+    Raises:
+        RuntimeError:
+            If the dbt run of the downstream models fails.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table("general_enriched_dataset_source", schema=schema):
+        return False
+    # Tables written before `refreshed_at` existed need a full rebuild first
+    columns = inspector.get_columns("general_enriched_dataset_source", schema=schema)
+    if 'refreshed_at' not in {column['name'] for column in columns}:
+        return False
+
+    current_rfm = pd.read_sql(
+        text(f"SELECT * FROM {schema}.customers_rfm_features_source"),
+        session.connection()
+    )
+
+    prepared = incremental_dataset_preparation(session, current_rfm, accounts, sales_agents)
+    if prepared is None:
+        print("Global RFM quantities changed, a full rebuild is needed.")
+        return False
+
+    customers_rfm_features, general_enriched_dataset = prepared
+    general_enriched_dataset['refreshed_at'] = pd.Timestamp.now(tz='UTC')
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"DELETE FROM {schema}.customers_rfm_features_source WHERE account = ANY(:accounts)"),
+            {"accounts": accounts}
+        )
+        copy_dataframe(conn, customers_rfm_features, schema, "customers_rfm_features_source")
+
+        conn.execute(
+            text(f"DELETE FROM {schema}.general_enriched_dataset_source "
+                 "WHERE account = ANY(:accounts) OR sales_agent = ANY(:sales_agents)"),
+            {"accounts": accounts, "sales_agents": sales_agents}
+        )
+        copy_dataframe(conn, general_enriched_dataset, schema, "general_enriched_dataset_source")
+
+    print(f"Incrementally refreshed {len(customers_rfm_features)} RFM row(s) and "
+          f"{len(general_enriched_dataset)} enriched row(s).")
+
+    # Refreshing the materialized models downstream of the changed tables; the relations
+    # keep their names and columns, so the agent does not need to reflect them again. A
+    # failure propagates and fails the job, as silver and gold are then stale
+    dbt_runner.run(select=[
+        source_selector("customers_rfm_features_source"),
+        source_selector("general_enriched_dataset_source"),
+    ])
+
+    # Cached answers and gold pages describe the data before this refresh
+    answer_cache.clear()
+    clear_analytics_cache()
+
+    return True
+
+
 @router.post(
     '/insert-won-stage-data/',
     status_code=200,
@@ -188,14 +259,21 @@ def create_run_won_stage_data(
 )
 def insert_won_stage_data(
     data: UserInput, 
+    response: Response,
     session = Depends(get_session)
 ) -> SalesPipelineSourceSchema:
     """
     Inserts a new sales opportunity record into the database.
 
+    The refresh of the derived tables is not done on the request path: an incremental
+    rebuild job for the deal's account and sales agent is enqueued (coalesced with any
+    job still queued) and its id is returned in the `X-Rebuild-Job-Id` header.
+
     Args:
         data (UserInput):
             The user-provided data containing details about the sales opportunity.
+        response (Response):
+            The response, used to return the rebuild job id header.
         session (Session, optional):
             The database session dependency.
 
@@ -227,10 +305,13 @@ def insert_won_stage_data(
         session.add(new_oportunity)
         session.commit()
 
-        create_run_won_stage_data(
-            schema=settings.DB_SCHEMA,
-            session=session
+        job_id = enqueue_rebuild(
+            session,
+            kind="incremental",
+            accounts=[data.account],
+            sales_agents=[data.sales_agent]
         )
+        response.headers["X-Rebuild-Job-Id"] = str(job_id)
 
     except Exception as e:
         session.rollback()
@@ -239,17 +320,75 @@ def insert_won_stage_data(
     return new_oportunity
 
 
+@router.post(
+    '/rebuild-jobs/',
+    status_code=202,
+    response_model=RebuildJobSchema,
+    description='Enqueue a rebuild of the derived tables and dbt models.'
+)
+def create_rebuild_job(session = Depends(get_session)) -> RebuildJobSchema:
+    """
+    Enqueues a rebuild of the derived tables, coalescing with a job still queued.
+
+    Args:
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        RebuildJobSchema:
+            The queued job.
+    """
+    job_id = enqueue_rebuild(session)
+    return get_job(session, job_id)
+
+
+@router.get(
+    '/rebuild-jobs/{job_id}',
+    status_code=200,
+    response_model=RebuildJobSchema,
+    description='Return the status of a rebuild job.'
+)
+def rebuild_job_status(job_id: int, session = Depends(get_session)) -> RebuildJobSchema:
+    """
+    Returns the status of a rebuild job.
+
+    Args:
+        job_id (int):
+            The job identifier.
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        RebuildJobSchema:
+            The job and its current status.
+
+    Raises:
+        HTTPException:
+            If the job does not exist.
+    """
+    job = get_job(session, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Rebuild job {job_id} not found")
+
+    return job
+
+
 @router.post(
     '/insert-init-data/',
     status_code=200,
-    description='Insert data to Postgres database given a source directory containing JSON or CSV files.'
+    description='Insert data to Postgres database given a source directory containing CSV files or zip archives.'
 )
-async def insert_init_data(session = Depends(get_session)) -> Response:
+def insert_init_data(session = Depends(get_session)) -> Response:
     """
-    Inserts initial data into the PostgreSQL database from JSON or CSV files.
+    Inserts initial data into the PostgreSQL database from CSV files.
 
-    This function reads data files from the project's `data` directory, 
-    creates tables dynamically (if they do not exist), and inserts the data.
+    This function streams the CSV files of the project's `data` directory, including
+    the ones inside zip archives, into tables created dynamically (if they do not
+    exist). Rows are loaded in chunks of `INIT_DATA_CHUNK_ROWS` with COPY, and a load
+    interrupted by a failure resumes where it stopped on the next call.
+
+    The load is blocking, so the route is a sync function run in the threadpool rather
+    than on the event loop.
 
     Args:
         session (Session, optional):
@@ -263,54 +402,43 @@ async def insert_init_data(session = Depends(get_session)) -> Response:
         Exception:
             If an error occurs during schema creation, table creation, or data insertion.
     """
-    with engine.connect() as conn:
-        schema = settings.DB_SCHEMA
-        create_schema_query = text(f"CREATE SCHEMA IF NOT EXISTS {schema};")
-        conn.execute(create_schema_query)
-        conn.commit()
-        print(f"Schema {schema} create or retrieved.")
-
-        data_dir = os.path.join(settings.PROJECT_PATH, 'data')
-        for file_name in os.listdir(data_dir):
-            if file_name.endswith('.csv'):
-                file_path = os.path.join(data_dir, file_name)
-
-                if file_name.endswith('.csv'):
-                    df = pd.read_csv(file_path)
-
-                raw_table_name = os.path.splitext(os.path.basename(file_path))[0]
-                table_name = raw_table_name + '_source'
-
-                inspector = inspect(engine)
-                if not inspector.has_table(table_name, schema=schema):
-                    if raw_table_name == 'sales_pipeline':
-                        id_column = 'opportunity_id'
-                    else:
-                        df['id'] = [str(uuid.uuid4()) for _ in range(len(df))]
-                        id_column = 'id'
-
-                    metadata = MetaData(schema=schema)
-                    columns = [Column(id_column, String, primary_key=True)] + [
-                        Column(col, String) for col in df.columns if col != id_column
-                    ]
-
-                    table = Table(table_name, metadata, *columns, extend_existing=False)
-                    metadata.create_all(engine)
-
-                    rows_to_insert = df.to_dict(orient='records')
-                    
-                    try:
-                        session.execute(table.insert().values(rows_to_insert))
-                        session.commit()
-
-                    except Exception as e:
-                        session.rollback()
-                        raise e
-        
-        # Just to create the processed data when the API starts up
-        create_run_won_stage_data(
-            schema=schema,
-            session=session
+    schema = settings.DB_SCHEMA
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema};"))
+    print(f"Schema {schema} create or retrieved.")
+
+    data_dir = os.path.join(settings.PROJECT_PATH, 'data')
+    for raw_table_name, source, open_source in iter_csv_sources(data_dir):
+        ingest_csv_source(
+            engine, schema, raw_table_name, source, open_source, settings.INIT_DATA_CHUNK_ROWS
         )
 
+    # Just to create the processed data when the API starts up
+    create_run_won_stage_data(
+        schema=schema,
+        session=session
+    )
+
     return Response(status_code=200)
+
+
+@router.get(
+    '/insert-init-data/progress/',
+    status_code=200,
+    description='Get the progress of the initial data load of each source table.',
+    response_model=List[IngestProgressSchema]
+)
+def insert_init_data_progress(session = Depends(get_session)) -> List[IngestProgressSchema]:
+    """
+    Returns how many rows of each source table the initial data load has committed.
+
+    Args:
+        session (Session, optional):
+            The database session dependency.
+
+    Returns:
+        List[IngestProgressSchema]:
+            The progress of every source table loaded by `insert_init_data`.
+    """
+    query = select(IngestProgressDB).order_by(IngestProgressDB.table_schema, IngestProgressDB.table_name)
+    return session.execute(query).scalars().all()
@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Depends
 
-from models.historic_messages_model import Message
-from core.database import engine
-from core.deps import get_session
-from core.configs import settings
-from chat.services import chat_history_from_id
+from core.deps import get_async_session
+from chat.services import aget_messages_page, aprune_chat_histories
+from models.historic_messages_model import MessageHistoryDB
+from schemas.historic_messages_schema import (ChatSession,
+                                              HistoricMessagesPage,
+                                              HistoricMessagesRequest,
+                                              PruneChatSessionsRequest,
+                                              PruneChatSessionsResult)
+from utils.conversation_ids import (aallocate_conversation_id,
+                                    conversation_id_created_at,
+                                    conversation_id_lower_bound)
 
 
 router = APIRouter(tags=['Chat'])
@@ -13,31 +19,97 @@ router = APIRouter(tags=['Chat'])
 @router.post(
     "/historic-message/",
     status_code=200,
-    description="Return historic messages from the chat"
+    response_model=HistoricMessagesPage,
+    description="Return a page of historic messages from the chat"
 )
 async def historic_message(
-    message: Message,
-    session=Depends(get_session)
-):
+    request: HistoricMessagesRequest,
+    session=Depends(get_async_session)
+) -> HistoricMessagesPage:
     """
-    Retrieves historical messages from a chat session.
+    Retrieves a page of historical messages from a chat session.
+
+    Pages go from the most recent messages to the oldest ones: pass the returned
+    `next_before_id` as `before_id` to get the previous page.
+
+    Args:
+        request (HistoricMessagesRequest):
+            The chat history ID, the cursor and the size of the page.
+        session (AsyncSession):
+            The async database session dependency.
+
+    Returns:
+        HistoricMessagesPage:
+            The messages of the page, oldest first, and the cursor of the previous page.
+    """
+    messages, next_before_id = await aget_messages_page(
+        message_history_id=request.message_history_id,
+        session=session,
+        before_id=request.before_id,
+        limit=request.limit
+    )
+
+    return {
+        "messages": [message.to_dict() for message in messages],
+        "next_before_id": next_before_id
+    }
+
+
+@router.post(
+    "/chat-session/",
+    status_code=201,
+    response_model=ChatSession,
+    description="Allocate a new chat session with a collision-free, time-ordered ID"
+)
+async def create_chat_session(session=Depends(get_async_session)) -> ChatSession:
+    """
+    Allocates the ID of a new chat session and creates its empty history.
+
+    The ID comes from the Postgres clock and a sequence, so concurrent clients never get
+    the same one, and IDs grow with time.
 
     Args:
-        message (Message):
-            The message object containing the chat history ID.
-        session (Session):
-            The database session dependency.
+        session (AsyncSession):
+            The async database session dependency.
 
     Returns:
-        chat (list):
-            A list of messages from the chat history.
+        ChatSession:
+            The ID of the chat history and when it was allocated.
     """
-    with session:
-        chat = chat_history_from_id(
-            message_history_id=message.message_history_id,
-            session=session
-        ).to_list()
-        
-        session.commit()
-
-    return chat
+    message_history_id = await aallocate_conversation_id(session)
+    session.add(MessageHistoryDB(id=message_history_id, messages=[]))
+    await session.commit()
+
+    return {
+        "message_history_id": message_history_id,
+        "created_at": conversation_id_created_at(message_history_id)
+    }
+
+
+@router.post(
+    "/chat-session/prune/",
+    status_code=200,
+    response_model=PruneChatSessionsResult,
+    description="Delete the chat sessions created before a moment"
+)
+async def prune_chat_sessions(
+    request: PruneChatSessionsRequest,
+    session=Depends(get_async_session)
+) -> PruneChatSessionsResult:
+    """
+    Deletes the chat sessions created before a moment, with their messages.
+
+    Args:
+        request (PruneChatSessionsRequest):
+            The moment before which the sessions are deleted.
+        session (AsyncSession):
+            The async database session dependency.
+
+    Returns:
+        PruneChatSessionsResult:
+            The number of deleted chat histories, messages and agent queries.
+    """
+    deleted = await aprune_chat_histories(conversation_id_lower_bound(request.before), session)
+    await session.commit()
+
+    return deleted
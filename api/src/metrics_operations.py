@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+
+from core.metrics import metrics
+
+
+router = APIRouter(tags=['Metrics'])
+
+
+@router.get(
+    '/metrics/',
+    status_code=200,
+    description='Return the in-process counters, gauges and timings of the API'
+)
+def get_metrics() -> dict:
+    """
+    Returns the metrics collected by this API process.
+
+    Returns:
+        dict:
+            The counters, gauges and timings of the metrics registry.
+    """
+    return metrics.snapshot()
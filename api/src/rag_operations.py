@@ -1,48 +1,64 @@
-from datetime import datetime
-from typing import Literal
+from typing import AsyncIterator, Literal
+from functools import lru_cache
 import copy
+import json
+import time
 from typing import List
 
 from pydantic import BaseModel, Field
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from langchain_openai import ChatOpenAI
-from langchain_community.utilities.sql_database import SQLDatabase
 from dotenv import load_dotenv
-from langgraph.prebuilt import create_react_agent
-from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
 from langchain_core.prompts import ChatPromptTemplate, FewShotChatMessagePromptTemplate
+from sqlalchemy.exc import NoResultFound
 
-from core.database import engine
-from core.deps import get_session
+from core.database import AsyncSession
 from core.configs import settings
-from utils.tables_metadata_prompt import TABLES_METADATA, generate_tables_metadata_prompt
-from chat.services import (chat_history_from_id,
-                           save_user_message_in_chat,
-                           save_assistant_message_in_chat)
+from core.deps import get_async_session
+from core.metrics import metrics
+from jobs.queue import rebuild_watcher
+from utils.agent_query_log import start_query_log
+from utils.agent_registry import agent_registry
+from utils.agent_replay import replay_queries
+from utils.answer_cache import answer_cache
+from utils.sql_injection_detector import detect_sql_injection
+from utils.verdict_cache import verdict_cache, hash_input
+from chat.memory import aload_memory
+from chat.services import (achat_history_from_id,
+                           aget_agent_queries,
+                           build_user_message,
+                           build_assistant_message)
+from chat.writer import chat_writer
 from schemas.historic_messages_schema import Message
-from schemas.sql_agentic_rag_schema import SQLInjectionStatus, SerializableChatSchema
+from schemas.sql_agentic_rag_schema import (AgentReplay,
+                                            SQLInjectionStatus,
+                                            SQLInjectionBatchRequest,
+                                            SQLInjectionBatchStatus,
+                                            SerializableChatSchema)
 
 load_dotenv()
 
 router = APIRouter(tags=['RAG Operations'])
 
-@router.get(
-    '/verify-sql-injection/{query}',
-    status_code=200,
-    response_model=SQLInjectionStatus,
-    description="Specialized Agent that verifies SQL injection based on the user's query"
-)
-def verify_sql_injection(query: str) -> SQLInjectionStatus:
+class ChooseQueryStatus(BaseModel):
+    status: Literal["Insecure", "Secure"] = Field(
+        ...,
+        description="Given a user input, determine if the query is Secure or Insecure.",
+    )
+
+
+@lru_cache(maxsize=1)
+def build_sql_injection_chain():
     """
-    Identifies whether a given SQL query is a potential SQL injection attempt.
+    Builds the few-shot LLM chain that classifies ambiguous inputs.
 
-    Args:
-    query (str):
-        The SQL query input from the user.
+    The chain is built once per process and reused by every request.
 
     Returns:
-        SQLInjectionStatus:
-            A status indicating whether the query is "Secure" or "Insecure".
+        RunnableSequence:
+            The prompt piped into the structured-output LLM.
     """
     examples = [
         {
@@ -57,6 +73,18 @@ def verify_sql_injection(query: str) -> SQLInjectionStatus:
             "input": "' OR '1' = '1",
             "result": "Insecure, attempt of SQL Injection",
         },
+        {
+            "input": 'Compare "Hottechi" and "Kan-code" revenue',
+            "result": "Secure",
+        },
+        {
+            "input": 'What is the revenue of "Acme" or 2017?',
+            "result": "Secure",
+        },
+        {
+            "input": "Show deals for the 'GTX Pro' or 'MG Special' products",
+            "result": "Secure",
+        },
     ]
     example_prompt = ChatPromptTemplate.from_messages(
         [
@@ -84,19 +112,156 @@ def verify_sql_injection(query: str) -> SQLInjectionStatus:
         ]
     )
 
-    class ChooseQueryStatus(BaseModel):
-        status: Literal["Insecure", "Secure"] = Field(
-            ...,
-            description="Given a user input, determine if the query is Secure or Insecure.",
-        )
-
     llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.5)
 
     structured_llm = llm.with_structured_output(ChooseQueryStatus)
-    chain = prompt | structured_llm
+    return prompt | structured_llm
+
+
+def record_sql_injection_decision(decided_by: str, status: str) -> None:
+    """
+    Updates the metrics of the SQL injection classification paths.
+
+    Args:
+        decided_by (str):
+            The path that made the decision ("rules", "cache" or "llm").
+        status (str):
+            The verdict ("Secure" or "Insecure").
+    """
+    metrics.increment("sql_injection.requests")
+    metrics.increment(f"sql_injection.decided_by.{decided_by}")
+    metrics.increment(f"sql_injection.{decided_by}.{status.lower()}")
+    metrics.set_gauge(
+        "sql_injection.rules_hit_rate",
+        metrics.ratio("sql_injection.decided_by.rules", "sql_injection.requests")
+    )
+
+
+def record_agent_answer(tool_calls: int, seconds: float) -> None:
+    """
+    Updates the metrics of the answers computed by the text-to-SQL agent.
+
+    The timings are recorded both overall and per schema mode of the agent, so the
+    average number of tool calls and latency of the modes can be compared.
+
+    Args:
+        tool_calls (int):
+            The number of tools the agent called to compute the answer.
+        seconds (float):
+            The time the agent took to compute the answer.
+    """
+    for prefix in ("agent", f"agent.{agent_registry.schema_mode}"):
+        metrics.increment(f"{prefix}.answers")
+        metrics.observe(f"{prefix}.answer.tool_calls", tool_calls)
+        metrics.observe(f"{prefix}.answer.seconds", seconds)
+
+
+@router.get(
+    '/verify-sql-injection/{query}',
+    status_code=200,
+    response_model=SQLInjectionStatus,
+    description="Specialized Agent that verifies SQL injection based on the user's query"
+)
+def verify_sql_injection(query: str) -> SQLInjectionStatus:
+    """
+    Identifies whether a given SQL query is a potential SQL injection attempt.
+
+    Obvious cases are decided locally by `detect_sql_injection`. Ambiguous inputs are
+    looked up in the verdict cache and only sent to the LLM chain on a miss, so repeated
+    inputs always get the same verdict.
+
+    Args:
+    query (str):
+        The SQL query input from the user.
+
+    Returns:
+        SQLInjectionStatus:
+            A status indicating whether the query is "Secure" or "Insecure", and
+            which path ("rules", "cache" or "llm") made the decision.
+    """
+    detection = detect_sql_injection(query)
+    if detection.status is not None:
+        record_sql_injection_decision("rules", detection.status)
+        return {'status': detection.status, 'decided_by': 'rules', 'rule': detection.rule}
+
+    cached_status = verdict_cache.get(query)
+    if cached_status is not None:
+        record_sql_injection_decision("cache", cached_status)
+        return {'status': cached_status, 'decided_by': 'cache'}
+
+    result = build_sql_injection_chain().invoke({"input": query})
+    verdict_cache.put(query, result.status)
+
+    record_sql_injection_decision("llm", result.status)
+    return {'status': result.status, 'decided_by': 'llm'}
+
+
+@router.post(
+    '/verify-sql-injection/batch/',
+    status_code=200,
+    response_model=List[SQLInjectionBatchStatus],
+    description="Verifies SQL injection for many user inputs at once, returning verdicts in input order"
+)
+def verify_sql_injection_batch(request: SQLInjectionBatchRequest) -> List[SQLInjectionBatchStatus]:
+    """
+    Identifies potential SQL injection attempts in a batch of user inputs.
+
+    Each input goes through the local detector and the verdict cache first. The remaining
+    inputs are deduplicated and classified by the LLM chain with concurrent batched
+    invocation, bounded by `SQL_INJECTION_BATCH_MAX_CONCURRENCY`. An input whose LLM call
+    fails gets a null status and the error, without failing the rest of the batch; its
+    verdict is not cached, so it is classified again by the next request.
+
+    Args:
+        request (SQLInjectionBatchRequest):
+            The user inputs to be screened.
+
+    Returns:
+        List[SQLInjectionBatchStatus]:
+            One verdict per input, in the same order as the request.
+    """
+    verdicts = [None] * len(request.queries)
+    pending: dict[str, list[int]] = {}
+
+    for index, query in enumerate(request.queries):
+        detection = detect_sql_injection(query)
+        if detection.status is not None:
+            record_sql_injection_decision("rules", detection.status)
+            verdicts[index] = {'status': detection.status, 'decided_by': 'rules', 'rule': detection.rule}
+            continue
+
+        cached_status = verdict_cache.get(query)
+        if cached_status is not None:
+            record_sql_injection_decision("cache", cached_status)
+            verdicts[index] = {'status': cached_status, 'decided_by': 'cache'}
+            continue
 
-    result = chain.invoke({"input": query})
-    return {'status': result.status}
+        pending.setdefault(hash_input(query), []).append(index)
+
+    if pending:
+        unique_queries = [request.queries[indexes[0]] for indexes in pending.values()]
+
+        results = build_sql_injection_chain().batch(
+            [{"input": query} for query in unique_queries],
+            config={"max_concurrency": settings.SQL_INJECTION_BATCH_MAX_CONCURRENCY},
+            return_exceptions=True
+        )
+
+        for query, indexes, result in zip(unique_queries, pending.values(), results):
+            if isinstance(result, Exception):
+                print(f"Could not classify an input of the batch: {result}")
+                metrics.increment("sql_injection.llm.errors")
+                verdict = {'status': None, 'decided_by': 'llm', 'error': str(result)}
+            else:
+                verdict_cache.put(query, result.status)
+                # One LLM call, whatever the number of duplicates of the input
+                record_sql_injection_decision("llm", result.status)
+                verdict = {'status': result.status, 'decided_by': 'llm'}
+
+            for index in indexes:
+                verdicts[index] = verdict
+
+    return verdicts
 
 
 @router.post(
@@ -105,104 +270,52 @@ def verify_sql_injection(query: str) -> SQLInjectionStatus:
     response_model=List[SerializableChatSchema],
     description="Text-to-SQL agent to generate SQL queries based on user input"
 )
-def text_to_sql(
-    message: Message, session=Depends(get_session)
+async def text_to_sql(
+    message: Message, session=Depends(get_async_session)
 ) -> List[SerializableChatSchema]:
     """
     Converts natural language input into SQL queries using an AI agent.
 
+    The agent is run with `astream`, so the LLM calls do not hold a thread while they
+    wait; the blocking steps (the rebuild check, building the agent) run in the threadpool.
+    It receives the prior turns of the conversation (see `aload_memory`) so follow-up
+    questions are understood; the answer cache only serves the first question of a
+    conversation, whose answer does not depend on them.
+
     Args:
         message (Message):
             The user's input query in natural language.
-        session (Session):
-            The database session dependency, by default retrieved from `get_session`.
+        session (AsyncSession):
+            The async database session dependency, by default retrieved from `get_async_session`.
 
     Returns:
         serializable_chat (List[SerializableChatSchema]):
-            A list of chat messages containing the generated SQL query and responses.
+            The chat history, or only the new question and answer if
+            `message.response_mode` is "turn" (the stored messages are then not loaded).
     """
-    chat = chat_history_from_id(message.message_history_id, session)
-    save_user_message_in_chat(message.query, chat)
-
-    db = SQLDatabase(
-        engine=engine,
-        schema=settings.DB_SCHEMA,
-        view_support=True,
-    )
-
-    views_to_query = [
-        table
-        for table in db.get_usable_table_names()
-        if not table.endswith('_source')
-        and not table.startswith('raw-')
-        and not table.startswith('stg-')
-    ]
-
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
-    toolkit = SQLDatabaseToolkit(
-        db=db,
-        llm=llm
+    chat = await achat_history_from_id(
+        message.message_history_id, session, with_messages=message.response_mode == "full"
     )
+    prior_messages = (await aload_memory(chat, session)).to_agent_messages()
+    # Saves the summary updated by the memory and releases the connection during the agent run
+    await session.commit()
 
-    prompt_template = """
-        You are an agent designed to interact with a SQL database.
-        Below is the description of the tables and their columns that you can query:
-        
-        {tables_metadata_prompt}
-        
-        Given the input question, create a syntactically correct {dialect} query to run, 
-        then look at the results of the query and return the answer.
-        
-        Unless the user specifies a specific number of examples they wish to obtain, 
-        always limit your query to at most {top_k} results.
-        
-        You must first try to make a simple query on these tables: {views_to_query}. 
-        If you are not sure that the user's query can be answered by the content present 
-        in this list of tables, you must perform a more complex query on the centralized 
-        table named 'stg-won_deal_stage'.
-        
-        You can order the results by a relevant column to return the most interesting examples 
-        in the database.
-        
-        Never query for all the columns from a specific table; only ask for the relevant columns 
-        given the question.
-        
-        You have access to tools for interacting with the database. If the user's input question 
-        is related to a date, consider today's date as {today_date}.
-        
-        Only use the below tools. Only use the information returned by the below tools 
-        to construct your final answer.
-        
-        You MUST double-check your query before executing it. If you get an error while executing 
-        a query, rewrite the query and try again.
-        
-        DO NOT make any DML statements (INSERT, UPDATE, DELETE, DROP, etc.) to the database.
-        
-        To start, you should ALWAYS look at the tables in the database to see what you can query, 
-        prioritizing getting answers from these tables: {views_to_query}.
-        Do NOT skip this step.
-        
-        Then you should query the schema of the most relevant tables.
-    """
-
-    system_message = prompt_template.format(
-        dialect=db.dialect,
-        top_k=10,
-        views_to_query=views_to_query,
-        today_date=datetime(2018, 1, 1),
-        tables_metadata_prompt=generate_tables_metadata_prompt(TABLES_METADATA),
-    )
+    await run_in_threadpool(rebuild_watcher.check)
+    # An answer computed from data older than a clear of the cache is not stored
+    cache_generation = answer_cache.generation
+    cached_answer = None if prior_messages else answer_cache.get(message.query)
+    if cached_answer is not None:
+        new_messages = [build_user_message(message.query), build_assistant_message(cached_answer)]
+        await chat_writer.write(chat.id, new_messages)
+        return chat.to_list() + [msg.to_dict() for msg in new_messages]
 
-    agent_executor = create_react_agent(
-        model=llm,
-        tools=toolkit.get_tools(),
-        state_modifier=system_message
-    )
+    agent_executor = await run_in_threadpool(agent_registry.get_agent)
 
+    started_at = time.perf_counter()
+    query_log = start_query_log()
     response_buffer = []
-    for event in agent_executor.stream(
-        {"messages": [("user", message.query)]},
+    async for event in agent_executor.astream(
+        {"messages": prior_messages + [("user", message.query)]},
         stream_mode="values",
     ):
         event["messages"][-1].pretty_print()
@@ -211,9 +324,263 @@ def text_to_sql(
     if response_buffer:
         final_event = response_buffer[-1]
         final_answer = copy.deepcopy(final_event["messages"][-1].content)
+        tool_calls = [
+            {"name": tool_call["name"], "args": tool_call["args"]}
+            for msg in final_event["messages"]
+            for tool_call in getattr(msg, "tool_calls", None) or []
+        ]
+        record_agent_answer(
+            tool_calls=len(tool_calls),
+            seconds=time.perf_counter() - started_at,
+        )
 
-        save_assistant_message_in_chat(final_answer, chat)
-
-        session.add(chat)
-        serializable_chat = chat.to_list()
+        if not prior_messages:
+            answer_cache.put(message.query, final_answer, generation=cache_generation)
+        new_messages = [
+            build_user_message(message.query),
+            build_assistant_message(final_answer, tool_calls=tool_calls, queries=query_log)
+        ]
+        await chat_writer.write(chat.id, new_messages)
+        serializable_chat = chat.to_list() + [msg.to_dict() for msg in new_messages]
         return serializable_chat
+
+
+def format_sse(event: str, data: dict) -> str:
+    """
+    Formats a payload as a Server-Sent Event.
+
+    Args:
+        event (str):
+            The event name (e.g. "token", "tool_call", "done").
+        data (dict):
+            The JSON-serializable payload of the event.
+
+    Returns:
+        str:
+            The event encoded in the `text/event-stream` wire format.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def save_streamed_answer(
+    message: Message,
+    final_answer: str,
+    cached: bool,
+    tool_calls: list[dict] | None = None,
+    queries: list[dict] | None = None
+) -> dict:
+    """
+    Saves a streamed exchange in the chat history.
+
+    The messages are persisted by the chat writer. With the "full" response mode, the
+    updated chat history is then read with a dedicated session, since the request-scoped
+    one may already be closed while the response streams.
+
+    Args:
+        message (Message):
+            The user's input query in natural language.
+        final_answer (str):
+            The final answer sent to the user.
+        cached (bool):
+            Whether the answer came from the answer cache.
+        tool_calls (list[dict] | None):
+            The tools the agent called, with their arguments.
+        queries (list[dict] | None):
+            The database queries the agent ran.
+
+    Returns:
+        dict:
+            The payload of the "done" event.
+    """
+    new_messages = [
+        build_user_message(message.query),
+        build_assistant_message(final_answer, tool_calls=tool_calls, queries=queries)
+    ]
+    await chat_writer.write(message.message_history_id, new_messages)
+
+    if message.response_mode == "full":
+        async with AsyncSession() as session:
+            chat = await achat_history_from_id(message.message_history_id, session)
+            serializable_chat = chat.to_list()
+    else:
+        serializable_chat = [msg.to_dict() for msg in new_messages]
+
+    return {"content": final_answer, "cached": cached, "chat": serializable_chat}
+
+
+async def stream_agent_events(message: Message, agent_executor) -> AsyncIterator[str]:
+    """
+    Runs the agent and yields its progress as Server-Sent Events.
+
+    Tool calls (including the SQL the agent writes), tool results and the tokens of the
+    final answer are sent as soon as the agent produces them. Once the agent is done the
+    exchange is saved in the chat history and a final "done" event is sent. As in
+    `text_to_sql`, the agent receives the prior turns of the conversation.
+
+    Args:
+        message (Message):
+            The user's input query in natural language.
+        agent_executor (CompiledGraph):
+            The compiled text-to-SQL agent.
+
+    Yields:
+        str:
+            Server-Sent Events with the agent progress.
+    """
+    async with AsyncSession() as session:
+        chat = await achat_history_from_id(message.message_history_id, session, with_messages=False)
+        prior_messages = (await aload_memory(chat, session)).to_agent_messages()
+        await session.commit()
+
+    # An answer computed from data older than a clear of the cache is not stored
+    cache_generation = answer_cache.generation
+    final_answer = None if prior_messages else answer_cache.get(message.query)
+    if final_answer is not None:
+        yield format_sse("token", {"content": final_answer})
+        yield format_sse("done", await save_streamed_answer(message, final_answer, cached=True))
+        return
+
+    final_answer = ""
+    tool_calls = []
+    query_log = start_query_log()
+    started_at = time.perf_counter()
+
+    try:
+        async for mode, payload in agent_executor.astream(
+            {"messages": prior_messages + [("user", message.query)]},
+            stream_mode=["messages", "updates"],
+        ):
+            if mode == "messages":
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") == "agent" and chunk.content:
+                    yield format_sse("token", {"content": chunk.content})
+                continue
+
+            for node, update in payload.items():
+                if not update:
+                    continue
+
+                for msg in update.get("messages", []):
+                    if node == "agent" and msg.tool_calls:
+                        for tool_call in msg.tool_calls:
+                            tool_calls.append({"name": tool_call["name"], "args": tool_call["args"]})
+                            yield format_sse(
+                                "tool_call",
+                                {"name": tool_call["name"], "args": tool_call["args"]}
+                            )
+                            if tool_call["name"] in ("sql_db_query", "sql_db_query_checker"):
+                                yield format_sse("sql", {"query": tool_call["args"].get("query")})
+                    elif node == "agent":
+                        final_answer = msg.content
+                    elif node == "tools":
+                        yield format_sse(
+                            "tool_result",
+                            {"name": msg.name, "content": str(msg.content)[:2000]}
+                        )
+
+    except Exception as e:
+        print(f"Error while streaming the agent response: {e}")
+        yield format_sse("error", {"detail": str(e)})
+        return
+
+    record_agent_answer(len(tool_calls), time.perf_counter() - started_at)
+    if not prior_messages:
+        answer_cache.put(message.query, final_answer, generation=cache_generation)
+    yield format_sse("done", await save_streamed_answer(
+        message, final_answer, cached=False, tool_calls=tool_calls, queries=query_log
+    ))
+
+
+@router.post(
+    '/text-to-sql/stream/',
+    status_code=200,
+    description="Text-to-SQL agent streaming tool calls, SQL and answer tokens as Server-Sent Events"
+)
+async def text_to_sql_stream(message: Message) -> StreamingResponse:
+    """
+    Streaming variant of `text_to_sql` that sends the agent progress as Server-Sent Events.
+
+    Events:
+        tool_call: A tool the agent decided to call, with its arguments.
+        sql: The SQL query the agent is checking or executing.
+        tool_result: The (truncated) output of a tool.
+        token: A token of the final answer.
+        done: The final answer and the updated chat history (only the new turn if
+            `message.response_mode` is "turn").
+        error: An error raised while the agent was running.
+
+    Args:
+        message (Message):
+            The user's input query in natural language.
+
+    Returns:
+        StreamingResponse:
+            A `text/event-stream` response with the agent events.
+    """
+    await run_in_threadpool(rebuild_watcher.check)
+    agent_executor = await run_in_threadpool(agent_registry.get_agent)
+
+    return StreamingResponse(
+        stream_agent_events(message, agent_executor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get(
+    '/text-to-sql/replay/{message_id}/',
+    status_code=200,
+    response_model=AgentReplay,
+    description="Runs the stored queries of an answer of the agent again, without the LLM"
+)
+async def text_to_sql_replay(message_id: int, session=Depends(get_async_session)) -> AgentReplay:
+    """
+    Runs again, against the current data, the queries the agent ran to write an answer.
+
+    The SQL queries run in the execution sandbox and the typed tools are called with the
+    same arguments, so the results of an answer can be refreshed without calling the LLM.
+
+    Args:
+        message_id (int):
+            The ID of the assistant message, as returned by the text-to-SQL endpoints.
+        session (AsyncSession):
+            The async database session dependency.
+
+    Returns:
+        AgentReplay:
+            The fresh result of each query that succeeded when the answer was written.
+
+    Raises:
+        HTTPException:
+            404 if there is no assistant message with this ID.
+    """
+    try:
+        queries = await aget_agent_queries(message_id, session)
+    except NoResultFound:
+        raise HTTPException(status_code=404, detail=f"Assistant message {message_id} not found")
+
+    db = await run_in_threadpool(agent_registry.get_database)
+    replayed = await run_in_threadpool(replay_queries, db, queries)
+
+    return {"message_id": message_id, "queries": replayed}
+
+
+@router.get(
+    '/text-to-sql/prompt-report/',
+    status_code=200,
+    description="Token counts of the static prefix and dynamic suffix of the agent system prompt"
+)
+def text_to_sql_prompt_report() -> dict:
+    """
+    Reports the size of the system prompt of the text-to-SQL agent.
+
+    The static prefix is byte-identical across requests (same `prefix_sha256`) as long as
+    the tables metadata and the agent configuration do not change, so it can be served
+    from the provider's prompt cache.
+
+    Returns:
+        dict:
+            The prefix hash and the token counts of the prefix and of the suffix.
+    """
+    rebuild_watcher.check()
+    return agent_registry.get_prompt_report()
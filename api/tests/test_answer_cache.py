@@ -0,0 +1,57 @@
+import pytest
+
+from utils.answer_cache import AnswerCache, embed_query, normalize_query
+
+
+@pytest.fixture
+def cache() -> AnswerCache:
+    return AnswerCache(max_entries=16, ttl_seconds=60, similarity_threshold=0.92)
+
+
+def similarity(first: str, second: str) -> float:
+    return float(embed_query(normalize_query(first)) @ embed_query(normalize_query(second)))
+
+
+@pytest.mark.parametrize(
+    "cached_query, query",
+    [
+        ("which customers are likely to churn", "which customers are unlikely to churn"),
+        ("which customers are likely to churn", "which customers are not likely to churn"),
+        ("which sales agent has the highest revenue", "which sales agent has the lowest revenue"),
+        ("show the top 5 accounts by revenue", "show the top 10 accounts by revenue"),
+    ],
+)
+def test_different_questions_miss(cache, cached_query, query):
+    cache.put(cached_query, "cached answer")
+
+    assert cache.get(query) is None
+
+
+def test_negation_is_above_the_similarity_threshold():
+    # The embedding alone would serve one answer for the other
+    assert similarity("which customers are likely to churn", "which customers are unlikely to churn") >= 0.92
+
+
+@pytest.mark.parametrize(
+    "cached_query, query",
+    [
+        ("Which customers are likely to churn?", "which customers are likely to churn"),
+        ("show the top 5 accounts by revenue", "show me the top 5 accounts by revenue"),
+    ],
+)
+def test_rephrased_questions_hit(cache, cached_query, query):
+    cache.put(cached_query, "cached answer")
+
+    assert cache.get(query) == "cached answer"
+
+
+def test_answer_computed_before_a_clear_is_dropped(cache):
+    generation = cache.generation
+    cache.clear()
+    cache.put("which customers are likely to churn", "stale answer", generation=generation)
+
+    assert cache.get("which customers are likely to churn") is None
+
+    cache.put("which customers are likely to churn", "fresh answer", generation=cache.generation)
+
+    assert cache.get("which customers are likely to churn") == "fresh answer"
@@ -0,0 +1,41 @@
+import pytest
+
+from utils.sql_injection_detector import detect_sql_injection
+
+
+@pytest.mark.parametrize(
+    "query, rule",
+    [
+        ("1; DROP TABLE users; --", "stacked_statement"),
+        ("' OR '1' = '1", "boolean_injection"),
+        ("admin' or 'x'='x", "boolean_injection"),
+        ("delete from users", "ddl_dml_statement"),
+        ("DELETE FROM users WHERE 1=1", "ddl_dml_statement"),
+        ("insert into users values (1)", "ddl_dml_statement"),
+    ],
+)
+def test_injections_are_insecure(query, rule):
+    result = detect_sql_injection(query)
+
+    assert (result.status, result.rule) == ("Insecure", rule)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        'Compare "Hottechi" and "Kan-code" revenue',
+        'What is the revenue of "Acme" or 2017?',
+        "Show deals for the 'GTX Pro' or 'MG Special' products",
+        "How many deals did we delete from the pipeline?",
+        "How many accounts did we insert into the CRM last month?",
+        "1 OR TRUE",
+        "1 or 1",
+        "name and true",
+    ],
+)
+def test_questions_that_look_like_sql_are_ambiguous(query):
+    assert detect_sql_injection(query).status is None
+
+
+def test_plain_questions_are_secure():
+    assert detect_sql_injection("What's the revenue of Acme?").status == "Secure"
@@ -0,0 +1,96 @@
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable
+import json
+import time
+
+
+# Database queries run by the tools of the agent while it answers the current request.
+# LangChain runs the sync tools in executors with a copy of the context, which still
+# refers to the same list.
+_query_log: ContextVar[list | None] = ContextVar("agent_query_log", default=None)
+
+
+def start_query_log() -> list[dict]:
+    """
+    Starts recording the database queries of the agent in the current context.
+
+    Returns:
+        list[dict]:
+            The list the queries are appended to, in execution order.
+    """
+    query_log = []
+    _query_log.set(query_log)
+    return query_log
+
+
+def log_query(
+    tool: str,
+    arguments: dict,
+    seconds: float,
+    sql: str | None = None,
+    row_count: int | None = None,
+    error: str | None = None
+) -> None:
+    """
+    Records a database query of the agent, if the current context records them.
+
+    Args:
+        tool (str): The tool that ran the query.
+        arguments (dict): The arguments the tool was called with.
+        seconds (float): How long the query took.
+        sql (str | None): The SQL of the query, for the SQL tool.
+        row_count (int | None): The number of rows returned, None if it failed.
+        error (str | None): The error raised by the query, if any.
+    """
+    query_log = _query_log.get()
+    if query_log is None:
+        return
+
+    query_log.append({
+        "tool": tool,
+        "arguments": arguments,
+        "sql": sql,
+        "row_count": row_count,
+        "seconds": seconds,
+        "error": error,
+    })
+
+
+def count_result_rows(result: str) -> int:
+    """
+    Counts the rows of the JSON result of a typed tool: the items of a list or of a
+    page, 0 for a customer that was not found and 1 for any other object.
+    """
+    value = json.loads(result)
+    if isinstance(value, list):
+        return len(value)
+    if "items" in value:
+        return len(value["items"])
+    return 0 if value.get("found") is False else 1
+
+
+def logged_tool(name: str, func: Callable[..., str]) -> Callable[..., str]:
+    """
+    Wraps a typed tool so its calls are recorded by `log_query`.
+
+    Args:
+        name (str): The name of the tool.
+        func (Callable[..., str]): The tool function, returning JSON.
+
+    Returns:
+        Callable[..., str]: The wrapped function.
+    """
+    @wraps(func)
+    def wrapper(**kwargs) -> str:
+        started_at = time.perf_counter()
+        try:
+            result = func(**kwargs)
+        except Exception as e:
+            log_query(name, kwargs, time.perf_counter() - started_at, error=str(e))
+            raise
+
+        log_query(name, kwargs, time.perf_counter() - started_at, row_count=count_result_rows(result))
+        return result
+
+    return wrapper
@@ -0,0 +1,329 @@
+from datetime import datetime
+from functools import lru_cache
+import threading
+
+from langchain_openai import ChatOpenAI
+from langgraph.prebuilt import create_react_agent
+from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
+
+from core.database import agent_engine
+from core.configs import settings
+from core.metrics import metrics
+from utils.agent_tools import build_agent_tools
+from utils.prompt_report import build_prompt_report
+from utils.sql_sandbox import SandboxedSQLDatabase
+from utils.metadata_service import metadata_service
+from utils.tables_metadata_prompt import get_tables_metadata_prompt
+
+
+# Static part of the system prompt: it must only depend on values that are stable between
+# builds, so the rendered prefix stays byte-identical and benefits from prompt caching
+SYSTEM_PROMPT_TEMPLATE = """
+    You are an agent designed to interact with a SQL database.
+    Below is the description of the tables and their columns that you can query:
+
+    {tables_metadata_prompt}
+
+    Given the input question, create a syntactically correct {dialect} query to run,
+    then look at the results of the query and return the answer.
+
+    Unless the user specifies a specific number of examples they wish to obtain,
+    always limit your query to at most {top_k} results.
+
+    You must first try to make a simple query on the gold views listed at the end of this
+    prompt. If you are not sure that the user's query can be answered by the content present
+    in these views, you must perform a more complex query on the centralized
+    table named 'stg-won_deal_stage'.
+
+    You can order the results by a relevant column to return the most interesting examples
+    in the database.
+
+    Never query for all the columns from a specific table; only ask for the relevant columns
+    given the question.
+
+    You have access to tools for interacting with the database. If the user's input question
+    is related to a date, consider today's date as the one given at the end of this prompt.
+
+    Only use the below tools. Only use the information returned by the below tools
+    to construct your final answer.
+
+    You MUST double-check your query before executing it. If you get an error while executing
+    a query, rewrite the query and try again.
+
+    DO NOT make any DML statements (INSERT, UPDATE, DELETE, DROP, etc.) to the database.
+{typed_tools_instructions}{schema_instructions}"""
+
+TYPED_TOOLS_INSTRUCTIONS = """
+    Prefer the typed tools (top_n_by_metric, customer_lookup, segment_summary and
+    query_gold_view) whenever one of them answers the question: they need a single call
+    and no SQL. Only write a SQL query when none of them fits, and use describe_tables
+    rather than querying the database to check the columns of a table.
+"""
+
+DISCOVER_SCHEMA_INSTRUCTIONS = """
+    To start, you should ALWAYS look at the tables in the database to see what you can query,
+    prioritizing getting answers from the gold views listed at the end of this prompt.
+    Do NOT skip this step.
+
+    Then you should query the schema of the most relevant tables.
+"""
+
+# With the typed tools, listing the tables is only needed for the questions they do not answer
+DISCOVER_SCHEMA_WITH_TYPED_TOOLS_INSTRUCTIONS = """
+    When none of the typed tools fits and you need to write a SQL query, look at the tables
+    in the database to see what you can query, prioritizing the gold views listed at the
+    end of this prompt, then query the schema of the most relevant tables.
+"""
+
+PREINJECTED_SCHEMA_INSTRUCTIONS = """
+    The schemas of the tables you can query are below.
+    Do NOT list the tables or query their schemas: write the query directly.
+
+    {table_info}
+"""
+
+# Dynamic part of the system prompt, appended after the static prefix
+SYSTEM_PROMPT_CONTEXT_TEMPLATE = """
+    Gold views: {views_to_query}.
+    Today's date: {today_date}.
+"""
+
+# SQL toolkit tools that are redundant once the schemas are in the prompt
+SCHEMA_DISCOVERY_TOOLS = ('sql_db_list_tables', 'sql_db_schema')
+
+
+@lru_cache(maxsize=16)
+def render_system_prompt_prefix(
+    tables_metadata_prompt: str,
+    dialect: str,
+    top_k: int,
+    typed_tools: bool,
+    schema_instructions: str
+) -> str:
+    """
+    Renders the static prefix of the system prompt, once per distinct content.
+
+    Args:
+        tables_metadata_prompt (str): The rendered description of the tables.
+        dialect (str): The SQL dialect of the database.
+        top_k (int): The default maximum number of results of a query.
+        typed_tools (bool): Whether the agent has the typed tools.
+        schema_instructions (str): How the agent learns the table schemas.
+
+    Returns:
+        str: The prefix, identical for identical arguments.
+    """
+    return SYSTEM_PROMPT_TEMPLATE.format(
+        tables_metadata_prompt=tables_metadata_prompt,
+        dialect=dialect,
+        top_k=top_k,
+        typed_tools_instructions=TYPED_TOOLS_INSTRUCTIONS if typed_tools else "",
+        schema_instructions=schema_instructions,
+    )
+
+
+class AgentRegistry:
+    """
+    Process-level registry holding the text-to-SQL agent and the objects it depends on.
+
+    Reflecting the database schema and compiling the agent graph are expensive, so they
+    are built once and reused by every request until the registry is invalidated (e.g.
+    after dbt recreates the views).
+
+    With the "discover" schema mode the agent lists the tables and reads their schemas
+    with tools before writing a query (with the typed tools, only when none of them fits);
+    with the "preinjected" mode the schemas of the gold views and of the silver table are
+    rendered into the system prompt once, at build time, and the discovery tools are not
+    given to the agent.
+
+    Attributes:
+        schema_mode (str):
+            "discover" or "preinjected".
+        typed_tools (bool):
+            Whether the typed tools of `utils.agent_tools` are given to the agent.
+        db (SandboxedSQLDatabase | None):
+            The reflected database used by the agent tools.
+        views_to_query (list[str] | None):
+            The gold views the agent should prioritize.
+        agent_executor (CompiledGraph | None):
+            The compiled ReAct agent graph.
+        prompt_report (dict | None):
+            The token counts of the static prefix and dynamic suffix of the system prompt.
+
+    Methods:
+        warm_up() -> None:
+            Builds the agent if it is not built yet.
+        get_agent() -> CompiledGraph:
+            Returns the compiled agent, building it on first use.
+        get_database() -> SandboxedSQLDatabase:
+            Returns the sandboxed database of the agent, building it on first use.
+        get_prompt_report() -> dict:
+            Returns the token counts of the system prompt, building the agent on first use.
+        invalidate() -> None:
+            Drops the cached objects so the next call rebuilds them.
+    """
+    def __init__(
+        self,
+        schema_mode: str = settings.AGENT_SCHEMA_MODE,
+        typed_tools: bool = settings.AGENT_TYPED_TOOLS
+    ):
+        """
+        Initializes an empty registry.
+
+        Args:
+            schema_mode (str):
+                "discover" or "preinjected". Default is the AGENT_SCHEMA_MODE setting.
+            typed_tools (bool):
+                Whether the typed tools are given to the agent. Default is the
+                AGENT_TYPED_TOOLS setting.
+
+        Raises:
+            ValueError:
+                If the schema mode is unknown.
+        """
+        if schema_mode not in ("discover", "preinjected"):
+            raise ValueError(f"Unknown agent schema mode: {schema_mode}")
+
+        self.schema_mode = schema_mode
+        self.typed_tools = typed_tools
+        self._lock = threading.Lock()
+        self.db = None
+        self.views_to_query = None
+        self.agent_executor = None
+        self.prompt_report = None
+
+    def _build(self) -> None:
+        """
+        Reflects the schema, builds the toolkit and compiles the agent graph.
+        """
+        db = SandboxedSQLDatabase(
+            engine=agent_engine,
+            schema=settings.DB_SCHEMA,
+            view_support=True,
+            # Sample rows change with every rebuild of the data, and in the preinjected mode
+            # the schemas are part of the static prefix of the system prompt
+            sample_rows_in_table_info=0 if self.schema_mode == "preinjected" else 3,
+        )
+
+        views_to_query = [
+            table
+            for table in db.get_usable_table_names()
+            if not table.endswith('_source')
+            and not table.startswith('raw-')
+            and not table.startswith('stg-')
+        ]
+
+        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+
+        toolkit = SQLDatabaseToolkit(
+            db=db,
+            llm=llm
+        )
+
+        tools = toolkit.get_tools()
+
+        if self.schema_mode == "preinjected":
+            tools = [tool for tool in tools if tool.name not in SCHEMA_DISCOVERY_TOOLS]
+            schema_instructions = PREINJECTED_SCHEMA_INSTRUCTIONS.format(
+                table_info=db.get_table_info(sorted(views_to_query) + ['stg-won_deal_stage'])
+            )
+        elif self.typed_tools:
+            schema_instructions = DISCOVER_SCHEMA_WITH_TYPED_TOOLS_INSTRUCTIONS
+        else:
+            schema_instructions = DISCOVER_SCHEMA_INSTRUCTIONS
+
+        if self.typed_tools:
+            tools = build_agent_tools() + tools
+
+        prefix = render_system_prompt_prefix(
+            tables_metadata_prompt=get_tables_metadata_prompt(metadata_service.get_tables_metadata()),
+            dialect=db.dialect,
+            top_k=10,
+            typed_tools=self.typed_tools,
+            schema_instructions=schema_instructions,
+        )
+        suffix = SYSTEM_PROMPT_CONTEXT_TEMPLATE.format(
+            views_to_query=sorted(views_to_query),
+            today_date=datetime(2018, 1, 1),
+        )
+
+        prompt_report = build_prompt_report(prefix, suffix)
+        metrics.set_gauge("agent.prompt.prefix_tokens", prompt_report["prefix_tokens"])
+        metrics.set_gauge("agent.prompt.suffix_tokens", prompt_report["suffix_tokens"])
+        print(
+            f"Agent system prompt: {prompt_report['prefix_tokens']} static prefix token(s) "
+            f"({prompt_report['prefix_sha256'][:12]}), {prompt_report['suffix_tokens']} dynamic "
+            f"token(s), counted by {prompt_report['method']}."
+        )
+
+        self.db = db
+        self.views_to_query = views_to_query
+        self.prompt_report = prompt_report
+        self.agent_executor = create_react_agent(
+            model=llm,
+            tools=tools,
+            state_modifier=prefix + suffix
+        )
+
+    def warm_up(self) -> None:
+        """
+        Builds the agent if it has not been built yet.
+        """
+        self.get_agent()
+
+    def get_agent(self):
+        """
+        Returns the compiled agent graph, building it on first use.
+
+        Returns:
+            CompiledGraph:
+                The ReAct agent ready to be invoked or streamed.
+        """
+        agent_executor = self.agent_executor
+        if agent_executor is not None:
+            return agent_executor
+
+        with self._lock:
+            if self.agent_executor is None:
+                self._build()
+            return self.agent_executor
+
+    def get_database(self) -> SandboxedSQLDatabase:
+        """
+        Returns the sandboxed database of the agent, building the agent on first use.
+
+        Returns:
+            SandboxedSQLDatabase:
+                The database the SQL queries of the agent run on.
+        """
+        with self._lock:
+            if self.agent_executor is None:
+                self._build()
+            return self.db
+
+    def get_prompt_report(self) -> dict:
+        """
+        Returns the token counts of the system prompt, building the agent on first use.
+
+        Returns:
+            dict:
+                The report of `utils.prompt_report.build_prompt_report`.
+        """
+        with self._lock:
+            if self.agent_executor is None:
+                self._build()
+            return self.prompt_report
+
+    def invalidate(self) -> None:
+        """
+        Drops the reflected schema and the compiled agent so they are rebuilt on next use.
+        """
+        with self._lock:
+            self.db = None
+            self.views_to_query = None
+            self.agent_executor = None
+            self.prompt_report = None
+        print("Agent registry invalidated.")
+
+
+agent_registry = AgentRegistry()
@@ -0,0 +1,57 @@
+import json
+import time
+
+from models.historic_messages_model import AgentQueryDB
+from utils.agent_query_log import count_result_rows
+from utils.agent_tools import REPLAYABLE_TOOLS, to_json
+from utils.sql_sandbox import SandboxedSQLDatabase
+
+
+def replay_query(db: SandboxedSQLDatabase, query: AgentQueryDB) -> dict:
+    """
+    Runs a stored query of the agent again, without the LLM.
+
+    SQL queries run in the execution sandbox, with the same limits as when the agent wrote
+    them; typed tools are called again with the same arguments.
+
+    Args:
+        db (SandboxedSQLDatabase): The sandboxed database of the agent.
+        query (AgentQueryDB): The stored query.
+
+    Returns:
+        dict: The query, its fresh result and how long it took, or the error it raised.
+    """
+    replayed = {
+        "position": query.position,
+        "tool": query.tool,
+        "arguments": query.arguments,
+        "sql": query.sql,
+    }
+
+    started_at = time.perf_counter()
+    try:
+        if query.sql is not None:
+            rows, truncated = db.fetch(query.sql)
+            replayed.update(result=json.loads(to_json(rows)), row_count=len(rows), truncated=truncated)
+        else:
+            result = REPLAYABLE_TOOLS[query.tool](**query.arguments)
+            replayed.update(result=json.loads(result), row_count=count_result_rows(result))
+    except Exception as e:
+        replayed["error"] = str(e)
+
+    replayed["seconds"] = time.perf_counter() - started_at
+    return replayed
+
+
+def replay_queries(db: SandboxedSQLDatabase, queries: list[AgentQueryDB]) -> list[dict]:
+    """
+    Runs again the stored queries of an answer that succeeded when it was written.
+
+    Args:
+        db (SandboxedSQLDatabase): The sandboxed database of the agent.
+        queries (list[AgentQueryDB]): The stored queries of the answer.
+
+    Returns:
+        list[dict]: The replayed queries, in their original order.
+    """
+    return [replay_query(db, query) for query in queries if query.error is None]
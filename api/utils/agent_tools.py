@@ -0,0 +1,344 @@
+from decimal import Decimal
+from typing import get_args
+import json
+
+from langchain_core.tools import StructuredTool, ToolException
+from sqlalchemy import column, func, select, table
+
+from core.configs import settings
+from core.database import AgentSession
+from schemas.agent_tools_schema import (CustomerLookupArgs,
+                                        DescribeTablesArgs,
+                                        GoldViewQueryArgs,
+                                        SegmentSummaryArgs,
+                                        TopNByMetricArgs,
+                                        TopNDimension)
+from utils.agent_query_log import logged_tool
+from utils.gold_analytics import GOLD_MODELS, query_gold_model
+from utils.metadata_service import metadata_service
+
+
+SILVER_TABLE = 'stg-won_deal_stage'
+
+# Aggregate function and column of each metric of `top_n_by_metric`
+TOP_N_METRICS = {
+    'total_revenue': ('sum', 'business_close_value'),
+    'won_deals': ('count_distinct', 'opportunity_id'),
+    'average_deal_value': ('avg', 'business_close_value'),
+    'average_sales_cycle_duration': ('avg', 'business_sales_cycle_duration'),
+    'customers': ('count_distinct', 'customer'),
+}
+
+SEGMENT_COLUMNS = {
+    'rfm': 'customer_recency_frequency_monetary_segment',
+    'cltv': 'predicted_customer_lifetime_value_segment',
+}
+
+# Gold views with customer-level values, read by `customer_lookup`. They have one row per
+# customer, except customer-retention-analysis, which has one row per won deal of the
+# customers likely to be alive, with the same values on every deal of a customer
+CUSTOMER_GOLD_VIEWS = [
+    'customer-profitability-analysis',
+    'customer-retention-analysis',
+    'customer-segmentation-analysis',
+]
+
+SILVER_COLUMNS = [
+    'opportunity_id',
+    'customer',
+    'business_close_value',
+    'business_sales_cycle_duration',
+    'prob_alive_customer',
+    'predicted_year_customer_lifetime_value',
+    *get_args(TopNDimension),
+    *SEGMENT_COLUMNS.values(),
+]
+
+
+def silver_relation():
+    """
+    Returns the silver table as a lightweight SQLAlchemy relation.
+    """
+    return table(
+        SILVER_TABLE,
+        *[column(name) for name in dict.fromkeys(SILVER_COLUMNS)],
+        schema=settings.DB_SCHEMA
+    )
+
+
+def escape_like(value: str) -> str:
+    """
+    Escapes the LIKE wildcards of a value (with a backslash), so it is matched literally.
+    """
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def to_json(rows: list[dict]) -> str:
+    """
+    Serializes rows for the agent, rounding numbers to keep the observation short.
+    """
+    def to_value(value):
+        if isinstance(value, Decimal):
+            value = int(value) if value == value.to_integral_value() else float(value)
+        return round(value, 4) if isinstance(value, float) else value
+
+    return json.dumps(
+        [{key: to_value(value) for key, value in row.items()} for row in rows],
+        default=str
+    )
+
+
+def top_n_by_metric(metric: str, group_by: str, n: int = 10, ascending: bool = False) -> str:
+    """
+    Ranks the groups of won deals by a metric.
+
+    Args:
+        metric (str): A metric of `TOP_N_METRICS`.
+        group_by (str): The column the won deals are grouped by.
+        n (int): The number of groups to return. Default is 10.
+        ascending (bool): Whether the lowest values come first. Default is False.
+
+    Returns:
+        str: The groups and their metric value, as JSON.
+    """
+    relation = silver_relation()
+    aggregate, column_name = TOP_N_METRICS[metric]
+    if aggregate == 'count_distinct':
+        value = func.count(relation.c[column_name].distinct())
+    else:
+        value = getattr(func, aggregate)(relation.c[column_name])
+
+    value = value.label(metric)
+    order = value.asc() if ascending else value.desc()
+    query = (
+        select(relation.c[group_by], value)
+        .group_by(relation.c[group_by])
+        .order_by(order.nulls_last(), relation.c[group_by])
+        .limit(n)
+    )
+
+    with AgentSession() as session:
+        rows = session.execute(query).mappings().all()
+
+    return to_json([dict(row) for row in rows])
+
+
+def customer_lookup(customer: str) -> str:
+    """
+    Returns everything the gold views know about a customer.
+
+    When the name matches no customer, the closest customer names are returned instead.
+
+    Args:
+        customer (str): The name of the customer account.
+
+    Returns:
+        str: The row of the customer in each customer gold view, as JSON.
+    """
+    with AgentSession() as session:
+        profile = {}
+        for key in CUSTOMER_GOLD_VIEWS:
+            page = query_gold_model(session, GOLD_MODELS[key], {'customer': customer}, limit=1, offset=0)
+            if page.items:
+                profile[GOLD_MODELS[key].name] = page.items[0].model_dump()
+
+        if profile:
+            return json.dumps({'customer': customer, **profile}, default=str)
+
+        relation = silver_relation()
+        candidates = session.execute(
+            select(relation.c.customer)
+            .where(relation.c.customer.ilike(f"%{escape_like(customer)}%", escape='\\'))
+            .distinct()
+            .order_by(relation.c.customer)
+            .limit(10)
+        ).scalars().all()
+
+    return json.dumps({'customer': customer, 'found': False, 'similar_customers': candidates})
+
+
+def segment_summary(segment_by: str = 'rfm') -> str:
+    """
+    Summarizes the customers and won deals of each customer segment.
+
+    Customer-level values (probability of being alive, predicted lifetime value) are
+    averaged over customers, not over deals.
+
+    Args:
+        segment_by (str): "rfm" or "cltv". Default is "rfm".
+
+    Returns:
+        str: The customers, deals, revenue and averages of each segment, as JSON.
+    """
+    relation = silver_relation()
+    segment_column = relation.c[SEGMENT_COLUMNS[segment_by]]
+
+    per_customer = (
+        select(
+            relation.c.customer,
+            func.max(segment_column).label('segment'),
+            func.count(relation.c.opportunity_id.distinct()).label('won_deals'),
+            func.sum(relation.c.business_close_value).label('revenue'),
+            func.max(relation.c.prob_alive_customer).label('prob_alive_customer'),
+            func.max(relation.c.predicted_year_customer_lifetime_value).label('predicted_year_cltv'),
+        )
+        .group_by(relation.c.customer)
+        .subquery()
+    )
+    query = (
+        select(
+            per_customer.c.segment,
+            func.count().label('customers'),
+            func.sum(per_customer.c.won_deals).label('won_deals'),
+            func.sum(per_customer.c.revenue).label('total_revenue'),
+            func.avg(per_customer.c.prob_alive_customer).label('average_prob_alive_customer'),
+            func.avg(per_customer.c.predicted_year_cltv).label('average_predicted_year_cltv'),
+        )
+        .group_by(per_customer.c.segment)
+        .order_by(func.sum(per_customer.c.revenue).desc().nulls_last())
+    )
+
+    with AgentSession() as session:
+        rows = session.execute(query).mappings().all()
+
+    return to_json([dict(row) for row in rows])
+
+
+def query_gold_view(view: str, filters: dict | None = None, limit: int = 10) -> str:
+    """
+    Reads the first rows of a gold view, in the order of its ranking.
+
+    Args:
+        view (str): The key of the view in `GOLD_MODELS`.
+        filters (dict | None): The filter values by filter name.
+        limit (int): The maximum number of rows to return. Default is 10.
+
+    Returns:
+        str: The rows and the number of matching rows, as JSON.
+
+    Raises:
+        ToolException: If a filter is not accepted by the view.
+    """
+    model = GOLD_MODELS[view]
+    filters = filters or {}
+
+    unknown = sorted(set(filters) - set(model.filters))
+    if unknown:
+        raise ToolException(
+            f"Unknown filter(s) {unknown} for {view}; accepted filters: {sorted(model.filters)}."
+        )
+
+    with AgentSession() as session:
+        page = query_gold_model(session, model, filters, limit=limit, offset=0)
+
+    return page.model_dump_json(exclude={'limit', 'offset'})
+
+
+def describe_tables(tables: list[str]) -> str:
+    """
+    Describes tables from the metadata service, without querying the database.
+
+    Args:
+        tables (list[str]): The names of the tables to describe.
+
+    Returns:
+        str: The columns, types, descriptions and statistics of each table, as JSON.
+
+    Raises:
+        ToolException: If a table is unknown.
+    """
+    metadata = {table.name: table for table in metadata_service.get_tables_metadata()}
+
+    unknown = sorted(set(tables) - set(metadata))
+    if unknown:
+        raise ToolException(f"Unknown table(s) {unknown}; known tables: {sorted(metadata)}.")
+
+    return json.dumps(
+        [metadata[name].model_dump(exclude_none=True) for name in dict.fromkeys(tables)]
+    )
+
+
+def describe_gold_view_filters() -> str:
+    """
+    Lists the accepted filters of every gold view, for the tool description.
+    """
+    return '; '.join(
+        f"{key}: {', '.join(model.filters) or 'none'}"
+        for key, model in GOLD_MODELS.items()
+    )
+
+
+# Typed tools querying the database, which can be replayed from their stored arguments
+REPLAYABLE_TOOLS = {
+    'top_n_by_metric': top_n_by_metric,
+    'customer_lookup': customer_lookup,
+    'segment_summary': segment_summary,
+    'query_gold_view': query_gold_view,
+}
+
+
+def build_agent_tools() -> list[StructuredTool]:
+    """
+    Builds the typed tools answering the common questions without writing SQL.
+
+    Each tool runs a single parameterized query over the gold views or the silver table,
+    so the agent needs one call instead of listing the tables, reading their schemas and
+    writing a query. The calls of the tools querying the database are recorded by
+    `utils.agent_query_log`.
+
+    Returns:
+        list[StructuredTool]: The tools, to be given to the agent next to the SQL tools.
+    """
+    return [
+        StructuredTool.from_function(
+            func=logged_tool("top_n_by_metric", top_n_by_metric),
+            name="top_n_by_metric",
+            description=(
+                "Ranks customers, sales agents, managers, regional offices, products, product series, "
+                "sectors or office locations by a metric over the won deals (total revenue, number of "
+                "won deals, average deal value, average sales cycle duration or number of customers)."
+            ),
+            args_schema=TopNByMetricArgs,
+            handle_tool_error=True,
+        ),
+        StructuredTool.from_function(
+            func=logged_tool("customer_lookup", customer_lookup),
+            name="customer_lookup",
+            description=(
+                "Returns the profile of a customer: profitability rank, RFM segment, engagement, "
+                "probability of being alive, expected purchases and predicted lifetime value."
+            ),
+            args_schema=CustomerLookupArgs,
+            handle_tool_error=True,
+        ),
+        StructuredTool.from_function(
+            func=logged_tool("segment_summary", segment_summary),
+            name="segment_summary",
+            description=(
+                "Summarizes each customer segment (RFM or predicted CLTV segment): number of customers, "
+                "won deals, total revenue, average probability of being alive and predicted yearly CLTV."
+            ),
+            args_schema=SegmentSummaryArgs,
+            handle_tool_error=True,
+        ),
+        StructuredTool.from_function(
+            func=logged_tool("query_gold_view", query_gold_view),
+            name="query_gold_view",
+            description=(
+                "Reads the top rows of a gold view, already ranked, with optional equality or threshold "
+                f"filters. Accepted filters by view: {describe_gold_view_filters()}."
+            ),
+            args_schema=GoldViewQueryArgs,
+            handle_tool_error=True,
+        ),
+        StructuredTool.from_function(
+            func=describe_tables,
+            name="describe_tables",
+            description=(
+                "Describes the columns of silver and gold tables: type, description, number of "
+                "distinct values and most common values, with the approximate row count of each table."
+            ),
+            args_schema=DescribeTablesArgs,
+            handle_tool_error=True,
+        ),
+    ]
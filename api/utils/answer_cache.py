@@ -0,0 +1,223 @@
+from dataclasses import dataclass
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+from core.configs import settings
+from utils.ttl_cache import TTLCache
+
+
+EMBEDDING_DIMENSION = 512
+
+# Words that do not change what a query asks. Negations ("not", "no", "never") and
+# prefixed words ("unlikely") are content words: the embedding barely sees them.
+STOP_WORDS = frozenset({
+    "a", "an", "the", "of", "for", "to", "in", "on", "at", "by", "from", "with", "as",
+    "is", "are", "was", "were", "be", "been", "do", "does", "did", "have", "has", "had",
+    "which", "what", "who", "whom", "whose", "how", "show", "list", "give", "tell", "me",
+    "us", "i", "we", "our", "my", "please", "can", "could", "would", "you", "there",
+    "that", "this", "these", "those", "it", "its",
+})
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a natural-language query so trivially different spellings share a key.
+
+    Args:
+        query (str):
+            The user's query.
+
+    Returns:
+        str:
+            The query lower-cased, without accents, punctuation or repeated whitespace.
+    """
+    query = unicodedata.normalize("NFKD", query)
+    query = "".join(char for char in query if not unicodedata.combining(char))
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+
+def content_words(normalized_query: str) -> frozenset[str]:
+    """
+    Returns the words of a normalized query that change what it asks.
+
+    Args:
+        normalized_query (str):
+            A query returned by `normalize_query`.
+
+    Returns:
+        frozenset[str]:
+            The words of the query, numbers and negations included, without `STOP_WORDS`.
+    """
+    return frozenset(normalized_query.split()) - STOP_WORDS
+
+
+def embed_query(normalized_query: str) -> np.ndarray:
+    """
+    Computes a local embedding of a normalized query with the hashing trick.
+
+    Words and character trigrams are hashed into a fixed-size vector, which is then
+    L2-normalized so the dot product of two embeddings is their cosine similarity.
+
+    Args:
+        normalized_query (str):
+            A query returned by `normalize_query`.
+
+    Returns:
+        np.ndarray:
+            The unit-norm embedding of the query.
+    """
+    vector = np.zeros(EMBEDDING_DIMENSION, dtype=np.float32)
+
+    features = normalized_query.split()
+    padded = f" {normalized_query} "
+    features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    for feature in features:
+        vector[zlib.crc32(feature.encode()) % EMBEDDING_DIMENSION] += 1.0
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class CachedAnswer:
+    """
+    An answer stored in the answer cache.
+
+    Attributes:
+        answer (str):
+            The final answer produced by the agent.
+        embedding (np.ndarray):
+            The embedding of the normalized query.
+        content_words (frozenset[str]):
+            The content words of the query (see `content_words`), which must match exactly.
+    """
+    answer: str
+    embedding: np.ndarray
+    content_words: frozenset[str]
+
+
+class AnswerCache:
+    """
+    Cache of agent answers with exact and semantic lookup.
+
+    A query is first looked up by its normalized text; on a miss, the cached query with
+    the most similar embedding is used if the similarity reaches the threshold and both
+    queries have the same content words. The hashed embedding cannot tell negations or
+    antonyms apart ("likely" and "unlikely" to churn are above the threshold), so the
+    similarity only tolerates differences of stop words, word order and punctuation.
+
+    An answer computed before a `clear` is dropped by `put` when it is given the
+    `generation` read before the agent ran.
+
+    Args:
+        max_entries (int):
+            Maximum number of cached answers (LRU eviction).
+        ttl_seconds (float):
+            Time, in seconds, an answer stays valid.
+        similarity_threshold (float):
+            Minimum cosine similarity for a semantic hit.
+
+    Methods:
+        get(query: str) -> str | None:
+            Returns the cached answer for the query, if any.
+        put(query: str, answer: str, generation: int | None = None) -> None:
+            Caches the answer of a query, unless the cache was cleared since `generation`.
+        clear() -> None:
+            Drops every cached answer.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.similarity_threshold = similarity_threshold
+        self._entries = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get(self, query: str) -> str | None:
+        """
+        Returns the cached answer for a query.
+
+        Args:
+            query (str):
+                The user's query.
+
+        Returns:
+            str | None:
+                The cached answer, or None on a miss.
+        """
+        normalized = normalize_query(query)
+
+        entry = self._entries.get(normalized)
+        if entry is not None:
+            return entry.answer
+
+        entries = self._entries.items()
+        if not entries:
+            return None
+
+        words = content_words(normalized)
+        embedding = embed_query(normalized)
+
+        keys = [key for key, _ in entries]
+        similarities = np.vstack([cached.embedding for _, cached in entries]) @ embedding
+
+        for index in np.argsort(similarities)[::-1]:
+            if similarities[index] < self.similarity_threshold:
+                break
+
+            cached = entries[index][1]
+            if cached.content_words == words:
+                # Refresh the recency of the matched entry
+                self._entries.get(keys[index])
+                return cached.answer
+
+        return None
+
+    @property
+    def generation(self) -> int:
+        """
+        The number of times the cache was cleared, to be read before computing an answer.
+        """
+        return self._entries.generation
+
+    def put(self, query: str, answer: str, generation: int | None = None) -> None:
+        """
+        Caches the answer of a query.
+
+        Args:
+            query (str):
+                The user's query.
+            answer (str):
+                The final answer produced by the agent.
+            generation (int | None):
+                The `generation` read before the answer was computed. The answer is
+                dropped if the cache was cleared since then. Default is None.
+        """
+        if not answer:
+            return
+
+        normalized = normalize_query(query)
+        self._entries.put(
+            normalized,
+            CachedAnswer(
+                answer=answer,
+                embedding=embed_query(normalized),
+                content_words=content_words(normalized)
+            ),
+            generation=generation
+        )
+
+    def clear(self) -> None:
+        """
+        Drops every cached answer.
+        """
+        self._entries.clear()
+        print("Answer cache cleared.")
+
+
+answer_cache = AnswerCache(
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+)
@@ -0,0 +1,75 @@
+from tempfile import SpooledTemporaryFile
+
+import fireducks.pandas as pd
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+NULL_MARKER = '\\N'
+TYPED_NA_VALUES = [NULL_MARKER, '', 'NaN', 'nan']
+
+
+def read_query_columnar(
+    session: Session,
+    query: Select,
+    dtypes: dict[str, str] | None = None,
+    date_columns: list[str] | None = None
+) -> pd.DataFrame:
+    """
+    Reads the result of a query straight into a DataFrame through `COPY ... TO STDOUT`.
+
+    The rows are streamed by Postgres as CSV into a spooled buffer (kept in memory up to
+    `SPOOL_MAX_SIZE`, then on disk) and parsed column by column, so no ORM object or
+    per-row Python dict is created. The query runs on the session's connection, in the
+    session's transaction.
+
+    Columns listed in `dtypes` or `date_columns` are converted while parsing; every other
+    column is kept as a string. In string columns only NULLs are read as missing values,
+    while in converted columns empty strings and 'NaN' are missing values too, as with
+    `astype(float)` and `pd.to_datetime`.
+
+    Args:
+        session (Session): Database session.
+        query (Select): The query to read.
+        dtypes (dict[str, str] | None): The dtype of some columns (e.g. {'close_value': 'float64'}).
+        date_columns (list[str] | None): The columns to parse as datetimes.
+
+    Returns:
+        pd.DataFrame: DataFrame containing the query result.
+    """
+
+    dtypes = dtypes or {}
+    date_columns = date_columns or []
+    column_names = [column.name for column in query.selected_columns]
+
+    compiled = query.compile(
+        dialect=session.get_bind().dialect,
+        compile_kwargs={"render_postcompile": True}
+    )
+
+    dbapi_connection = session.connection().connection
+    with dbapi_connection.cursor() as cursor, SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as buffer:
+        sql = cursor.mogrify(str(compiled), compiled.params).decode()
+        cursor.copy_expert(
+            f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '{NULL_MARKER}')",
+            buffer
+        )
+        buffer.seek(0)
+
+        df = pd.read_csv(
+            buffer,
+            dtype={
+                column: dtypes.get(column, str)
+                for column in column_names
+                if column not in date_columns
+            },
+            parse_dates=[column for column in date_columns if column in column_names],
+            keep_default_na=False,
+            na_values={
+                column: TYPED_NA_VALUES if column in dtypes or column in date_columns else [NULL_MARKER]
+                for column in column_names
+            },
+        )
+
+    return df
@@ -0,0 +1,196 @@
+from tempfile import SpooledTemporaryFile
+import random
+import time
+
+import fireducks.pandas as pd
+from sqlalchemy import Connection, Engine, text
+from sqlalchemy.exc import OperationalError
+
+from core.configs import settings
+from utils.bulk_reader import NULL_MARKER, SPOOL_MAX_SIZE
+
+
+STAGING_SUFFIX = '__staging'
+
+DEPENDENT_VIEWS_QUERY = """
+    WITH RECURSIVE dependents AS (
+        SELECT rewrite.ev_class AS oid, 1 AS depth
+        FROM pg_depend depend
+        JOIN pg_rewrite rewrite ON rewrite.oid = depend.objid
+        WHERE depend.classid = 'pg_rewrite'::regclass
+          AND depend.refobjid = CAST(:relation AS regclass)
+          AND rewrite.ev_class <> depend.refobjid
+        UNION
+        SELECT rewrite.ev_class, dependents.depth + 1
+        FROM dependents
+        JOIN pg_depend depend ON depend.refobjid = dependents.oid
+        JOIN pg_rewrite rewrite ON rewrite.oid = depend.objid
+        WHERE depend.classid = 'pg_rewrite'::regclass
+          AND rewrite.ev_class <> dependents.oid
+    )
+    SELECT
+        namespace.nspname,
+        class.relname,
+        class.relkind,
+        pg_get_viewdef(class.oid),
+        MAX(dependents.depth) AS depth
+    FROM dependents
+    JOIN pg_class class ON class.oid = dependents.oid
+    JOIN pg_namespace namespace ON namespace.oid = class.relnamespace
+    GROUP BY namespace.nspname, class.relname, class.relkind, class.oid
+    ORDER BY depth, class.relname
+"""
+
+
+def quote_identifier(*names: str) -> str:
+    """
+    Quotes a (possibly schema-qualified) Postgres identifier.
+
+    Args:
+        *names (str): The identifier parts, e.g. the schema and the table name.
+
+    Returns:
+        str: The quoted identifier, e.g. '"dev"."my_table"'.
+    """
+    return '.'.join('"' + name.replace('"', '""') + '"' for name in names)
+
+
+def copy_dataframe(conn: Connection, df: pd.DataFrame, schema: str, table_name: str) -> int:
+    """
+    Appends the rows of a DataFrame to an existing table with `COPY ... FROM STDIN`.
+
+    The DataFrame is serialized once as CSV into a spooled buffer (kept in memory up to
+    `SPOOL_MAX_SIZE`, then on disk) and streamed to Postgres in a single COPY, instead
+    of the row-batched INSERTs of `to_sql`.
+
+    Args:
+        conn (Connection): The connection, whose transaction the COPY joins.
+        df (pd.DataFrame): The rows to append; its columns must exist in the table.
+        schema (str): The schema of the table.
+        table_name (str): The name of the table.
+
+    Returns:
+        int: The number of rows copied.
+    """
+    columns = ', '.join(quote_identifier(column) for column in df.columns)
+
+    with SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode='w+') as buffer:
+        df.to_csv(buffer, index=False, header=False, na_rep=NULL_MARKER)
+        buffer.seek(0)
+
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote_identifier(schema, table_name)} ({columns}) "
+                f"FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')",
+                buffer
+            )
+            return cursor.rowcount
+
+
+def get_dependent_views(conn: Connection, schema: str, table_name: str) -> list[tuple]:
+    """
+    Returns the views and materialized views depending, directly or not, on a table.
+
+    Args:
+        conn (Connection): The database connection.
+        schema (str): The schema of the table.
+        table_name (str): The name of the table.
+
+    Returns:
+        list[tuple]:
+            The (schema, name, relkind, definition, depth) of each view, ordered so
+            that a view comes after every view it depends on.
+    """
+    return conn.execute(
+        text(DEPENDENT_VIEWS_QUERY),
+        {"relation": quote_identifier(schema, table_name)}
+    ).all()
+
+
+def swap_table(conn: Connection, schema: str, staging_name: str, table_name: str) -> None:
+    """
+    Replaces a table by a staging table and recreates the views depending on it.
+
+    Views are bound to the table they were created on, so the dependent views are
+    dropped with the old table and recreated on the new one from their current
+    definitions. The table and its views are locked up front, in a single statement,
+    so the swap itself never waits on a reader halfway through.
+
+    Args:
+        conn (Connection): The connection, whose transaction the swap joins.
+        schema (str): The schema of both tables.
+        staging_name (str): The name of the loaded staging table.
+        table_name (str): The name of the table to replace.
+    """
+    table_exists = conn.execute(
+        text("SELECT to_regclass(:relation) IS NOT NULL"),
+        {"relation": quote_identifier(schema, table_name)}
+    ).scalar()
+    views = get_dependent_views(conn, schema, table_name) if table_exists else []
+
+    if table_exists:
+        relations = [quote_identifier(schema, table_name)] + [
+            quote_identifier(view_schema, view_name) for view_schema, view_name, *_ in views
+        ]
+        conn.execute(text(f"LOCK TABLE {', '.join(relations)} IN ACCESS EXCLUSIVE MODE"))
+
+    for view_schema, view_name, relkind, _, _ in reversed(views):
+        kind = 'MATERIALIZED VIEW' if relkind == 'm' else 'VIEW'
+        conn.execute(text(f"DROP {kind} {quote_identifier(view_schema, view_name)}"))
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {quote_identifier(schema, table_name)}"))
+    conn.execute(text(
+        f"ALTER TABLE {quote_identifier(schema, staging_name)} "
+        f"RENAME TO {quote_identifier(table_name)}"
+    ))
+
+    for view_schema, view_name, relkind, definition, _ in views:
+        kind = 'MATERIALIZED VIEW' if relkind == 'm' else 'VIEW'
+        conn.execute(text(
+            f"CREATE {kind} {quote_identifier(view_schema, view_name)} AS {definition}"
+        ))
+
+
+def replace_tables(engine: Engine, schema: str, dataframes: dict[str, pd.DataFrame]) -> None:
+    """
+    Atomically replaces the content of some tables by DataFrames.
+
+    Every DataFrame is first copied into its own staging table, in a transaction that
+    does not touch the live tables. Then all the tables are swapped in a second, short
+    transaction, so the new tables become visible together on commit and readers never
+    see a missing relation.
+
+    The swap needs exclusive locks on the tables and their views. It waits at most
+    `BULK_WRITE_SWAP_LOCK_TIMEOUT_MS` for them (shorter than Postgres' deadlock timeout,
+    so a reader is never chosen as a deadlock victim) and is retried with a backoff up to
+    `BULK_WRITE_SWAP_MAX_ATTEMPTS` times.
+
+    Args:
+        engine (Engine): The database engine.
+        schema (str): The schema of the tables.
+        dataframes (dict[str, pd.DataFrame]): The new content of each table, by table name.
+    """
+    with engine.begin() as conn:
+        for table_name, df in dataframes.items():
+            staging_name = f"{table_name}{STAGING_SUFFIX}"
+
+            # Creates the staging table with the same column types `to_sql` would use
+            df.head(0).to_sql(staging_name, con=conn, schema=schema, index=False, if_exists="replace")
+            rowcount = copy_dataframe(conn, df, schema, staging_name)
+            print(f"Copied {rowcount} row(s) into {staging_name}.")
+
+    for attempt in range(1, settings.BULK_WRITE_SWAP_MAX_ATTEMPTS + 1):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"SET LOCAL lock_timeout = {settings.BULK_WRITE_SWAP_LOCK_TIMEOUT_MS}"))
+                for table_name in dataframes:
+                    swap_table(conn, schema, f"{table_name}{STAGING_SUFFIX}", table_name)
+            break
+        except OperationalError as e:
+            if attempt == settings.BULK_WRITE_SWAP_MAX_ATTEMPTS:
+                raise e
+            print(f"Swap attempt {attempt} could not lock the tables, retrying: {e.orig}")
+            time.sleep(random.uniform(0, 0.1 * attempt))
+
+    for table_name in dataframes:
+        print(f"Table {table_name} successfully replaced.")
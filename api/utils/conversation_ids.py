@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+
+# Conversation IDs are 64-bit integers: the milliseconds since this epoch in the high
+# bits and the low bits of a Postgres sequence in the 22 low bits. They are unique across
+# API processes and ordered by creation time, so old conversations are an ID range.
+CONVERSATION_ID_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+CONVERSATION_ID_SEQUENCE_BITS = 22
+
+ALLOCATE_CONVERSATION_ID_QUERY = f"""
+    SELECT (
+        (floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint - :epoch_ms)
+        << {CONVERSATION_ID_SEQUENCE_BITS}
+    ) | (nextval('public.conversation_id_seq') & {(1 << CONVERSATION_ID_SEQUENCE_BITS) - 1})
+"""
+
+
+def to_epoch_ms(moment: datetime) -> int:
+    """
+    Returns the milliseconds between `CONVERSATION_ID_EPOCH` and a moment (UTC if naive).
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int((moment - CONVERSATION_ID_EPOCH).total_seconds() * 1000)
+
+
+async def aallocate_conversation_id(session) -> int:
+    """
+    Allocates a new conversation ID from the Postgres clock and sequence.
+
+    Args:
+        session (AsyncSession):
+            The async database session used to execute the query.
+
+    Returns:
+        int:
+            The conversation ID.
+    """
+    return (await session.execute(
+        text(ALLOCATE_CONVERSATION_ID_QUERY),
+        {"epoch_ms": int(CONVERSATION_ID_EPOCH.timestamp() * 1000)}
+    )).scalar_one()
+
+
+def conversation_id_lower_bound(moment: datetime) -> int:
+    """
+    Returns the lowest conversation ID allocated at or after a moment.
+
+    Args:
+        moment (datetime):
+            The moment, UTC if naive.
+
+    Returns:
+        int:
+            The ID bound: every conversation created before the moment has a lower ID.
+    """
+    return max(to_epoch_ms(moment), 0) << CONVERSATION_ID_SEQUENCE_BITS
+
+
+def conversation_id_created_at(conversation_id: int) -> datetime:
+    """
+    Returns when a conversation ID was allocated, to the millisecond.
+
+    Args:
+        conversation_id (int):
+            The conversation ID.
+
+    Returns:
+        datetime:
+            The allocation time, in UTC.
+    """
+    milliseconds = conversation_id >> CONVERSATION_ID_SEQUENCE_BITS
+    return datetime.fromtimestamp(CONVERSATION_ID_EPOCH.timestamp() + milliseconds / 1000, tz=timezone.utc)
@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+import time
+
+from dbt.cli.main import dbtRunner, dbtRunnerResult
+
+from core.configs import settings
+from core.metrics import metrics
+
+
+# Files whose changes make the cached manifest stale
+PROJECT_FILE_EXTENSIONS = ('.sql', '.yml', '.yaml', '.csv', '.md')
+PROJECT_SUBDIRECTORIES = ('models', 'macros', 'seeds', 'snapshots', 'tests', 'analyses')
+
+
+def source_selector(table_name: str, source_name: str = 'CRM') -> str:
+    """
+    Returns the dbt selector of a source table and every model downstream of it.
+
+    Args:
+        table_name (str): The name of the source table.
+        source_name (str): The name of the dbt source. Default is 'CRM'.
+
+    Returns:
+        str: The selector, e.g. 'source:CRM.customers_rfm_features_source+'.
+    """
+    return f"source:{source_name}.{table_name}+"
+
+
+class DbtRunner:
+    """
+    Process-level runner invoking dbt in-process with a cached parsed manifest.
+
+    Parsing the project is the most expensive part of a dbt invocation, so the manifest
+    is parsed once and reused until a project file changes. dbt's programmatic runner is
+    not safe for concurrent invocations, so they are serialized with a lock; the project
+    and profiles directories are passed as arguments instead of changing the working
+    directory of the process.
+
+    Attributes:
+        project_dir (str | None):
+            The dbt project directory.
+        profiles_dir (str | None):
+            The directory containing profiles.yml.
+
+    Methods:
+        invoke(args: list[str]) -> dbtRunnerResult:
+            Runs a dbt command with the project and profiles directories.
+        run(select: list[str] | None = None, full_refresh: bool = False, dbt_vars: dict | None = None) -> dict[str, dict]:
+            Builds the selected models and reports the timing of each of them.
+        invalidate() -> None:
+            Drops the cached manifest so the next run parses the project again.
+    """
+    def __init__(self, project_dir: str | None, profiles_dir: str | None):
+        """
+        Initializes the runner without a parsed manifest.
+
+        Args:
+            project_dir (str | None):
+                The dbt project directory.
+            profiles_dir (str | None):
+                The directory containing profiles.yml.
+        """
+        self.project_dir = project_dir
+        self.profiles_dir = profiles_dir
+        self._lock = threading.RLock()
+        self._manifest = None
+        self._fingerprint = None
+
+    def _project_fingerprint(self) -> tuple:
+        """
+        Returns the modification time and size of every project file.
+        """
+        files = [os.path.join(self.project_dir, 'dbt_project.yml')]
+        for subdirectory in PROJECT_SUBDIRECTORIES:
+            for root, _, file_names in os.walk(os.path.join(self.project_dir, subdirectory)):
+                files += [
+                    os.path.join(root, file_name)
+                    for file_name in file_names
+                    if file_name.endswith(PROJECT_FILE_EXTENSIONS)
+                ]
+
+        return tuple(sorted(
+            (file, os.stat(file).st_mtime_ns, os.stat(file).st_size)
+            for file in files
+            if os.path.exists(file)
+        ))
+
+    def invoke(self, args: list[str]) -> dbtRunnerResult:
+        """
+        Runs a dbt command with the project and profiles directories of the runner.
+
+        Args:
+            args (list[str]):
+                The command and its arguments, e.g. ['docs', 'generate'].
+
+        Returns:
+            dbtRunnerResult:
+                The result of the invocation.
+
+        Raises:
+            ValueError:
+                If DBT_PATH is not set.
+        """
+        if not self.project_dir:
+            raise ValueError("DBT_PATH environment variable is not set.")
+
+        args = args + ['--project-dir', self.project_dir]
+        if self.profiles_dir:
+            args += ['--profiles-dir', self.profiles_dir]
+
+        with self._lock:
+            return dbtRunner(manifest=self._manifest).invoke(args)
+
+    def _get_manifest(self, dbt_vars: dict | None = None):
+        """
+        Returns the parsed manifest, parsing the project if it changed since the last parse.
+        """
+        fingerprint = (self._project_fingerprint(), json.dumps(dbt_vars, sort_keys=True))
+        if self._manifest is None or fingerprint != self._fingerprint:
+            self._manifest = None
+            started_at = time.perf_counter()
+            args = ['parse']
+            if dbt_vars:
+                args += ['--vars', json.dumps(dbt_vars)]
+            result = self.invoke(args)
+            if not result.success:
+                raise RuntimeError(f"dbt parse failed: {result.exception}")
+
+            self._manifest = result.result
+            self._fingerprint = fingerprint
+            print(f"dbt project parsed in {time.perf_counter() - started_at:.2f}s.")
+
+        return self._manifest
+
+    def run(
+        self,
+        select: list[str] | None = None,
+        full_refresh: bool = False,
+        dbt_vars: dict | None = None
+    ) -> dict[str, dict]:
+        """
+        Builds the selected models (every model if `select` is empty) with the cached manifest.
+
+        Args:
+            select (list[str] | None):
+                dbt selectors of the models to build, e.g. the ones of `source_selector`.
+            full_refresh (bool):
+                Whether incremental models are rebuilt from scratch.
+            dbt_vars (dict | None):
+                Project variables (e.g. {'gold_materialized': 'view'}). They change the
+                parsed configs, so the manifest is parsed again when they change.
+
+        Returns:
+            dict[str, dict]:
+                The status and the execution time in seconds of each built model.
+
+        Raises:
+            RuntimeError:
+                If the project cannot be parsed or a model fails.
+        """
+        with self._lock:
+            self._get_manifest(dbt_vars)
+
+            args = ['run']
+            if select:
+                args += ['--select', *select]
+            if full_refresh:
+                args.append('--full-refresh')
+            if dbt_vars:
+                args += ['--vars', json.dumps(dbt_vars)]
+
+            started_at = time.perf_counter()
+            result = self.invoke(args)
+
+            timings = {}
+            for node_result in (result.result.results if result.result is not None else []):
+                name = node_result.node.name
+                timings[name] = {
+                    "status": str(node_result.status),
+                    "seconds": node_result.execution_time,
+                }
+                metrics.observe(f"dbt.model.{name}.seconds", node_result.execution_time)
+                print(f"dbt model {name}: {node_result.status} in {node_result.execution_time:.2f}s")
+
+            metrics.observe("dbt.run.seconds", time.perf_counter() - started_at)
+            print(f"dbt run of {len(timings)} model(s) in {time.perf_counter() - started_at:.2f}s.")
+
+            if not result.success:
+                raise RuntimeError(f"dbt run failed: {result.exception or timings}")
+
+            return timings
+
+    def invalidate(self) -> None:
+        """
+        Drops the cached manifest so the next run parses the project again.
+        """
+        with self._lock:
+            self._manifest = None
+            self._fingerprint = None
+
+
+dbt_runner = DbtRunner(
+    project_dir=settings.DBT_PATH,
+    profiles_dir=settings.DBT_PROFILES_DIR or settings.DBT_PATH,
+)
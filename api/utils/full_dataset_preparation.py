@@ -3,20 +3,31 @@ import random
 from datetime import date, datetime
 
 import fireducks.pandas as pd
-from sqlalchemy import select
+from sqlalchemy import case, func, or_, select
 from lifetimes import BetaGeoFitter, GammaGammaFitter
 from lifetimes.utils import summary_data_from_transaction_data
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 from sqlalchemy.orm import Session
 
+from core.database import Session as SessionFactory
 from models.accounts_model import AccountsSourceModel
 from models.products_model import ProductsSourceModel
 from models.sales_pipeline_model import SalesPipelineSourceModel
 from models.sales_teams_model import SalesTeamsSourceModel
+from utils.bulk_reader import read_query_columnar
 from utils.export_models import export_beta_geo_fitter, export_gamma_gamma_fitter
 
 
+PREPROCESSING_DTYPES = {
+    'close_value': 'float64',
+    'revenue': 'float64',
+    'employees': 'int64',
+    'sales_price': 'float64',
+}
+PREPROCESSING_DATE_COLUMNS = ['engage_date', 'close_date']
+
+
 
 def full_dataset_preparation(
     session: Session, deal_stage: str = 'Won', today_date: date = datetime(2018, 1, 1)
@@ -40,7 +51,157 @@ def full_dataset_preparation(
     products_df = load_products_data(session)
     sales_pipeline_df = load_sales_pipeline_data(session)
     sales_teams_df = load_sales_teams_data(session)
+
+    df = merge_source_dataframes(accounts_df, products_df, sales_pipeline_df, sales_teams_df)
+
+    df = make_preprocessing(df)
     
+    if deal_stage == 'Won':
+        df = make_won_pre_feature_engineering(df)
+    else:
+        raise NotImplementedError('Only "Won" deal stage analysis are implemented by now.')
+    
+    df = make_filter_by_deal_stage(df, deal_stage)
+    rfm = make_rfm_enrichment(df, today_date)
+    rfm = expand_rfm_features(rfm)
+
+    summary, bgf = fit_predict_bg_nbd_model(df, today_date)
+    summary, ggf = fit_predict_gamma_gamma_model(summary)
+    summary = make_cltv_predictions(summary, bgf, ggf)
+    
+    summary_to_merge, rfm_to_merge = drop_duplicate_columns_for_merge(summary, rfm)
+
+    return summary_to_merge, rfm_to_merge, df
+
+
+def full_dataset_preparation_in_worker(
+    deal_stage: str = 'Won', today_date: date = datetime(2018, 1, 1)
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Runs `full_dataset_preparation` with a session of its own.
+
+    Sessions cannot be sent to another process, so this is the entry point used to run
+    the preparation in a worker of `utils.process_pool`.
+
+    Args:
+        deal_stage (str): The deal stage to filter by. Default is 'Won'.
+        today_date (date): Reference date for temporal calculations. Default is 2018-01-01.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: The same as `full_dataset_preparation`.
+    """
+    with SessionFactory() as session:
+        return full_dataset_preparation(session, deal_stage, today_date)
+
+
+RFM_RAW_COLUMNS = ['first_purchase', 'last_purchase', 'Recency', 'Frequency', 'Monetary', 'account']
+
+
+def incremental_dataset_preparation(
+    session: Session,
+    current_rfm: pd.DataFrame,
+    accounts: list[str],
+    sales_agents: list[str],
+    today_date: date = datetime(2018, 1, 1)
+) -> tuple[pd.DataFrame, pd.DataFrame] | None:
+    """
+    Recomputes only the RFM and enriched rows affected by new deals of some accounts and agents.
+
+    The enriched rows of the affected accounts and agents are rebuilt with their
+    per-account and per-agent aggregates computed in the database. The RFM rows of the
+    affected accounts are rebuilt with the bins and scaling of the current table, which
+    is only valid while the global quantities (the min/max of Recency, Frequency and
+    Monetary behind the `pd.cut` bin edges and the MinMax scaling, the first purchase
+    date and the set of customers) do not change. Otherwise None is returned and a full
+    rebuild is needed.
+
+    Args:
+        session (Session): Database session for loading data.
+        current_rfm (pd.DataFrame): The current content of the RFM features table.
+        accounts (list[str]): The accounts that received new deals.
+        sales_agents (list[str]): The sales agents that received new deals.
+        today_date (date): Reference date for temporal calculations. Default is 2018-01-01.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame] | None: 
+            - RFM rows of the affected accounts.
+            - 'Won' enriched rows of the affected accounts and agents.
+            Or None if a global quantity changed and a full rebuild is needed.
+    """
+
+    sales_pipeline_df = load_affected_sales_pipeline_data(session, accounts, sales_agents)
+    df = merge_source_dataframes(
+        load_accounts_data(session),
+        load_products_data(session),
+        sales_pipeline_df,
+        load_sales_teams_data(session)
+    )
+    df = make_preprocessing(df)
+
+    account_counts, agent_counts, close_rate = load_sales_pipeline_aggregates(
+        session, df['account'].unique().tolist(), df['sales_agent'].unique().tolist()
+    )
+
+    df['sales_cycle_duration'] = (df['close_date'] - df['engage_date']).dt.days
+    df['agent_close_rate'] = df['sales_agent'].map(close_rate)
+    df['opportunities_per_account'] = df['account'].map(account_counts)
+    df['opportunities_per_sales_agent'] = df['sales_agent'].map(agent_counts)
+
+    df = make_filter_by_deal_stage(df, 'Won')
+
+    updated_rfm = make_rfm_aggregation(df[df['account'].isin(accounts)], today_date)
+    unchanged_rfm = current_rfm[~current_rfm['account'].isin(accounts)]
+    candidate_rfm = pd.concat(
+        [unchanged_rfm[RFM_RAW_COLUMNS], updated_rfm[RFM_RAW_COLUMNS]], ignore_index=True
+    )
+
+    if (set(candidate_rfm['account']) != set(current_rfm['account'])
+            or rfm_global_quantities(candidate_rfm) != rfm_global_quantities(current_rfm)):
+        return None
+
+    rfm = expand_rfm_features(make_rfm_scores(candidate_rfm))
+    rfm = rfm[rfm['account'].isin(accounts)].drop(columns=['Months_Since_Start'])
+
+    return rfm[list(current_rfm.columns)], df
+
+
+def rfm_global_quantities(rfm: pd.DataFrame) -> tuple:
+    """
+    Returns the quantities computed over every account that the RFM scores depend on.
+
+    Args:
+        rfm (pd.DataFrame): RFM values per account.
+
+    Returns:
+        tuple: The min and max of Recency, Frequency and Monetary and the first purchase date.
+    """
+
+    columns = ['Recency', 'Frequency', 'Monetary']
+    return (
+        tuple(float(rfm[column].min()) for column in columns)
+        + tuple(float(rfm[column].max()) for column in columns)
+        + (pd.Timestamp(rfm['first_purchase'].min()),)
+    )
+
+
+def merge_source_dataframes(
+    accounts_df: pd.DataFrame,
+    products_df: pd.DataFrame,
+    sales_pipeline_df: pd.DataFrame,
+    sales_teams_df: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Joins the sales pipeline with the accounts, products and sales teams data.
+
+    Args:
+        accounts_df (pd.DataFrame): Accounts data.
+        products_df (pd.DataFrame): Products data.
+        sales_pipeline_df (pd.DataFrame): Sales pipeline data.
+        sales_teams_df (pd.DataFrame): Sales teams data.
+
+    Returns:
+        pd.DataFrame: The consolidated dataset.
+    """
     dataframes = [accounts_df, products_df, sales_pipeline_df, sales_teams_df]
     
     filtered_dataframes = []
@@ -65,24 +226,7 @@ def full_dataset_preparation(
             )
         )
 
-    df = make_preprocessing(df)
-    
-    if deal_stage == 'Won':
-        df = make_won_pre_feature_engineering(df)
-    else:
-        raise NotImplementedError('Only "Won" deal stage analysis are implemented by now.')
-    
-    df = make_filter_by_deal_stage(df, deal_stage)
-    rfm = make_rfm_enrichment(df, today_date)
-    rfm = expand_rfm_features(rfm)
-
-    summary, bgf = fit_predict_bg_nbd_model(df, today_date)
-    summary, ggf = fit_predict_gamma_gamma_model(summary)
-    summary = make_cltv_predictions(summary, bgf, ggf)
-    
-    summary_to_merge, rfm_to_merge = drop_duplicate_columns_for_merge(summary, rfm)
-
-    return summary_to_merge, rfm_to_merge, df
+    return df
 
 
 def drop_duplicate_columns_for_merge(
@@ -241,6 +385,24 @@ def make_rfm_enrichment(df: pd.DataFrame, today_date: date) -> pd.DataFrame:
         pd.DataFrame: DataFrame with added RFM metrics.
     """
 
+    rfm = make_rfm_aggregation(df, today_date)
+    rfm = make_rfm_scores(rfm)
+    
+    return rfm
+
+
+def make_rfm_aggregation(df: pd.DataFrame, today_date: date) -> pd.DataFrame:
+    """
+    Aggregates the raw Recency, Frequency and Monetary values per account.
+
+    Args:
+        df (pd.DataFrame): Consolidated DataFrame.
+        today_date (date): Reference date for calculations.
+
+    Returns:
+        pd.DataFrame: One row per account with its raw RFM values.
+    """
+
     rfm = df.groupby('account').agg({
         'close_date': ['min', 'max', lambda x: (today_date - x.max()).days],
         'account': 'count',
@@ -266,7 +428,23 @@ def make_rfm_enrichment(df: pd.DataFrame, today_date: date) -> pd.DataFrame:
     }, inplace=True)
     
     rfm['account'] = accounts
-    
+
+    return rfm
+
+
+def make_rfm_scores(rfm: pd.DataFrame) -> pd.DataFrame:
+    """
+    Scores the raw RFM values into quartile-width bins.
+
+    The bin edges depend on the minimum and maximum of each value over every account.
+
+    Args:
+        rfm (pd.DataFrame): Raw RFM values per account.
+
+    Returns:
+        pd.DataFrame: DataFrame with added R, F, M and RFM scores.
+    """
+
     rfm['R_Score'] = pd.cut(rfm['Recency'], bins=4, labels=[4, 3, 2, 1])
     rfm['F_Score'] = pd.cut(rfm['Frequency'], bins=4, labels=[1, 2, 3, 4])
     rfm['M_Score'] = pd.cut(rfm['Monetary'], bins=4, labels=[1, 2, 3, 4])
@@ -354,12 +532,10 @@ def make_preprocessing(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: Preprocessed DataFrame.
     """
     
-    df['engage_date'] = pd.to_datetime(df['engage_date'])
-    df['close_date'] = pd.to_datetime(df['close_date'])
-    df['close_value'] = df['close_value'].astype(float)
-    df['revenue'] = df['revenue'].astype(float)
-    df['employees'] = df['employees'].astype(int)
-    df['sales_price'] = df['sales_price'].astype(float)
+    for column in PREPROCESSING_DATE_COLUMNS:
+        df[column] = pd.to_datetime(df[column])
+    for column, dtype in PREPROCESSING_DTYPES.items():
+        df[column] = df[column].astype(dtype)
     
     return df
 
@@ -402,17 +578,99 @@ def load_sales_pipeline_data(session: Session) -> pd.DataFrame:
     """    
 
     query = select(SalesPipelineSourceModel)
-    results = session.execute(query).all()
+    df = read_query_columnar(
+        session, query, dtypes=PREPROCESSING_DTYPES, date_columns=PREPROCESSING_DATE_COLUMNS
+    )
+    return df
+
 
-    data = [
-        {column: getattr(row, column) for column in row.__table__.columns.keys()}
-        for (row,) in results
-    ]
+def load_affected_sales_pipeline_data(
+    session: Session, accounts: list[str], sales_agents: list[str]
+) -> pd.DataFrame:
+    """
+    Loads the sales pipeline rows of some accounts or sales agents.
 
-    df = pd.DataFrame(data)
+    Args:
+        session (Session): Database session.
+        accounts (list[str]): The accounts whose rows are loaded.
+        sales_agents (list[str]): The sales agents whose rows are loaded.
+
+    Returns:
+        pd.DataFrame: DataFrame containing the matching sales pipeline rows.
+    """
+
+    query = select(SalesPipelineSourceModel).where(
+        or_(
+            SalesPipelineSourceModel.account.in_(accounts),
+            SalesPipelineSourceModel.sales_agent.in_(sales_agents)
+        )
+    )
+    df = read_query_columnar(
+        session, query, dtypes=PREPROCESSING_DTYPES, date_columns=PREPROCESSING_DATE_COLUMNS
+    )
     return df
 
 
+def load_sales_pipeline_aggregates(
+    session: Session, accounts: list[str], sales_agents: list[str]
+) -> tuple[dict, dict, dict]:
+    """
+    Computes in the database the per-account and per-agent aggregates of the pipeline.
+
+    The same inner joins as `merge_source_dataframes` are applied, so the aggregates
+    match the ones of `make_won_pre_feature_engineering` over the whole dataset.
+
+    Args:
+        session (Session): Database session.
+        accounts (list[str]): The accounts to aggregate.
+        sales_agents (list[str]): The sales agents to aggregate.
+
+    Returns:
+        tuple[dict, dict, dict]: 
+            - Opportunities per account.
+            - Opportunities per sales agent.
+            - Close rate (in %) per sales agent.
+    """
+
+    product = case(
+        (SalesPipelineSourceModel.product == 'GTXPro', 'GTX Pro'),
+        else_=SalesPipelineSourceModel.product
+    )
+    joined = (
+        select(SalesPipelineSourceModel)
+        .join(AccountsSourceModel, AccountsSourceModel.account == SalesPipelineSourceModel.account)
+        .join(ProductsSourceModel, ProductsSourceModel.product == product)
+        .join(SalesTeamsSourceModel, SalesTeamsSourceModel.sales_agent == SalesPipelineSourceModel.sales_agent)
+        .subquery()
+    )
+
+    account_query = (
+        select(joined.c.account, func.count())
+        .where(joined.c.account.in_(accounts))
+        .group_by(joined.c.account)
+    )
+    account_counts = dict(session.execute(account_query).all())
+
+    agent_query = (
+        select(
+            joined.c.sales_agent,
+            func.count(),
+            func.count().filter(joined.c.deal_stage.in_(['Won', 'Lost'])),
+            func.count().filter(joined.c.deal_stage == 'Won'),
+        )
+        .where(joined.c.sales_agent.in_(sales_agents))
+        .group_by(joined.c.sales_agent)
+    )
+
+    agent_counts, close_rate = {}, {}
+    for sales_agent, opportunities, closed, won in session.execute(agent_query).all():
+        agent_counts[sales_agent] = opportunities
+        if closed:
+            close_rate[sales_agent] = won / closed * 100
+
+    return account_counts, agent_counts, close_rate
+
+
 def load_sales_teams_data(session: Session) -> pd.DataFrame:
     """
     Loads sales teams data from the database.
@@ -425,14 +683,9 @@ def load_sales_teams_data(session: Session) -> pd.DataFrame:
     """
 
     query = select(SalesTeamsSourceModel)
-    results = session.execute(query).all()
-
-    data = [
-        {column: getattr(row, column) for column in row.__table__.columns.keys()}
-        for (row,) in results
-    ]
-
-    df = pd.DataFrame(data)
+    df = read_query_columnar(
+        session, query, dtypes=PREPROCESSING_DTYPES, date_columns=PREPROCESSING_DATE_COLUMNS
+    )
     return df
 
 
@@ -449,14 +702,9 @@ def load_products_data(session: Session) -> pd.DataFrame:
     """
 
     query = select(ProductsSourceModel)
-    results = session.execute(query).all()
-
-    data = [
-        {column: getattr(row, column) for column in row.__table__.columns.keys()}
-        for (row,) in results
-    ]
-
-    df = pd.DataFrame(data)
+    df = read_query_columnar(
+        session, query, dtypes=PREPROCESSING_DTYPES, date_columns=PREPROCESSING_DATE_COLUMNS
+    )
     return df
 
 
@@ -472,13 +720,8 @@ def load_accounts_data(session: Session) -> pd.DataFrame:
     """
 
     query = select(AccountsSourceModel)
-    results = session.execute(query).all()
-
-    data = [
-        {column: getattr(row, column) for column in row.__table__.columns.keys()}
-        for (row,) in results
-    ]
-
-    df = pd.DataFrame(data)
+    df = read_query_columnar(
+        session, query, dtypes=PREPROCESSING_DTYPES, date_columns=PREPROCESSING_DATE_COLUMNS
+    )
     return df
 
@@ -0,0 +1,232 @@
+from dataclasses import dataclass, field
+import hashlib
+
+from pydantic import BaseModel
+from sqlalchemy import column, func, select, table
+from sqlalchemy.orm import Session
+
+from core.configs import settings
+from core.metrics import metrics
+from schemas.analytics_schema import (
+    AnalyticsPage,
+    CustomerProfitabilityRow,
+    CustomerRetentionRow,
+    CustomerSegmentationRow,
+    ProductSalesRow,
+    RegionalSalesRow,
+    SalesAgentPerformanceRow,
+    SalesPerformanceRow,
+    SectorRevenueRow,
+)
+from utils.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class GoldModel:
+    """
+    Describes how a gold model is served by the analytics API.
+
+    Attributes:
+        name (str):
+            The name of the dbt model (and of the relation).
+        row_schema (type[BaseModel]):
+            The schema of a row; its fields are the selected columns.
+        filters (dict[str, tuple[str, str]]):
+            The accepted filters: parameter name -> (column, operator), with operator
+            "eq", "ge" or "le".
+        order_by (list[tuple[str, bool]]):
+            The (column, descending) sort keys; they end with a unique column so that
+            pagination is stable.
+    """
+    name: str
+    row_schema: type[BaseModel]
+    filters: dict[str, tuple[str, str]] = field(default_factory=dict)
+    order_by: list[tuple[str, bool]] = field(default_factory=list)
+
+
+@dataclass
+class CachedPage:
+    """
+    A serialized page of a gold model and its entity tag.
+
+    Attributes:
+        etag (str):
+            The quoted strong entity tag of the body.
+        body (bytes):
+            The JSON body of the page.
+    """
+    etag: str
+    body: bytes
+
+
+GOLD_MODELS = {
+    'customer-profitability-analysis': GoldModel(
+        name='customer_profitability_analysis',
+        row_schema=CustomerProfitabilityRow,
+        filters={
+            'customer': ('customer', 'eq'),
+            'segment': ('customer_recency_frequency_monetary_segment', 'eq'),
+            'max_rank': ('profitability_rank', 'le'),
+        },
+        order_by=[('profitability_rank', False), ('customer', False)],
+    ),
+    'customer-retention-analysis': GoldModel(
+        name='customer_retention_analysis',
+        row_schema=CustomerRetentionRow,
+        filters={
+            'customer': ('customer', 'eq'),
+            'segment': ('customer_recency_frequency_monetary_segment', 'eq'),
+            'min_prob_alive': ('prob_alive_customer', 'ge'),
+        },
+        order_by=[('customer_engagement_score', False), ('customer', False)],
+    ),
+    'customer-segmentation-analysis': GoldModel(
+        name='customer_segmentation_analysis',
+        row_schema=CustomerSegmentationRow,
+        filters={
+            'customer': ('customer', 'eq'),
+            'segment': ('customer_recency_frequency_monetary_segment', 'eq'),
+            'cltv_segment': ('predicted_customer_lifetime_value_segment', 'eq'),
+            'min_prob_alive': ('prob_alive_customer', 'ge'),
+        },
+        order_by=[('predicted_year_customer_lifetime_value', True), ('customer', False)],
+    ),
+    'products-sales-analysis': GoldModel(
+        name='products_sales_analysis',
+        row_schema=ProductSalesRow,
+        filters={
+            'product': ('product', 'eq'),
+            'product_series': ('product_series', 'eq'),
+        },
+        order_by=[('sales_rank', False), ('product', False)],
+    ),
+    'regional-sales-performance': GoldModel(
+        name='regional_sales_performance',
+        row_schema=RegionalSalesRow,
+        filters={
+            'regional_office': ('sales_agent_regional_office', 'eq'),
+        },
+        order_by=[('total_sales_value', True), ('sales_agent_regional_office', False)],
+    ),
+    'sales-agent-performance': GoldModel(
+        name='sales_agent_performance',
+        row_schema=SalesAgentPerformanceRow,
+        filters={
+            'sales_agent': ('sales_agent', 'eq'),
+        },
+        order_by=[('average_won_deal_effectiveness', True), ('sales_agent', False)],
+    ),
+    'sales-performance-analysis': GoldModel(
+        name='sales_performance_analysis',
+        row_schema=SalesPerformanceRow,
+        filters={
+            'sales_agent': ('sales_agent', 'eq'),
+        },
+        order_by=[('total_revenue', True), ('sales_agent', False)],
+    ),
+    'sector-wise-revenue-analysis': GoldModel(
+        name='sector_wise_revenue_analysis',
+        row_schema=SectorRevenueRow,
+        filters={
+            'customer_sector': ('customer_sector', 'eq'),
+        },
+        order_by=[('total_revenue', True), ('customer_sector', False)],
+    ),
+}
+
+
+analytics_cache = TTLCache(
+    max_entries=settings.ANALYTICS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS,
+)
+
+
+def clear_analytics_cache() -> None:
+    """
+    Drops every cached page, e.g. after the gold models were rebuilt.
+    """
+    analytics_cache.clear()
+    print("Analytics cache cleared.")
+
+
+def query_gold_model(
+    session: Session, model: GoldModel, filters: dict, limit: int, offset: int
+) -> AnalyticsPage:
+    """
+    Reads a filtered page of a gold model.
+
+    Args:
+        session (Session): Database session.
+        model (GoldModel): The gold model to read.
+        filters (dict): The filter values by parameter name; None values are ignored.
+        limit (int): The maximum number of rows of the page.
+        offset (int): The number of matching rows to skip.
+
+    Returns:
+        AnalyticsPage: The rows of the page and the number of matching rows.
+    """
+    columns = list(model.row_schema.model_fields)
+    relation = table(model.name, *[column(name) for name in columns], schema=settings.DB_SCHEMA)
+
+    conditions = []
+    for parameter, value in filters.items():
+        if value is None:
+            continue
+        column_name, operator = model.filters[parameter]
+        if operator == 'eq':
+            conditions.append(relation.c[column_name] == value)
+        elif operator == 'ge':
+            conditions.append(relation.c[column_name] >= value)
+        else:
+            conditions.append(relation.c[column_name] <= value)
+
+    total = session.execute(
+        select(func.count()).select_from(relation).where(*conditions)
+    ).scalar_one()
+
+    order_by = [
+        relation.c[name].desc().nulls_last() if descending else relation.c[name].asc().nulls_last()
+        for name, descending in model.order_by
+    ]
+    rows = session.execute(
+        select(relation).where(*conditions).order_by(*order_by).limit(limit).offset(offset)
+    ).mappings().all()
+
+    return AnalyticsPage[model.row_schema](
+        items=[model.row_schema.model_validate(dict(row)) for row in rows],
+        total=total,
+        limit=limit,
+        offset=offset,
+    )
+
+
+def get_gold_model_page(
+    session: Session, key: str, filters: dict, limit: int, offset: int
+) -> CachedPage:
+    """
+    Returns a serialized page of a gold model, from the cache when possible.
+
+    Args:
+        session (Session): Database session.
+        key (str): The key of the model in `GOLD_MODELS` (e.g. 'sales-agent-performance').
+        filters (dict): The filter values by parameter name; None values are ignored.
+        limit (int): The maximum number of rows of the page.
+        offset (int): The number of matching rows to skip.
+
+    Returns:
+        CachedPage: The JSON body of the page and its entity tag.
+    """
+    cache_key = (key, tuple(sorted(filters.items())), limit, offset)
+    page = analytics_cache.get(cache_key)
+    if page is not None:
+        metrics.increment("analytics.cache.hit")
+        return page
+
+    metrics.increment("analytics.cache.miss")
+    # A page read before `clear_analytics_cache` must not be stored after it
+    generation = analytics_cache.generation
+    body = query_gold_model(session, GOLD_MODELS[key], filters, limit, offset).model_dump_json().encode()
+    page = CachedPage(etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"', body=body)
+    analytics_cache.put(cache_key, page, generation=generation)
+
+    return page
@@ -0,0 +1,199 @@
+from contextlib import contextmanager
+from typing import IO, Callable, ContextManager, Iterator
+import os
+import zipfile
+
+import fireducks.pandas as pd
+import numpy as np
+from sqlalchemy import Column, Engine, MetaData, String, Table, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from core.metrics import metrics
+from models.ingest_progress_model import IngestProgressDB
+from utils.bulk_writer import copy_dataframe
+
+
+# Source tables keeping the identifier of the CSV file instead of a generated UUID
+ID_COLUMNS = {'sales_pipeline': 'opportunity_id'}
+
+
+def generate_uuid4_strings(count: int) -> np.ndarray:
+    """
+    Generates random (version 4) UUIDs as strings, without a Python object per UUID.
+
+    Args:
+        count (int): How many UUIDs to generate.
+
+    Returns:
+        np.ndarray: The UUIDs in their canonical 36-character form.
+    """
+    raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+
+    digits = np.frombuffer(raw.tobytes().hex().encode(), dtype='S1').reshape(count, 32)
+    dashes = np.full((count, 1), b'-', dtype='S1')
+    uuids = np.hstack([
+        digits[:, :8], dashes, digits[:, 8:12], dashes, digits[:, 12:16], dashes,
+        digits[:, 16:20], dashes, digits[:, 20:]
+    ])
+
+    return np.ascontiguousarray(uuids).view('S36').ravel().astype(str)
+
+
+@contextmanager
+def open_archive_member(archive_path: str, member: str) -> Iterator[IO[bytes]]:
+    """
+    Opens a file of a zip archive as a stream, without extracting it to disk.
+
+    Args:
+        archive_path (str): The path of the zip archive.
+        member (str): The name of the file inside the archive.
+
+    Yields:
+        IO[bytes]: The decompressed content of the file.
+    """
+    with zipfile.ZipFile(archive_path) as archive, archive.open(member) as stream:
+        yield stream
+
+
+def iter_csv_sources(data_dir: str) -> Iterator[tuple[str, str, Callable[[], ContextManager[IO]]]]:
+    """
+    Lists the CSV files of a directory, including the ones inside its zip archives.
+
+    A CSV file present both on disk and in an archive is only listed once, from disk.
+
+    Args:
+        data_dir (str): The directory containing the CSV files and zip archives.
+
+    Yields:
+        tuple[str, str, Callable[[], ContextManager[IO]]]:
+            - The raw table name (the file name without extension).
+            - A description of the source, for logs and progress tracking.
+            - A function opening the file as a stream.
+    """
+    file_names = sorted(os.listdir(data_dir))
+    seen = set()
+
+    for file_name in file_names:
+        if file_name.endswith('.csv'):
+            file_path = os.path.join(data_dir, file_name)
+            seen.add(os.path.splitext(file_name)[0])
+            yield os.path.splitext(file_name)[0], file_path, lambda path=file_path: open(path, 'rb')
+
+    for file_name in file_names:
+        if file_name.endswith('.zip'):
+            archive_path = os.path.join(data_dir, file_name)
+            with zipfile.ZipFile(archive_path) as archive:
+                members = [member for member in archive.namelist() if member.endswith('.csv')]
+
+            for member in members:
+                raw_table_name = os.path.splitext(os.path.basename(member))[0]
+                if raw_table_name in seen:
+                    continue
+                seen.add(raw_table_name)
+                yield (
+                    raw_table_name,
+                    f"{archive_path}:{member}",
+                    lambda path=archive_path, member=member: open_archive_member(path, member)
+                )
+
+
+def ingest_csv_source(
+    engine: Engine,
+    schema: str,
+    raw_table_name: str,
+    source: str,
+    open_source: Callable[[], ContextManager[IO]],
+    chunk_rows: int
+) -> int:
+    """
+    Loads a CSV source into its `_source` table in chunks, resuming an interrupted load.
+
+    The file is read `chunk_rows` rows at a time, every value kept as a string, and each
+    chunk is written with COPY in the same transaction as the progress update in
+    `ingest_progress`. After a failure, the next call skips the rows already committed.
+    A table that already exists without pending progress is considered loaded.
+
+    Args:
+        engine (Engine): The database engine.
+        schema (str): The schema of the table.
+        raw_table_name (str): The table name without the `_source` suffix.
+        source (str): A description of the source, for logs and progress tracking.
+        open_source (Callable[[], ContextManager[IO]]): A function opening the CSV as a stream.
+        chunk_rows (int): How many rows are read and written at a time.
+
+    Returns:
+        int: The number of rows loaded by this call.
+    """
+    table_name = f"{raw_table_name}_source"
+    id_column = ID_COLUMNS.get(raw_table_name, 'id')
+
+    with open_source() as stream:
+        csv_columns = pd.read_csv(stream, nrows=0).columns.tolist()
+
+    metadata = MetaData(schema=schema)
+    table = Table(
+        table_name, metadata,
+        Column(id_column, String, primary_key=True),
+        *[Column(column, String) for column in csv_columns if column != id_column]
+    )
+    progress_filter = (
+        (IngestProgressDB.table_schema == schema) & (IngestProgressDB.table_name == table_name)
+    )
+
+    with engine.begin() as conn:
+        progress = conn.execute(
+            select(IngestProgressDB.rows_loaded, IngestProgressDB.status).where(progress_filter)
+        ).first()
+
+        if inspect(conn).has_table(table_name, schema=schema):
+            if progress is None or progress.status == 'done':
+                print(f"Table {table_name} already loaded.")
+                return 0
+            rows_loaded = progress.rows_loaded
+            print(f"Resuming the load of {table_name} after {rows_loaded} row(s).")
+        else:
+            table.create(conn)
+            rows_loaded = 0
+            stmt = insert(IngestProgressDB).values(
+                table_schema=schema, table_name=table_name, source=source,
+                rows_loaded=0, status='running'
+            )
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[IngestProgressDB.table_schema, IngestProgressDB.table_name],
+                set_={"source": source, "rows_loaded": 0, "status": 'running'}
+            ))
+
+    loaded_by_call = 0
+    with open_source() as stream:
+        chunks = pd.read_csv(
+            stream,
+            dtype=str,
+            header=None,
+            names=csv_columns,
+            skiprows=rows_loaded + 1,
+            chunksize=chunk_rows
+        )
+
+        for chunk in chunks:
+            if id_column not in chunk.columns:
+                chunk.insert(0, id_column, generate_uuid4_strings(len(chunk)))
+
+            with engine.begin() as conn:
+                copy_dataframe(conn, chunk, schema, table_name)
+                conn.execute(
+                    update(IngestProgressDB)
+                    .where(progress_filter)
+                    .values(rows_loaded=rows_loaded + len(chunk))
+                )
+
+            rows_loaded += len(chunk)
+            loaded_by_call += len(chunk)
+            metrics.set_gauge(f"init_data.{table_name}.rows_loaded", rows_loaded)
+            print(f"Loaded {rows_loaded} row(s) into {table_name} from {source}.")
+
+    with engine.begin() as conn:
+        conn.execute(update(IngestProgressDB).where(progress_filter).values(status='done'))
+
+    return loaded_by_call
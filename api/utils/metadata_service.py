@@ -0,0 +1,342 @@
+from typing import List
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from sqlalchemy import text
+
+from core.configs import settings
+from core.database import engine
+from utils.bulk_writer import quote_identifier
+from utils.tables_metadata_prompt import TABLES_METADATA, ColumnMetadata, TableMetadata
+
+
+# dbt layers whose models the agent queries
+AGENT_LAYERS = ('silver', 'gold')
+
+# Columns with at most this many distinct values get their most common values listed
+COMMON_VALUES_MAX_DISTINCT = 20
+COMMON_VALUES_LIMIT = 5
+
+TABLE_STATISTICS_QUERY = """
+    SELECT class.relname, class.reltuples
+    FROM pg_class class
+    JOIN pg_namespace namespace ON namespace.oid = class.relnamespace
+    WHERE namespace.nspname = :schema AND class.relname = ANY(:tables)
+"""
+
+COLUMN_STATISTICS_QUERY = """
+    SELECT tablename, attname, n_distinct, most_common_vals::text::text[]
+    FROM pg_stats
+    WHERE schemaname = :schema AND tablename = ANY(:tables)
+"""
+
+ANALYZED_TABLES_QUERY = """
+    SELECT DISTINCT tablename
+    FROM pg_stats
+    WHERE schemaname = :schema AND tablename = ANY(:tables)
+"""
+
+LIVE_COLUMNS_QUERY = """
+    SELECT table_name, column_name, data_type
+    FROM information_schema.columns
+    WHERE table_schema = :schema AND table_name = ANY(:tables)
+    ORDER BY table_name, ordinal_position
+"""
+
+
+class MetadataService:
+    """
+    Process-level service deriving the tables metadata of the agent from the dbt project.
+
+    Table and column descriptions come from dbt's `manifest.json` (the schema.yml files of
+    the silver and gold models), column types from `catalog.json` or, for models missing
+    from it, from the live Postgres catalog, and row counts and value cardinalities from
+    the Postgres statistics. The result is cached in memory and on disk, and only rebuilt
+    when the hash of the manifest changes.
+
+    Attributes:
+        target_dir (str | None):
+            The dbt target directory, containing manifest.json and catalog.json.
+        cache_path (str | None):
+            The JSON file caching the derived metadata.
+
+    Methods:
+        get_tables_metadata() -> List[TableMetadata]:
+            Returns the metadata of the silver and gold models.
+        get_table(name: str) -> TableMetadata | None:
+            Returns the metadata of a single model.
+        invalidate() -> None:
+            Drops the in-memory metadata so the next call checks the manifest again.
+    """
+    def __init__(self, target_dir: str | None, cache_path: str | None):
+        """
+        Initializes the service without metadata.
+
+        Args:
+            target_dir (str | None):
+                The dbt target directory.
+            cache_path (str | None):
+                The JSON file caching the derived metadata.
+        """
+        self.target_dir = target_dir
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._manifest_stat = None
+        self._manifest_hash = None
+        self._tables = None
+
+    def _stat_target_file(self, file_name: str) -> tuple[int, int] | None:
+        """
+        Returns the modification time and size of a file of the target directory, or None
+        if it is missing.
+        """
+        if not self.target_dir:
+            return None
+
+        path = os.path.join(self.target_dir, file_name)
+        if not os.path.exists(path):
+            return None
+
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_target_file(self, file_name: str) -> bytes | None:
+        """
+        Returns the content of a file of the target directory, or None if it is missing.
+        """
+        if not self.target_dir:
+            return None
+
+        path = os.path.join(self.target_dir, file_name)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def _load_cache(self, manifest_hash: str) -> List[TableMetadata] | None:
+        """
+        Returns the metadata cached on disk if it was derived from the same manifest.
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+
+        try:
+            with open(self.cache_path) as file:
+                cache = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring the unreadable tables metadata cache {self.cache_path}: {e}")
+            return None
+
+        if cache.get("manifest_sha256") != manifest_hash:
+            return None
+
+        return [TableMetadata.model_validate(table) for table in cache["tables"]]
+
+    def _save_cache(self, manifest_hash: str, tables: List[TableMetadata]) -> None:
+        """
+        Writes the metadata to the disk cache, atomically.
+        """
+        if not self.cache_path:
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as file:
+            json.dump(
+                {"manifest_sha256": manifest_hash, "tables": [table.model_dump() for table in tables]},
+                file
+            )
+        os.replace(file.name, self.cache_path)
+
+    def _build(self, manifest: dict, catalog: dict | None) -> List[TableMetadata]:
+        """
+        Derives the metadata of the silver and gold models from the manifest, the catalog
+        and the Postgres statistics.
+        """
+        schema = settings.DB_SCHEMA
+        nodes = sorted(
+            (
+                node for node in manifest["nodes"].values()
+                if node["resource_type"] == "model" and node["fqn"][1] in AGENT_LAYERS
+            ),
+            key=lambda node: (AGENT_LAYERS.index(node["fqn"][1]), node["alias"])
+        )
+        names = [node["alias"] for node in nodes]
+
+        with engine.begin() as conn:
+            live_columns = {}
+            for table_name, column_name, data_type in conn.execute(
+                text(LIVE_COLUMNS_QUERY), {"schema": schema, "tables": names}
+            ):
+                live_columns.setdefault(table_name, []).append((column_name, data_type))
+
+            # Tables never analyzed (e.g. just created by dbt) have no statistics yet
+            analyzed = {
+                table_name for (table_name,) in conn.execute(
+                    text(ANALYZED_TABLES_QUERY), {"schema": schema, "tables": names}
+                )
+            }
+            for table_name in live_columns:
+                if table_name not in analyzed:
+                    conn.execute(text(f"ANALYZE {quote_identifier(schema, table_name)}"))
+
+            row_counts = dict(conn.execute(
+                text(TABLE_STATISTICS_QUERY), {"schema": schema, "tables": names}
+            ).all())
+            column_statistics = {
+                (table_name, column_name): (n_distinct, common_values)
+                for table_name, column_name, n_distinct, common_values in conn.execute(
+                    text(COLUMN_STATISTICS_QUERY), {"schema": schema, "tables": names}
+                )
+            }
+
+        tables = []
+        for node in nodes:
+            name = node["alias"]
+            if name not in live_columns:
+                continue
+
+            catalog_columns = (catalog or {}).get("nodes", {}).get(node["unique_id"], {}).get("columns")
+            if catalog_columns:
+                columns = [
+                    (column["name"], column["type"])
+                    for column in sorted(catalog_columns.values(), key=lambda column: column["index"])
+                ]
+            else:
+                columns = live_columns[name]
+
+            row_count = max(int(row_counts.get(name, 0)), 0)
+            tables.append(TableMetadata(
+                name=name,
+                description=node["description"],
+                row_count=row_count,
+                columns=[
+                    self._column_metadata(
+                        name=column_name,
+                        data_type=data_type,
+                        description=node["columns"].get(column_name, {}).get("description", ""),
+                        statistics=column_statistics.get((name, column_name)),
+                        row_count=row_count,
+                    )
+                    for column_name, data_type in columns
+                ],
+            ))
+
+        return tables
+
+    @staticmethod
+    def _column_metadata(
+        name: str,
+        data_type: str,
+        description: str,
+        statistics: tuple | None,
+        row_count: int
+    ) -> ColumnMetadata:
+        """
+        Builds the metadata of a column from its pg_stats entry (n_distinct, most common values).
+
+        A negative n_distinct is a fraction of the rows of the table.
+        """
+        if statistics is None:
+            return ColumnMetadata(name=name, description=description, data_type=data_type)
+
+        n_distinct, common_values = statistics
+        distinct_values = round(-n_distinct * row_count) if n_distinct < 0 else round(n_distinct)
+
+        return ColumnMetadata(
+            name=name,
+            description=description,
+            data_type=data_type,
+            distinct_values=distinct_values,
+            common_values=(
+                common_values[:COMMON_VALUES_LIMIT]
+                if common_values and distinct_values <= COMMON_VALUES_MAX_DISTINCT
+                else None
+            ),
+        )
+
+    def get_tables_metadata(self) -> List[TableMetadata]:
+        """
+        Returns the metadata of the silver and gold models.
+
+        The manifest is hashed only when its modification time or size changed, and the
+        metadata is rebuilt only when that hash changed since it was last derived, by this
+        process or by another one (through the disk cache). Without a manifest, or when it
+        cannot be derived, the hand-written `TABLES_METADATA` is returned.
+
+        Returns:
+            List[TableMetadata]:
+                The tables, their columns and their statistics.
+        """
+        with self._lock:
+            manifest_stat = self._stat_target_file('manifest.json')
+            if manifest_stat is None:
+                return TABLES_METADATA
+            if self._tables is not None and manifest_stat == self._manifest_stat:
+                return self._tables
+
+            manifest_bytes = self._read_target_file('manifest.json')
+            if manifest_bytes is None:
+                return TABLES_METADATA
+
+            manifest_hash = hashlib.sha256(manifest_bytes).hexdigest()
+            if self._tables is not None and manifest_hash == self._manifest_hash:
+                return self._tables
+
+            tables = self._load_cache(manifest_hash)
+            if tables is None:
+                try:
+                    catalog_bytes = self._read_target_file('catalog.json')
+                    tables = self._build(
+                        json.loads(manifest_bytes),
+                        json.loads(catalog_bytes) if catalog_bytes else None
+                    )
+                except Exception as e:
+                    print(f"Could not derive the tables metadata from the dbt project: {e}")
+                    return TABLES_METADATA
+
+                if not tables:
+                    return TABLES_METADATA
+
+                self._save_cache(manifest_hash, tables)
+                print(f"Tables metadata derived from the dbt project ({len(tables)} table(s)).")
+
+            self._manifest_stat = manifest_stat
+            self._manifest_hash = manifest_hash
+            self._tables = tables
+            return tables
+
+    def get_table(self, name: str) -> TableMetadata | None:
+        """
+        Returns the metadata of a single model.
+
+        Args:
+            name (str):
+                The name of the model, e.g. 'stg-won_deal_stage'.
+
+        Returns:
+            TableMetadata | None:
+                The metadata of the model, or None if it is unknown.
+        """
+        return next((table for table in self.get_tables_metadata() if table.name == name), None)
+
+    def invalidate(self) -> None:
+        """
+        Drops the in-memory metadata so the next call checks the manifest again.
+        """
+        with self._lock:
+            self._manifest_stat = None
+            self._manifest_hash = None
+            self._tables = None
+
+
+metadata_service = MetadataService(
+    target_dir=os.path.join(settings.DBT_PATH, 'target') if settings.DBT_PATH else None,
+    cache_path=settings.TABLES_METADATA_CACHE_PATH or (
+        os.path.join(settings.DBT_PATH, 'target', 'agent_tables_metadata.json') if settings.DBT_PATH else None
+    ),
+)
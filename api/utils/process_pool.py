@@ -0,0 +1,71 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+import asyncio
+import multiprocessing
+import threading
+
+from core.configs import settings
+
+
+_lock = threading.Lock()
+_executor = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process pool running the CPU-bound work, creating it on first use.
+
+    Worker processes are spawned rather than forked: the API process runs threads (the
+    rebuild worker, the threadpool of the sync routes) and forking it could copy locks
+    held by them.
+
+    Returns:
+        ProcessPoolExecutor: The process-level pool of `PROCESS_POOL_MAX_WORKERS` workers.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PROCESS_POOL_MAX_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def run_in_process(fn: Callable, *args) -> Any:
+    """
+    Runs a function in the process pool and waits for its result.
+
+    Args:
+        fn (Callable): A picklable (module-level) function.
+        *args: Its picklable arguments.
+
+    Returns:
+        Any: The result of the function.
+    """
+    return get_process_pool().submit(fn, *args).result()
+
+
+async def arun_in_process(fn: Callable, *args) -> Any:
+    """
+    Runs a function in the process pool without blocking the event loop.
+
+    Args:
+        fn (Callable): A picklable (module-level) function.
+        *args: Its picklable arguments.
+
+    Returns:
+        Any: The result of the function.
+    """
+    return await asyncio.get_running_loop().run_in_executor(get_process_pool(), fn, *args)
+
+
+def shutdown_process_pool() -> None:
+    """
+    Stops the worker processes, waiting for the running tasks.
+    """
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
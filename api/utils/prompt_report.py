@@ -0,0 +1,77 @@
+from functools import lru_cache
+import hashlib
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# Average number of characters per token of English text, used without tiktoken
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model: str):
+    """
+    Returns the tiktoken encoding of a model, or None if it cannot be loaded.
+
+    tiktoken downloads the encodings on first use, so they are unavailable offline
+    unless they were cached beforehand.
+    """
+    if tiktoken is None:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        print(f"tiktoken encoding of {model} unavailable, token counts are estimated: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> tuple[int, str]:
+    """
+    Counts the tokens of a text for a model.
+
+    Args:
+        text (str): The text to count.
+        model (str): The model whose tokenizer is used. Default is "gpt-4o-mini".
+
+    Returns:
+        tuple[int, str]:
+            - The number of tokens.
+            - How it was counted: "tiktoken", or "estimate" (characters / 4).
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN), "estimate"
+
+    return len(encoding.encode(text)), "tiktoken"
+
+
+def build_prompt_report(prefix: str, suffix: str, model: str = "gpt-4o-mini") -> dict:
+    """
+    Reports the size of a system prompt made of a static prefix and a dynamic suffix.
+
+    Only a prefix that is byte-identical across requests benefits from the prompt caching
+    of the provider, so its size and hash are tracked separately.
+
+    Args:
+        prefix (str): The static part of the prompt.
+        suffix (str): The part of the prompt that may change between builds.
+        model (str): The model whose tokenizer is used. Default is "gpt-4o-mini".
+
+    Returns:
+        dict: The prefix hash, the token count of each part and how it was counted.
+    """
+    prefix_tokens, method = count_tokens(prefix, model)
+    suffix_tokens, _ = count_tokens(suffix, model)
+
+    return {
+        "model": model,
+        "method": method,
+        "prefix_sha256": hashlib.sha256(prefix.encode()).hexdigest(),
+        "prefix_tokens": prefix_tokens,
+        "suffix_tokens": suffix_tokens,
+        "total_tokens": prefix_tokens + suffix_tokens,
+    }
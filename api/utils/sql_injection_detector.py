@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from typing import Literal
+import re
+
+
+INSECURE_RULES = [
+    (
+        "stacked_statement",
+        re.compile(
+            r";\s*(select|insert|update|delete|drop|alter|create|truncate|grant|revoke"
+            r"|exec|execute|union|shutdown|declare|copy|call)\b",
+            re.IGNORECASE
+        )
+    ),
+    (
+        "tautology",
+        re.compile(
+            r"\b(or|and)\s+(['\"]?)(\w+)\2\s*(=|like)\s*(['\"]?)\3\5",
+            re.IGNORECASE
+        )
+    ),
+    (
+        "boolean_injection",
+        re.compile(
+            # A quote closing a string that was never opened, followed by a boolean operand
+            r"^[^'\"]*['\"]\s*(or|and)\s+(true|false|not\b|\d|['\"(])"
+            # A quoted string followed by a comparison of two literals ("' OR '1'='1")
+            r"|['\"]\s*(or|and)\s+\(?\s*(['\"]\w*['\"]|\d+)\s*(=|<>|!=|<|>|like\b)\s*(['\"]\w*|\d+)"
+            # A quoted string followed by a boolean and a comment cutting the rest of the query
+            r"|['\"]\s*(or|and)\s+[^'\"]*(--|#|/\*)",
+            re.IGNORECASE
+        )
+    ),
+    (
+        "comment_terminator",
+        re.compile(r"(['\"]\s*(--|#|/\*))|(--\s*$)|(/\*.*?\*/)", re.IGNORECASE)
+    ),
+    (
+        "union_select",
+        re.compile(r"\bunion\s+(all\s+)?select\b", re.IGNORECASE)
+    ),
+    (
+        "ddl_dml_statement",
+        re.compile(
+            r"\b(drop|truncate|alter)\s+(table|database|schema|view|index|user|role)\b"
+            r"|\binsert\s+into\s+[\w\"\.]+\s*(\(|values\b|select\b)"
+            r"|\bdelete\s+from\s+[\w\"\.]+\s*(where\b|;|$)|\bupdate\s+[\w\"\.]+\s+set\b"
+            r"|\bcreate\s+(or\s+replace\s+)?(table|database|schema|view|index|user|role|function)\b"
+            r"|\bgrant\s+\w+(\s*,\s*\w+)*\s+on\b",
+            re.IGNORECASE
+        )
+    ),
+    (
+        "command_execution",
+        re.compile(
+            r"\bxp_cmdshell\b|\bexec(ute)?\s*\(|\bpg_sleep\s*\(|\bsleep\s*\(|\bbenchmark\s*\("
+            r"|\bwaitfor\s+delay\b|\bpg_read_file\s*\(|\blo_import\s*\(|\bcopy\s+\w+\s+(from|to)\s+program\b",
+            re.IGNORECASE
+        )
+    ),
+]
+
+SQL_METACHARACTERS = re.compile(r"['\";=`\\]|--|/\*|\*/|#|\(|\)")
+
+SQL_KEYWORDS = {
+    "select", "insert", "update", "delete", "drop", "union", "alter", "create",
+    "truncate", "exec", "execute", "grant", "revoke", "table", "schema", "database",
+    "into", "values", "declare", "cast", "char", "concat", "information_schema",
+    "pg_catalog", "sleep", "null", "having", "waitfor",
+}
+
+# A boolean operator between literals ("1 OR TRUE"), i.e. a bare tautology
+BOOLEAN_LITERALS = re.compile(
+    r"\b(true|false|\d+)\s+(or|and)\s+(true|false|\d+)\b|\b(or|and)\s+(true|false)\b",
+    re.IGNORECASE
+)
+
+WORD_APOSTROPHE = re.compile(r"(?<=\w)['’](?=\w)")
+WORD = re.compile(r"[a-z_]+")
+
+
+@dataclass
+class DetectionResult:
+    """
+    The verdict of the local SQL injection detector.
+
+    Attributes:
+        status (Literal["Insecure", "Secure"] | None):
+            The verdict, or None when the input is ambiguous and must go to the LLM.
+        rule (str | None):
+            The rule that decided the verdict.
+    """
+    status: Literal["Insecure", "Secure"] | None
+    rule: str | None = None
+
+
+def detect_sql_injection(query: str) -> DetectionResult:
+    """
+    Classifies the obvious cases of SQL injection with deterministic rules.
+
+    Inputs matching a known injection pattern (stacked statements, tautologies, comment
+    terminators, UNION SELECT, DDL/DML statements, command execution) are Insecure.
+    Plain natural-language questions, without SQL metacharacters, SQL keywords or boolean
+    operators between literals ("1 OR TRUE"), are Secure. Anything else is ambiguous,
+    including questions that quote names and join them with and/or (`Compare "Hottechi"
+    and "Kan-code" revenue`).
+
+    Args:
+        query (str):
+            The user input.
+
+    Returns:
+        DetectionResult:
+            The verdict and the rule that decided it (`status` is None if ambiguous).
+    """
+    for rule, pattern in INSECURE_RULES:
+        if pattern.search(query):
+            return DetectionResult(status="Insecure", rule=rule)
+
+    # Apostrophes inside words ("agent's", "what's") are plain English, not quotes
+    text = WORD_APOSTROPHE.sub("", query)
+    if SQL_METACHARACTERS.search(text):
+        return DetectionResult(status=None)
+
+    if SQL_KEYWORDS.intersection(WORD.findall(text.lower())):
+        return DetectionResult(status=None)
+
+    if BOOLEAN_LITERALS.search(text):
+        return DetectionResult(status=None)
+
+    return DetectionResult(status="Secure", rule="natural_language")
@@ -0,0 +1,277 @@
+from typing import Any, Dict, Literal, Optional, Sequence, Union
+import time
+
+from langchain_community.utilities.sql_database import SQLDatabase, truncate_word
+from langchain_core.tools import ToolException
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+
+from core.configs import settings
+from core.metrics import metrics
+from utils.agent_query_log import log_query
+from utils.prompt_report import count_tokens
+
+
+# SQLSTATE of a statement cancelled by `statement_timeout`
+QUERY_CANCELED = '57014'
+
+
+class SandboxedSQLDatabase(SQLDatabase):
+    """
+    `SQLDatabase` running the queries of the agent in an execution sandbox.
+
+    Every query runs in its own read-only transaction with a local statement timeout. Its
+    plan is estimated with EXPLAIN first and the query is rejected when the estimated cost
+    exceeds `max_cost`. The rows are streamed from a server-side cursor and at most
+    `max_rows` are fetched, and the rendered result is truncated to `max_result_tokens`
+    tokens, so a careless query can neither tie up Postgres nor flood the prompt. The
+    queries are recorded by `utils.agent_query_log`.
+
+    Attributes:
+        statement_timeout_ms (int):
+            The statement timeout of the queries, in milliseconds.
+        max_cost (float):
+            The highest EXPLAIN total cost of an accepted query.
+        max_rows (int):
+            The highest number of rows fetched per query.
+        max_result_tokens (int):
+            The highest number of tokens of a rendered result.
+
+    Methods:
+        run(command: str, fetch: str = "all", include_columns: bool = False, ...) -> str:
+            Runs a query in the sandbox and renders its rows.
+        run_no_throw(command: str, fetch: str = "all", include_columns: bool = False, ...) -> str:
+            Same as `run`, returning the error message instead of raising it.
+        fetch(command: str, parameters: dict | None = None) -> tuple[list[dict], bool]:
+            Runs a query in the sandbox and returns its rows, without rendering them.
+    """
+    def __init__(
+        self,
+        *args,
+        statement_timeout_ms: int = settings.AGENT_DB_STATEMENT_TIMEOUT_MS,
+        max_cost: float = settings.AGENT_SQL_MAX_COST,
+        max_rows: int = settings.AGENT_SQL_MAX_ROWS,
+        max_result_tokens: int = settings.AGENT_SQL_MAX_RESULT_TOKENS,
+        **kwargs
+    ):
+        """
+        Initializes the database and the limits of the sandbox.
+
+        Args:
+            *args: The arguments of `SQLDatabase`.
+            statement_timeout_ms (int):
+                The statement timeout of the queries, in milliseconds.
+            max_cost (float):
+                The highest EXPLAIN total cost of an accepted query.
+            max_rows (int):
+                The highest number of rows fetched per query.
+            max_result_tokens (int):
+                The highest number of tokens of a rendered result.
+            **kwargs: The keyword arguments of `SQLDatabase`.
+        """
+        super().__init__(*args, **kwargs)
+        self.statement_timeout_ms = statement_timeout_ms
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.max_result_tokens = max_result_tokens
+
+    def fetch(self, command: str, parameters: Optional[Dict[str, Any]] = None) -> tuple[list[dict], bool]:
+        """
+        Runs a query in the sandbox and returns its rows, without rendering them.
+
+        Args:
+            command (str): The SQL query.
+            parameters (Optional[Dict[str, Any]]): The bound parameters of the query.
+
+        Returns:
+            tuple[list[dict], bool]:
+                - The rows (at most `max_rows`), as dictionaries.
+                - Whether the query returned more rows than `max_rows`.
+
+        Raises:
+            ToolException: If the estimated cost of the query exceeds `max_cost`.
+            SQLAlchemyError: If the query fails or times out.
+        """
+        return self._execute_sandboxed(command, self.max_rows, parameters or {})
+
+    def _execute_sandboxed(
+        self,
+        command: str,
+        limit: int,
+        parameters: Dict[str, Any],
+    ) -> tuple[Sequence[Dict[str, Any]], bool]:
+        """
+        Checks the cost of a query and fetches its first rows in a read-only transaction.
+
+        Returns:
+            tuple[Sequence[Dict[str, Any]], bool]:
+                - The fetched rows, at most `limit`.
+                - Whether the query returned more rows than `limit`.
+
+        Raises:
+            ToolException: If the estimated cost of the query exceeds `max_cost`.
+        """
+        started_at = time.perf_counter()
+        try:
+            return self._execute_in_transaction(command, limit, parameters)
+        except DBAPIError as e:
+            if getattr(e.orig, "pgcode", None) == QUERY_CANCELED:
+                metrics.increment("agent.sql.timeouts")
+            raise
+        finally:
+            metrics.observe("agent.sql.seconds", time.perf_counter() - started_at)
+
+    def _execute_in_transaction(
+        self,
+        command: str,
+        limit: int,
+        parameters: Dict[str, Any],
+    ) -> tuple[Sequence[Dict[str, Any]], bool]:
+        """
+        Runs the cost check and the query, see `_execute_sandboxed`.
+        """
+        with self._engine.begin() as connection:
+            # Must be the first statement of the transaction
+            connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.statement_timeout_ms)}")
+            if self._schema is not None:
+                connection.exec_driver_sql("SET LOCAL search_path TO %s", (self._schema,))
+
+            plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {command}"), parameters).scalar()
+            cost = plan[0]["Plan"]["Total Cost"]
+            metrics.observe("agent.sql.cost", cost)
+            if cost > self.max_cost:
+                metrics.increment("agent.sql.rejected")
+                raise ToolException(
+                    f"Query rejected: its estimated cost ({cost:,.0f}) exceeds the limit of "
+                    f"{self.max_cost:,.0f}. Avoid cross joins and unbounded scans: filter, "
+                    "aggregate or query a gold view instead."
+                )
+
+            cursor = connection.execution_options(
+                stream_results=True, max_row_buffer=limit + 1
+            ).execute(text(command), parameters)
+            if not cursor.returns_rows:
+                return [], False
+
+            rows = cursor.fetchmany(limit + 1)
+            cursor.close()
+
+        return [row._asdict() for row in rows[:limit]], len(rows) > limit
+
+    def _render(self, rows: list, truncated_rows: bool, limit: int) -> str:
+        """
+        Renders the rows like `SQLDatabase.run`, dropping the last ones until the result fits
+        in `max_result_tokens`, and notes any truncation. `limit` is the number of rows that
+        was fetched (`max_rows`, or 1 for `fetch="one"`).
+        """
+        shown = len(rows)
+        rendered = str(rows)
+        if count_tokens(rendered)[0] > self.max_result_tokens:
+            metrics.increment("agent.sql.truncated_tokens")
+            # Largest number of rows whose rendering fits in the budget
+            low, high = 0, len(rows) - 1
+            while low < high:
+                middle = (low + high + 1) // 2
+                if count_tokens(str(rows[:middle]))[0] <= self.max_result_tokens:
+                    low = middle
+                else:
+                    high = middle - 1
+            shown = low
+            rendered = str(rows[:shown])
+
+        if truncated_rows:
+            metrics.increment("agent.sql.truncated_rows")
+            return (
+                f"{rendered}\n(The query returned more than {limit} row(s); only the "
+                f"first {shown} are shown. Add filters, aggregates or a LIMIT.)"
+            )
+        if shown < len(rows):
+            return (
+                f"{rendered}\n(Only the first {shown} of {len(rows)} rows are shown, the "
+                "result is too large. Select fewer columns or rows.)"
+            )
+        return rendered
+
+    def run(
+        self,
+        command: str,
+        fetch: Literal["all", "one"] = "all",
+        include_columns: bool = False,
+        *,
+        parameters: Optional[Dict[str, Any]] = None,
+        execution_options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Runs a query in the sandbox and renders its rows.
+
+        Args:
+            command (str): The SQL query.
+            fetch (Literal["all", "one"]): Whether to fetch all the rows (up to `max_rows`)
+                or only the first one. Default is "all".
+            include_columns (bool): Whether to render the rows as dictionaries rather than
+                tuples. Default is False.
+            parameters (Optional[Dict[str, Any]]): The bound parameters of the query.
+            execution_options (Optional[Dict[str, Any]]): Ignored, the sandbox sets its own.
+
+        Returns:
+            str: The rendered rows, or an empty string if the query returned none.
+
+        Raises:
+            ToolException: If the estimated cost of the query exceeds `max_cost`.
+            SQLAlchemyError: If the query fails or times out.
+        """
+        if fetch not in ("all", "one"):
+            raise ValueError('The sandbox only fetches "all" or "one" row(s).')
+
+        limit = 1 if fetch == "one" else self.max_rows
+        started_at = time.perf_counter()
+        try:
+            rows, truncated_rows = self._execute_sandboxed(command, limit, parameters or {})
+        except (SQLAlchemyError, ToolException) as e:
+            log_query(
+                "sql_db_query", {"query": command}, time.perf_counter() - started_at,
+                sql=command, error=str(e)
+            )
+            raise
+
+        log_query(
+            "sql_db_query", {"query": command}, time.perf_counter() - started_at,
+            sql=command, row_count=len(rows)
+        )
+
+        if not rows:
+            return ""
+
+        rows = [
+            {column: truncate_word(value, length=self._max_string_length) for column, value in row.items()}
+            for row in rows
+        ]
+        if not include_columns:
+            rows = [tuple(row.values()) for row in rows]
+
+        return self._render(rows, truncated_rows, limit)
+
+    def run_no_throw(
+        self,
+        command: str,
+        fetch: Literal["all", "one"] = "all",
+        include_columns: bool = False,
+        *,
+        parameters: Optional[Dict[str, Any]] = None,
+        execution_options: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Sequence[Dict[str, Any]]]:
+        """
+        Runs a query in the sandbox, returning the error message (e.g. of a rejected or
+        timed out query) instead of raising it, so the agent can rewrite the query.
+        """
+        try:
+            return self.run(
+                command,
+                fetch,
+                include_columns=include_columns,
+                parameters=parameters,
+                execution_options=execution_options,
+            )
+        except (SQLAlchemyError, ToolException) as e:
+            return f"Error: {e}"
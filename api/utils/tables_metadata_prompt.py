@@ -1,17 +1,27 @@
 from typing import List
+import hashlib
+import json
+
 from pydantic import BaseModel
 
 
 class ColumnMetadata(BaseModel):
     name: str
     description: str
+    data_type: str | None = None
+    distinct_values: int | None = None
+    common_values: List[str] | None = None
 
 class TableMetadata(BaseModel):
     name: str
     description: str
     columns: List[ColumnMetadata]
+    row_count: int | None = None
 
 
+# Fallback used when the metadata cannot be derived from the dbt project (see
+# `utils.metadata_service`); the descriptions are maintained in the schema.yml files of
+# the silver and gold models
 TABLES_METADATA = [
     TableMetadata(
         name="stg-won_deal_stage",
@@ -175,9 +185,66 @@ def generate_tables_metadata_prompt(metadata: List[TableMetadata]) -> str:
     table_descriptions = []
     for table in metadata:
         column_descriptions = "\n".join(
-            [f"- {col.name}: {col.description}" for col in table.columns]
+            [generate_column_description(col) for col in table.columns]
         )
+        rows = f"\nRows: ~{table.row_count}" if table.row_count is not None else ""
         table_descriptions.append(
-            f"Table: {table.name}\nDescription: {table.description}\nColumns:\n{column_descriptions}"
+            f"Table: {table.name}\nDescription: {table.description}{rows}\nColumns:\n{column_descriptions}"
         )
     return "\n\n".join(table_descriptions)
+
+def generate_column_description(column: ColumnMetadata) -> str:
+    """
+    Generates the line describing a column, with its type and statistics when known.
+
+    Args:
+        column (ColumnMetadata): The column to describe.
+
+    Returns:
+        str: e.g. "- segment (text): RFM segment. [~11 distinct values: Champions, Dormant]".
+    """
+    data_type = f" ({column.data_type})" if column.data_type else ""
+    statistics = ""
+    if column.distinct_values is not None:
+        statistics = f" [~{column.distinct_values} distinct values"
+        if column.common_values:
+            statistics += f": {', '.join(column.common_values)}"
+        statistics += "]"
+
+    return f"- {column.name}{data_type}: {column.description}{statistics}"
+
+
+_RENDERED_PROMPTS: dict[str, str] = {}
+
+
+def hash_tables_metadata(metadata: List[TableMetadata]) -> str:
+    """
+    Returns a stable hash of table metadata.
+
+    Args:
+        metadata (List[TableMetadata]): The tables and their columns.
+
+    Returns:
+        str: The SHA-256 of the canonical JSON of the metadata.
+    """
+    canonical = json.dumps([table.model_dump() for table in metadata], sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def get_tables_metadata_prompt(metadata: List[TableMetadata]) -> str:
+    """
+    Returns the rendered description of table metadata, rendering it once per content.
+
+    Args:
+        metadata (List[TableMetadata]): The tables and their columns.
+
+    Returns:
+        str: The same string as `generate_tables_metadata_prompt`.
+    """
+    key = hash_tables_metadata(metadata)
+    prompt = _RENDERED_PROMPTS.get(key)
+    if prompt is None:
+        prompt = generate_tables_metadata_prompt(metadata)
+        _RENDERED_PROMPTS[key] = prompt
+
+    return prompt
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with least-recently-used eviction and per-entry expiration.
+
+    Every `clear` starts a new generation. A value computed from data read before a clear
+    is stale: passing the generation read before computing it to `put` drops it instead
+    of storing it after the clear.
+
+    Args:
+        max_entries (int):
+            Maximum number of entries kept; the least recently used one is evicted first.
+        ttl_seconds (float):
+            Time, in seconds, an entry stays valid after being stored.
+
+    Attributes:
+        generation (int):
+            The number of times the cache was cleared.
+
+    Methods:
+        get(key: Hashable, default: Any = None) -> Any:
+            Returns the cached value, or `default` if missing or expired.
+        put(key: Hashable, value: Any, generation: int | None = None) -> None:
+            Stores a value, evicting the least recently used entry if needed.
+        pop(key: Hashable) -> None:
+            Removes an entry if present.
+        items() -> list[tuple[Hashable, Any]]:
+            Returns the entries that are still valid.
+        clear() -> None:
+            Removes every entry.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value and marks it as recently used.
+
+        Args:
+            key (Hashable):
+                The cache key.
+            default (Any):
+                The value returned when the key is missing or expired.
+
+        Returns:
+            Any:
+                The cached value or `default`.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any, generation: int | None = None) -> None:
+        """
+        Stores a value, evicting the least recently used entry when the cache is full.
+
+        Args:
+            key (Hashable):
+                The cache key.
+            value (Any):
+                The value to store.
+            generation (int | None):
+                The `generation` read before the value was computed. The value is dropped
+                if the cache was cleared since then. Default is None (always stored).
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Removes an entry if present.
+
+        Args:
+            key (Hashable):
+                The cache key.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def items(self) -> list[tuple[Hashable, Any]]:
+        """
+        Returns the entries that are still valid, dropping the expired ones.
+
+        Returns:
+            list[tuple[Hashable, Any]]:
+                The `(key, value)` pairs, from least to most recently used.
+        """
+        with self._lock:
+            now = time.monotonic()
+            expired = [key for key, (expires_at, _) in self._data.items() if expires_at < now]
+            for key in expired:
+                del self._data[key]
+
+            return [(key, value) for key, (_, value) in self._data.items()]
+
+    def clear(self) -> None:
+        """
+        Removes every entry and starts a new generation.
+        """
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
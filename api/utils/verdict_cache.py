@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+import hashlib
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.configs import settings
+from core.database import Session
+from models.sql_injection_verdict_model import SQLInjectionVerdictDB
+from utils.ttl_cache import TTLCache
+
+
+def hash_input(query: str) -> str:
+    """
+    Hashes a user input after a normalization that keeps its SQL meaning.
+
+    Only case and whitespace are normalized: punctuation and quotes are what makes an
+    input an injection attempt, so they are kept.
+
+    Args:
+        query (str):
+            The user input.
+
+    Returns:
+        str:
+            The SHA-256 hex digest of the normalized input.
+    """
+    normalized = " ".join(query.lower().split())
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class VerdictCache:
+    """
+    Two-tier cache of SQL injection verdicts keyed on the normalized input hash.
+
+    The first tier is an in-memory LRU+TTL cache; the optional second tier is the
+    `sql_injection_verdict` table, shared by every API process and kept across restarts.
+
+    Args:
+        max_entries (int):
+            Maximum number of verdicts kept in memory.
+        ttl_seconds (float):
+            Time, in seconds, a verdict stays valid in both tiers.
+        persistent (bool):
+            Whether the Postgres tier is used.
+
+    Methods:
+        get(query: str) -> str | None:
+            Returns the cached verdict of an input, if any.
+        put(query: str, status: str) -> None:
+            Caches the verdict of an input.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float, persistent: bool):
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._memory = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get(self, query: str) -> str | None:
+        """
+        Returns the cached verdict of an input.
+
+        Args:
+            query (str):
+                The user input.
+
+        Returns:
+            str | None:
+                The verdict ("Secure" or "Insecure"), or None on a miss.
+        """
+        input_hash = hash_input(query)
+
+        status = self._memory.get(input_hash)
+        if status is not None or not self.persistent:
+            return status
+
+        oldest_valid = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        stmt = select(SQLInjectionVerdictDB.status).where(
+            SQLInjectionVerdictDB.input_hash == input_hash,
+            SQLInjectionVerdictDB.created_at >= oldest_valid
+        )
+
+        try:
+            with Session() as session:
+                status = session.scalars(stmt).first()
+        except SQLAlchemyError as e:
+            print(f"Error reading the persisted SQL injection verdict: {e}")
+            return None
+
+        if status is not None:
+            self._memory.put(input_hash, status)
+
+        return status
+
+    def put(self, query: str, status: str) -> None:
+        """
+        Caches the verdict of an input in every enabled tier.
+
+        Args:
+            query (str):
+                The user input.
+            status (str):
+                The verdict ("Secure" or "Insecure").
+        """
+        input_hash = hash_input(query)
+        self._memory.put(input_hash, status)
+
+        if not self.persistent:
+            return
+
+        stmt = insert(SQLInjectionVerdictDB).values(input_hash=input_hash, status=status)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SQLInjectionVerdictDB.input_hash],
+            set_={"status": stmt.excluded.status, "created_at": datetime.now(timezone.utc)}
+        )
+
+        try:
+            with Session() as session:
+                session.execute(stmt)
+                session.commit()
+        except SQLAlchemyError as e:
+            print(f"Error persisting the SQL injection verdict: {e}")
+
+
+verdict_cache = VerdictCache(
+    max_entries=settings.SQL_INJECTION_VERDICT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SQL_INJECTION_VERDICT_CACHE_TTL_SECONDS,
+    persistent=settings.SQL_INJECTION_VERDICT_PERSISTENT,
+)
@@ -1,8 +1,7 @@
 import streamlit as st
 from streamlit_js_eval import streamlit_js_eval
-import random
 
-from utils.api_calls import api_request
+from utils.api_calls import api_request, api_stream_request
 from urllib.parse import quote
 
 
@@ -27,14 +26,14 @@ def verify_sql_injection(query: str) -> str:
     return response
 
 
-def call_rag(query: str, message_history_id: int) -> dict:
+def call_rag(query: str, message_history_id: str) -> dict:
     """
     Sends a query to a RAG (Retrieval-Augmented Generation) system.
 
     Args:
         query (str): 
             The user's input query.
-        message_history_id (int): 
+        message_history_id (str): 
             The ID of the message history session.
 
     Returns:
@@ -51,12 +50,58 @@ def call_rag(query: str, message_history_id: int) -> dict:
     return response
 
 
-def get_historic_message(message_history_id: int) -> list:
+def call_rag_stream(query: str, message_history_id: str, status_box) -> dict:
     """
-    Retrieves the historic messages associated with a given message history ID.
+    Streams the RAG answer, rendering tool calls and answer tokens as they arrive.
 
     Args:
-        message_history_id (int): 
+        query (str): 
+            The user's input query.
+        message_history_id (str): 
+            The ID of the message history session.
+        status_box (StatusContainer): 
+            The Streamlit status container where tool calls are written.
+
+    Returns:
+        dict:
+            The payload of the final "done" event (final answer and chat history),
+            or an empty dict if the stream ended without it.
+    """
+    final_event = {}
+
+    def answer_tokens():
+        events = api_stream_request(
+            api_url="http://0.0.0.0:8200/api/text-to-sql/stream/",
+            json={
+                "message_history_id": message_history_id,
+                "query": query,
+                "response_mode": "turn"
+            }
+        )
+        for event, data in events:
+            if event == "token":
+                yield data["content"]
+            elif event == "tool_call":
+                status_box.write(f"Calling `{data['name']}`")
+            elif event == "sql":
+                status_box.code(data["query"], language="sql")
+            elif event == "error":
+                status_box.update(label="Error while answering", state="error")
+                status_box.write(data["detail"])
+            elif event == "done":
+                final_event.update(data)
+                status_box.update(label="Done", state="complete")
+
+    st.write_stream(answer_tokens())
+    return final_event
+
+
+def get_historic_message(message_history_id: str) -> list:
+    """
+    Retrieves the most recent historic messages associated with a given message history ID.
+
+    Args:
+        message_history_id (str): 
             The ID of the message history session.
 
     Returns:
@@ -66,11 +111,10 @@ def get_historic_message(message_history_id: int) -> list:
     response = api_request(
         api_url=f"http://0.0.0.0:8200/api/historic-message/",
         json={
-                "message_history_id": message_history_id,
-                "question": ""
+                "message_history_id": message_history_id
             })
     
-    return response
+    return response["messages"] if response else []
 
 
 def write_user_and_assistant_messages(q_and_a: list[dict]) -> None:
@@ -108,15 +152,23 @@ def update_historic(q_and_a: list[dict]) -> None:
             st.session_state.historic.append(msg)
 
 
-def get_new_message_history_id() -> int:
+def get_new_message_history_id() -> str | None:
     """
-    Generates a new random message history ID.
+    Allocates a new message history ID from the API.
 
     Returns:
-        int:
-            A randomly generated integer ID.
+        str | None:
+            A collision-free, time-ordered 64-bit ID, as a string of digits, or None
+            (with an error shown) if the API could not allocate it.
     """
-    return random.randint(0, 2**16 - 1)
+    response = api_request(
+        api_url="http://0.0.0.0:8200/api/chat-session/",
+        method="POST"
+    )
+    if not response:
+        st.error("Could not start a new conversation: the API is unavailable. Try again in a moment.")
+        return None
+    return response["message_history_id"]
 
 
 def return_historic() -> list:
@@ -129,7 +181,9 @@ def return_historic() -> list:
     """
     if "historic" not in st.session_state:
         if "message_history_id_site" not in st.session_state:
-            st.session_state.message_history_id_site = get_new_message_history_id()
+            message_history_id = get_new_message_history_id()
+            if message_history_id is not None:
+                st.session_state.message_history_id_site = message_history_id
             return []
         else:
             response = get_historic_message(
@@ -173,15 +227,29 @@ if user_input := st.chat_input("Type Here"):
 
     if status:
         if status == 'Secure':
-            # st.success("Hi")
-            response = call_rag(
-                query=user_input,
-                message_history_id= st.session_state.message_history_id_site
-            )
+            if "message_history_id_site" not in st.session_state:
+                # No conversation could be allocated, `return_historic` showed the error
+                st.stop()
 
-            update_historic(response)
-            update_last_message(response)
-            write_user_and_assistant_messages(return_last_message())
+            # st.success("Hi")
+            with st.chat_message(name="user"):
+                st.write(user_input)
+
+            with st.chat_message(name="assistant"):
+                status_box = st.status("Querying the database...")
+                response = call_rag_stream(
+                    query=user_input,
+                    message_history_id=st.session_state.message_history_id_site,
+                    status_box=status_box
+                )
+
+            if response:
+                new_turn = [
+                    {"role": "human", "content": user_input},
+                    {"role": "assistant", "content": response["content"]}
+                ]
+                update_historic(new_turn)
+                update_last_message(new_turn)
 
         else:
             st.warning("Be careful, your input is trying to make SQl Injection!")
@@ -190,5 +258,7 @@ if st.button("Limpar histórico"):
     if "historic" in st.session_state and "last_message" in st.session_state:
         del st.session_state.historic[:]
         del st.session_state.last_message[:]
-    st.session_state.message_history_id_site = get_new_message_history_id()
-    streamlit_js_eval(js_expressions="parent.window.location.reload()")
\ No newline at end of file
+    message_history_id = get_new_message_history_id()
+    if message_history_id is not None:
+        st.session_state.message_history_id_site = message_history_id
+        streamlit_js_eval(js_expressions="parent.window.location.reload()")
\ No newline at end of file
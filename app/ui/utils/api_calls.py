@@ -1,6 +1,8 @@
+import json as json_lib
+
 import requests
 
-def api_request(api_url: str, json=None):
+def api_request(api_url: str, json=None, method: str | None = None):
     """
     Sends an HTTP GET or POST request to the specified API URL.
 
@@ -9,13 +11,15 @@ def api_request(api_url: str, json=None):
             The URL of the API endpoint.
         json (dict | None, optional): 
             The JSON payload for a POST request (None for GET requests).
+        method (str | None, optional): 
+            Forces the HTTP method ("GET" or "POST"), e.g. for a POST without payload.
 
     Returns:
         response (list | dict): 
             The JSON response from the API, or an empty list if an error occurs.
     """
     try:
-        if json:
+        if json or method == "POST":
             response = requests.post(api_url, json=json)
         else:
             response = requests.get(api_url)
@@ -29,3 +33,37 @@ def api_request(api_url: str, json=None):
     except requests.exceptions.RequestException as err:
         print(f"Error occurred: {err}")
         return []
+
+
+def api_stream_request(api_url: str, json: dict):
+    """
+    Sends an HTTP POST request and iterates over the Server-Sent Events of the response.
+
+    Args:
+        api_url (str): 
+            The URL of the streaming API endpoint.
+        json (dict): 
+            The JSON payload for the POST request.
+
+    Yields:
+        tuple[str, dict]: 
+            The event name and its decoded JSON payload.
+    """
+    try:
+        with requests.post(api_url, json=json, stream=True) as response:
+            response.raise_for_status()
+
+            event = "message"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    yield event, json_lib.loads(line[len("data:"):].strip())
+                    event = "message"
+
+    except requests.exceptions.HTTPError as err:
+        print(f"HTTP Error occurred: {err}")
+    except requests.exceptions.RequestException as err:
+        print(f"Error occurred: {err}")
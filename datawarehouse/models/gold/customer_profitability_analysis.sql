@@ -1,4 +1,11 @@
-{{ config(materialized='view') }}
+{{
+    config(
+        indexes=[
+            {'columns': ['customer']},
+            {'columns': ['customer_recency_frequency_monetary_segment']},
+        ]
+    )
+}}
 
 WITH customer_profitability_data AS (
     SELECT 
@@ -1,4 +1,11 @@
-{{ config(materialized='view') }}
+{{
+    config(
+        indexes=[
+            {'columns': ['customer']},
+            {'columns': ['prob_alive_customer']},
+        ]
+    )
+}}
 
 WITH retention_data AS (
     SELECT 
@@ -1,4 +1,10 @@
-{{ config(materialized='view') }}
+{{
+    config(
+        indexes=[
+            {'columns': ['product']},
+        ]
+    )
+}}
 
 WITH product_sales_data AS (
     SELECT 
@@ -1,4 +1,10 @@
-{{ config(materialized='view') }}
+{{
+    config(
+        indexes=[
+            {'columns': ['sales_agent_regional_office']},
+        ]
+    )
+}}
 
 WITH regional_sales_data AS (
     SELECT 
@@ -1,4 +1,10 @@
-{{ config(materialized='view') }}
+{{
+    config(
+        indexes=[
+            {'columns': ['sales_agent'], 'unique': True},
+        ]
+    )
+}}
 
 WITH agent_performance_data AS (
     SELECT 
@@ -1,4 +1,10 @@
-{{ config(materialized='view') }}
+{{
+    config(
+        indexes=[
+            {'columns': ['sales_agent'], 'unique': True},
+        ]
+    )
+}}
 
 WITH dataset_won_deal_stage AS (
     SELECT 
@@ -1,4 +1,10 @@
-{{ config(materialized='view') }}
+{{
+    config(
+        indexes=[
+            {'columns': ['customer_sector']},
+        ]
+    )
+}}
 
 WITH sector_revenue_data AS (
     SELECT 
@@ -1,4 +1,18 @@
-{{ config(materialized='view') }}
+{{
+    config(
+        unique_key='opportunity_id',
+        incremental_strategy='delete+insert',
+        on_schema_change='sync_all_columns',
+        indexes=[
+            {'columns': ['opportunity_id'], 'unique': True},
+            {'columns': ['sales_agent']},
+            {'columns': ['customer']},
+            {'columns': ['prob_alive_customer']},
+            {'columns': ['business_close_date']},
+            {'columns': ['refreshed_at']},
+        ]
+    )
+}}
 
 -- import
 
@@ -78,7 +92,8 @@ renamed_merged_data AS (
         m.expected_purchases_year AS customer_expected_purchases_year,
         m.expected_average_profit AS customer_expected_average_profit,
         m."Predicted_Year_CLTV" AS predicted_year_customer_lifetime_value,
-        m."Predicted_CLTV_Segment" AS predicted_customer_lifetime_value_segment
+        m."Predicted_CLTV_Segment" AS predicted_customer_lifetime_value_segment,
+        g.refreshed_at AS refreshed_at
     FROM
         general_enriched_dataset g
 
@@ -92,4 +107,11 @@ renamed_merged_data AS (
 SELECT
     * 
 FROM 
-    renamed_merged_data
\ No newline at end of file
+    renamed_merged_data
+
+{% if is_incremental() %}
+-- Only the deals rewritten since the last build (the incremental refresh rewrites every
+-- deal of the accounts and sales agents it touches)
+WHERE
+    refreshed_at > (SELECT COALESCE(MAX(refreshed_at), '-infinity') FROM {{ this }})
+{% endif %}
\ No newline at end of file